@@ -1,447 +1,389 @@
-from flask import Flask, jsonify, request
-from flask_cors import CORS
-from config.db import get_firestore_db
-from models.user_model import create_user, validate_login
-from services.user_services.user_routes import user_bp
-from flask_socketio import SocketIO, emit
-import base64
-from PIL import Image
-import io
-import cv2
-import numpy as np
-import mediapipe as mp
-from tensorflow.keras.models import load_model
-import HandTrackingModule as htm
-import time
-from datetime import datetime
-import os
-# Ensure debug directory exists
-os.makedirs("debug", exist_ok=True)
-
-app = Flask(__name__)
-CORS(app)
-
-# Initialize Socket.IO
-socketio = SocketIO(app, 
-                   cors_allowed_origins="*",
-                   logger=True,
-                   engineio_logger=True)
-
-
-# Register blueprints
-app.register_blueprint(user_bp, url_prefix='/user_services')
-
-# MediaPipe setup
-mp_hands = mp.solutions.hands
-hands = mp_hands.Hands(static_image_mode=True, max_num_hands=1)
-mp_drawing = mp.solutions.drawing_utils
-
-# CNN Model setup
-IMG_SIZE = (128, 128)
-MODEL_PATH = 'AI-Model/asl_to_text_advanced.h5'
-
-# Class mapping
-class_mapping = {
-    0: '0', 1: 'A', 2: 'B', 3: 'C', 4: 'D', 5: 'E', 
-    6: 'F', 7: 'G', 8: 'H', 9: 'I', 10: 'J',
-    11: 'K', 12: 'L', 13: 'M', 14: 'N', 15: 'O',
-    16: 'P', 17: 'Q', 18: 'R', 19: 'S', 20: 'T',
-    21: 'U', 22: 'V', 23: 'W', 24: 'X', 25: 'Y', 26: 'Z'
-}
-
-AMBIGUOUS_GROUPS = [
-    {'M', 'N', 'T'},
-    {'D', 'I'},
-    {'V', 'U'},
-]
-
-CONFIDENCE_THRESHOLD = 0.7
-
-# Load CNN model
-try:
-    model = load_model(MODEL_PATH)
-    print("CNN model loaded successfully")
-except Exception as e:
-    print(f"Error loading CNN model: {str(e)}")
-    raise
-
-# Track connected clients
-connected_clients = set()
-
-
-def predict_sign_language(image):
-    """Full processing and prediction pipeline"""
-    # Step 1: Preprocess image
-    processed_image = preprocess_image(image)  # Use original, clean one
-    
-    # Step 2: Prepare for model
-    model_input = prepare_for_model(processed_image)
-    
-    # Step 3: Make prediction
-    prediction = model.predict(np.expand_dims(model_input, axis=0))
-    predicted_class = np.argmax(prediction[0])
-    confidence = np.max(prediction[0])
-    
-    return processed_image, predicted_class, confidence
-
-def preprocess_image(image):
-    """Preprocess OpenCV image for CNN"""
-    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-    blur = cv2.GaussianBlur(gray, (5, 5), 2)
-    thresh = cv2.adaptiveThreshold(blur, 255, 
-                                   cv2.ADAPTIVE_THRESH_GAUSSIAN_C, 
-                                   cv2.THRESH_BINARY_INV, 11, 2)
-    _, final = cv2.threshold(thresh, 70, 255, 
-                              cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
-    return final
-
-def prepare_for_model(image):
-    """Prepare the processed image for model input"""
-    # Resize to model's expected input
-    resized = cv2.resize(image, (128, 128))
-    
-    # Normalize and add channel dimension
-    normalized = resized.astype('float32') / 255.0
-    final_image = np.expand_dims(normalized, axis=-1)
-    
-    return final_image
-
-def is_ambiguous(predictions):
-    pred_set = set(predictions)
-    for group in AMBIGUOUS_GROUPS:
-        if pred_set.issubset(group):
-            return True, group
-    return False, None
-
-def detect_hand_sign(posList):
-    result = ""
-    if not posList or len(posList) < 21:  # Need all 21 hand landmarks
-        return result
-    
-    fingers = []
-    
-    finger_mcp = [5,9,13,17]
-    finger_dip = [6,10,14,18]
-    finger_pip = [7,11,15,19]
-    finger_tip = [8,12,16,20]
-    
-    for id in range(4):
-        if(posList[finger_tip[id]][1]+ 25  < posList[finger_dip[id]][1] and posList[16][2]<posList[20][2]):
-            fingers.append(0.25)
-        elif(posList[finger_tip[id]][2] > posList[finger_dip[id]][2]):
-            fingers.append(0)
-        elif(posList[finger_tip[id]][2] < posList[finger_pip[id]][2]): 
-            fingers.append(1)
-        elif(posList[finger_tip[id]][1] > posList[finger_pip[id]][1] and posList[finger_tip[id]][1] > posList[finger_dip[id]][1]): 
-            fingers.append(0.5)
-    
-    if(posList[3][2] > posList[4][2]) and (posList[3][1] > posList[6][1])and (posList[4][2] < posList[6][2]) and fingers.count(0) == 4:
-        result = "A"
-        
-    elif(posList[3][1] > posList[4][1]) and fingers.count(1) == 4:
-        result = "B"
-    
-    elif(posList[3][1] > posList[6][1]) and fingers.count(0.5) >= 1 and (posList[4][2]> posList[8][2]):
-        result = "C"
-        
-    elif(fingers[0]==1) and fingers.count(0) == 3 and (posList[3][1] > posList[4][1]):
-        result = "D"
-    
-    elif (posList[3][1] < posList[6][1]) and fingers.count(0) == 4 and posList[12][2]<posList[4][2]:
-        result = "E"
-
-    elif (fingers.count(1) == 3) and (fingers[0]==0) and (posList[3][2] > posList[4][2]):
-        result = "F"
-
-    elif(fingers[0]==0.25) and fingers.count(0) == 3:
-        result = "G"
-
-    elif(fingers[0]==0.25) and(fingers[1]==0.25) and fingers.count(0) == 2:
-        result = "H"
-    
-    elif (posList[4][1] < posList[6][1]) and fingers.count(0) == 3:
-        if (len(fingers)==4 and fingers[3] == 1):
-            result = "I"
-    
-    elif (posList[4][1] < posList[6][1] and posList[4][1] > posList[10][1] and fingers.count(1) == 2):
-        result = "K"
-        
-    elif(fingers[0]==1) and fingers.count(0) == 3 and (posList[3][1] < posList[4][1]):
-        result = "L"
-    
-    elif (posList[4][1] < posList[16][1]) and fingers.count(0) == 4:
-        result = "M"
-    
-    elif (posList[4][1] < posList[12][1]) and fingers.count(0) == 4:
-        result = "N"
-        
-    elif(posList[4][2] < posList[8][2]) and (posList[4][2] < posList[12][2]) and (posList[4][2] < posList[16][2]) and (posList[4][2] < posList[20][2]):
-        result = "O"
-    
-    elif(fingers[2] == 0)  and (posList[4][2] < posList[12][2]) and (posList[4][2] > posList[6][2]):
-        if (len(fingers)==4 and fingers[3] == 0):
-            result = "P"
-    
-    elif(fingers[1] == 0) and (fingers[2] == 0) and (fingers[3] == 0) and (posList[8][2] > posList[5][2]) and (posList[4][2] < posList[1][2]):
-        result = "Q"
-    
-    elif(posList[8][1] < posList[12][1]) and (fingers.count(1) == 2) and (posList[9][1] > posList[4][1]):
-        result = "R"
-        
-    elif (posList[4][1] > posList[12][1]) and posList[4][2]<posList[6][2] and fingers.count(0) == 4:
-        result = "T"
-
-    elif (posList[4][1] > posList[12][1]) and posList[4][2]<posList[12][2] and fingers.count(0) == 4:
-        result = "S"
-
-    elif (posList[4][1] < posList[6][1] and posList[4][1] < posList[10][1] and fingers.count(1) == 2 and posList[3][2] > posList[4][2] and (posList[8][1] - posList[11][1]) <= 50):
-        result = "U"
-        
-    elif (posList[4][1] < posList[6][1] and posList[4][1] < posList[10][1] and fingers.count(1) == 2 and posList[3][2] > posList[4][2]):
-        result = "V"
-    
-    elif (posList[4][1] < posList[6][1] and posList[4][1] < posList[10][1] and fingers.count(1) == 3):
-        result = "W"
-    
-    elif (fingers[0] == 0.5 and fingers.count(0) == 3 and posList[4][1] > posList[6][1]):
-        result = "X"
-    
-    elif(fingers.count(0) == 3) and (posList[3][1] < posList[4][1]):
-        if (len(fingers)==4 and fingers[3] == 1):
-            result = "Y"
-    
-    return result
-
-
-def handFider(img):
-    detector = htm.handDetector(detectionCon = 0)
-    img = detector.findHands(img)
-    posList = detector.findPosition(img, draw=False)
-    while True:
-        img = detector.findHands(img)
-        posList = detector.findPosition(img, draw=False)
-        # print(posList)
-
-        # tips = [4, 8, 12, 16, 20]
-
-        if len(posList) != 0:
-            # fingers = []
-
-
-            # if posList[tips[0]][1] > posList[tips[0]-1][1]:
-            #     fingers.append(1)
-            # else:
-            #     fingers.append(0)
-
-            # for id in range(1,5):
-            #     if posList[tips[id]][2] < posList[tips[id]-2][2]:
-            #         fingers.append(1)
-            #     else:
-            #         fingers.append(0)
-
-            # print(fingers)
-
-            # totalfingers = fingers.count(1)
-            # print(totalfingers)
-
-            result = ""
-            fingers = []
-
-            finger_mcp = [5,9,13,17]
-            finger_dip = [6,10,14,18]
-            finger_pip = [7,11,15,19]
-            finger_tip = [8,12,16,20]
-
-            for id in range(4):
-                if(posList[finger_tip[id]][1]+ 25  < posList[finger_dip[id]][1] and posList[16][2]<posList[20][2]):
-                    fingers.append(0.25)
-                elif(posList[finger_tip[id]][2] > posList[finger_dip[id]][2]):
-                    fingers.append(0)
-                elif(posList[finger_tip[id]][2] < posList[finger_pip[id]][2]): 
-                    fingers.append(1)
-                elif(posList[finger_tip[id]][1] > posList[finger_pip[id]][1] and posList[finger_tip[id]][1] > posList[finger_dip[id]][1]): 
-                    fingers.append(0.5)
-
-            print(fingers)
-            # print(posList)
-
-            if(posList[3][2] > posList[4][2]) and (posList[3][1] > posList[6][1])and (posList[4][2] < posList[6][2]) and fingers.count(0) == 4:
-                result = "A"
-
-            elif(posList[3][1] > posList[4][1]) and fingers.count(1) == 4:
-                result = "B"
-
-            elif(posList[3][1] > posList[6][1]) and fingers.count(0.5) >= 1 and (posList[4][2]> posList[8][2]):
-                result = "C"
-
-            elif(fingers[0]==1) and fingers.count(0) == 3 and (posList[3][1] > posList[4][1]):
-                result = "D"
-
-            elif (posList[3][1] < posList[6][1]) and fingers.count(0) == 4 and posList[12][2]<posList[4][2]:
-                result = "E"
-
-            elif (fingers.count(1) == 3) and (fingers[0]==0) and (posList[3][2] > posList[4][2]):
-                result = "F"
-
-            elif(fingers[0]==0.25) and fingers.count(0) == 3:
-                result = "G"
-
-            elif(fingers[0]==0.25) and(fingers[1]==0.25) and fingers.count(0) == 2:
-                result = "H"
-
-            elif (posList[4][1] < posList[6][1]) and fingers.count(0) == 3:
-                if (len(fingers)==4 and fingers[3] == 1):
-                    result = "I"
-
-            elif (posList[4][1] < posList[6][1] and posList[4][1] > posList[10][1] and fingers.count(1) == 2):
-                result = "K"
-
-            elif(fingers[0]==1) and fingers.count(0) == 3 and (posList[3][1] < posList[4][1]):
-                result = "L"
-
-            elif (posList[4][1] < posList[16][1]) and fingers.count(0) == 4:
-                result = "M"
-
-            elif (posList[4][1] < posList[12][1]) and fingers.count(0) == 4:
-                result = "N"
-
-            # elif(posList[3][1] > posList[6][1]) and (posList[3][2] < posList[6][2]) and fingers.count(0.5) >= 1:
-            #     result = "O"
-
-            elif (posList[4][1] > posList[12][1]) and posList[4][2]<posList[6][2] and fingers.count(0) == 4:
-                result = "T"
-
-            elif (posList[4][1] > posList[12][1]) and posList[4][2]<posList[12][2] and fingers.count(0) == 4:
-                result = "S"
-
-
-            elif(posList[4][2] < posList[8][2]) and (posList[4][2] < posList[12][2]) and (posList[4][2] < posList[16][2]) and (posList[4][2] < posList[20][2]):
-                result = "O"
-
-            elif(fingers[2] == 0)  and (posList[4][2] < posList[12][2]) and (posList[4][2] > posList[6][2]):
-                if (len(fingers)==4 and fingers[3] == 0):
-                    result = "P"
-
-            elif(fingers[1] == 0) and (fingers[2] == 0) and (fingers[3] == 0) and (posList[8][2] > posList[5][2]) and (posList[4][2] < posList[1][2]):
-                result = "Q"
-
-            # elif(posList[10][2] < posList[8][2] and fingers.count(0) == 4 and posList[4][2] > posList[14][2]):
-            #     result = "Q" 
-
-            elif(posList[8][1] < posList[12][1]) and (fingers.count(1) == 2) and (posList[9][1] > posList[4][1]):
-                result = "R"
-
-            # elif (posList[3][1] < posList[6][1]) and fingers.count(0) == 4:
-            #     result = "S"
-
-            elif (posList[4][1] < posList[6][1] and posList[4][1] < posList[10][1] and fingers.count(1) == 2 and posList[3][2] > posList[4][2] and (posList[8][1] - posList[11][1]) <= 50):
-                result = "U"
-
-            elif (posList[4][1] < posList[6][1] and posList[4][1] < posList[10][1] and fingers.count(1) == 2 and posList[3][2] > posList[4][2]):
-                result = "V"
-
-            elif (posList[4][1] < posList[6][1] and posList[4][1] < posList[10][1] and fingers.count(1) == 3):
-                result = "W"
-
-            elif (fingers[0] == 0.5 and fingers.count(0) == 3 and posList[4][1] > posList[6][1]):
-                result = "X"
-
-            elif(fingers.count(0) == 3) and (posList[3][1] < posList[4][1]):
-                if (len(fingers)==4 and fingers[3] == 1):
-                    result = "Y"
-
-            # if(posList[4][1] < posList[])
-
-
-            cv2.rectangle(img, (28,255), (178, 425), (0, 225, 0), cv2.FILLED)
-            cv2.putText(img, str(result), (55,400), cv2.FONT_HERSHEY_COMPLEX,5, (255,0,0), 15)
-
-        cv2.imshow("Image", img)
-        cv2.waitKey(1)
-
-# Socket.IO and route handlers
-@socketio.on('connect')
-def handle_connect():
-    client_id = request.sid
-    connected_clients.add(client_id)
-    print(f'Client connected: {client_id}')
-    emit('connection_response', {'status': 'connected'})
-
-@socketio.on('disconnect')
-def handle_disconnect():
-    client_id = request.sid
-    if client_id in connected_clients:
-        connected_clients.remove(client_id)
-    print(f'Client disconnected: {client_id}')
-
-@socketio.on('predict')
-def handle_prediction(data):
-    try:
-        base64_image = data['image']
-        header, encoded = base64_image.split(',', 1) if ',' in base64_image else ('', base64_image)
-        image_data = base64.b64decode(encoded)
-        
-        # Convert base64 to OpenCV image
-        pil_image = Image.open(io.BytesIO(image_data)).convert('RGB')
-        open_cv_image = cv2.cvtColor(np.array(pil_image), cv2.COLOR_RGB2BGR)
-        #open_cv_image = cv2.rotate(open_cv_image, cv2.ROTATE_180)
-
-        # Optional: get landmarks using Mediapipe
-        rgb_image = cv2.cvtColor(open_cv_image, cv2.COLOR_BGR2RGB)
-        results = hands.process(rgb_image)
-
-        hand_sign = ""
-        if results.multi_hand_landmarks:
-            for hand_landmarks in results.multi_hand_landmarks:
-                posList = []
-                for id, lm in enumerate(hand_landmarks.landmark):
-                    h, w, _ = open_cv_image.shape
-                    cx, cy = int(lm.x * w), int(lm.y * h)
-                    posList.append((id, cx, cy))
-                hand_sign = detect_hand_sign(posList)
-                break
-
-        # Use OpenCV image for prediction
-        processed, pred_class, confidence = predict_sign_language(open_cv_image)
-
-            # Generate timestamp for filename
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        
-        # Save original image with timestamp
-        cv2.imwrite(f"debug/original_{timestamp}.jpg", open_cv_image)
-        
-        # Process and predict
-        processed, pred_class, confidence = predict_sign_language(open_cv_image)
-        
-        # Save processed image with same timestamp
-        success = cv2.imwrite(f"debug/processed_{timestamp}.jpg", processed)
-        if success:
-            print(f"image saved in debug/processed_{timestamp}.jpg")
-        else:
-            print("Failed to save processed image!")
-
-        predictions = [class_mapping[pred_class]]  # You can build your own logic here
-        is_ambig, group = is_ambiguous(predictions)
-        
-        emit('prediction_response', {
-            'cnn_prediction': class_mapping[pred_class],
-            'hand_sign': hand_sign,
-            'confidence': float(round(confidence, 3)),
-            'ambiguous': is_ambig,
-            'group': list(group) if is_ambig else []
-        })
-
-
-    except Exception as e:
-        emit('prediction_response', {
-            'error': str(e)
-        })
-        print(f"[ERROR] Prediction failed: {str(e)}")
-
-if __name__ == '__main__':
-    print("Starting server...")
-    socketio.run(app, 
-                 host='0.0.0.0', 
-                 port=5000, 
-                 debug=True, 
+import time
+IMPORT_STARTED = time.perf_counter()
+
+import logging
+from flask import Flask, Response, jsonify, request, stream_with_context
+from flask_cors import CORS
+from config.db import get_firestore_db
+from config.model_config import (INFERENCE_THREADS, INFERENCE_WORKERS, INFERENCE_PREFORK,
+                                 MODEL_REGISTRY_DIR, MODEL_WATCH_INTERVAL, BATCH_MAX_SIZE, BATCH_MAX_WAIT_MS, BATCH_QUEUE_SIZE,
+                                 THROTTLE_MIN_INTERVAL_MS, THROTTLE_MAX_INTERVAL_MS,
+                                 CLIP_MAX_FRAMES, CLIP_WINDOW, CLIP_MAX_CONCURRENT)
+from models.user_model import create_user, validate_login, validate_session_token
+from services.user_services.user_routes import user_bp
+from services.ai_services.ai_routes import ai_bp
+from flask_socketio import SocketIO, emit
+import cv2
+import numpy as np
+from utils.batch_scheduler import InferenceBatcher
+from utils.sign_pipeline import build_hand_sessions, build_sign_pipeline
+from utils.sign_preprocessing import ModelInputBuffer
+from utils.hand_signs import detect_hand_sign
+from utils.worker_pool import InferenceWorkerPool
+from utils.frame_coalescer import FrameCoalescer
+from utils.lazy_loader import LazyResource, load_all, readiness
+from utils.clip_pipeline import ClipPredictor, iter_image_frames, iter_video_frames, save_upload
+from utils.metrics import Gauge, record_frame, render_metrics
+from utils.model_registry import ModelRegistry
+import json
+import os
+import threading
+import uuid
+
+# LOG_LEVEL=WARNING keeps per-connection logging out of production; SOCKETIO_LOGGING=0 silences
+# the Socket.IO/Engine.IO packet loggers. Neither affects /metrics.
+logging.basicConfig(level=os.environ.get('LOG_LEVEL', 'INFO').upper(),
+                    format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+logger = logging.getLogger('server')
+SOCKETIO_LOGGING = os.environ.get('SOCKETIO_LOGGING', '1') == '1'
+
+app = Flask(__name__)
+CORS(app)
+
+# Initialize Socket.IO
+socketio = SocketIO(app, 
+                   cors_allowed_origins="*",
+                   logger=SOCKETIO_LOGGING,
+                   engineio_logger=SOCKETIO_LOGGING)
+
+
+# Register blueprints
+app.register_blueprint(user_bp, url_prefix='/user_services')
+app.register_blueprint(ai_bp, url_prefix='/ai_services')
+
+# CNN Model setup: the registry's ACTIVE version is loaded lazily through its inference backend
+def warm_up_cnn(model):
+    # Build graphs/allocate tensors up front for every batch size TFLite pads to, and full batches
+    for batch_size in {1 << i for i in range(BATCH_MAX_SIZE.bit_length())} | {BATCH_MAX_SIZE}:
+        model.predict(np.zeros((batch_size, 128, 128, 1), dtype=np.float32))
+
+model_registry = ModelRegistry(MODEL_REGISTRY_DIR, INFERENCE_THREADS, warmup=warm_up_cnn)
+
+def start_model_registry():
+    model_registry.start()
+    if MODEL_WATCH_INTERVAL > 0:
+        model_registry.watch(MODEL_WATCH_INTERVAL)
+    return model_registry
+
+def load_hand_tracker():
+    import HandTrackingModule as htm
+    return htm
+
+def warm_up_hand_tracker(htm):
+    detector = htm.handDetector(mode=False, maxHands=1)
+    detector.findHands(np.zeros((480, 640, 3), dtype=np.uint8), draw=False)
+    detector.close()
+
+# Latest-wins frame slot per client, with capture-interval advice for the app
+frame_coalescer = FrameCoalescer(min_interval_ms=THROTTLE_MIN_INTERVAL_MS,
+                                 max_interval_ms=THROTTLE_MAX_INTERVAL_MS)
+
+def frame_outcome(response):
+    if 'error' in response:
+        return 'error'
+    if not response['hand_detected']:
+        return 'no_hand'
+    if response['cached']:
+        return 'cache_' + response['cached']
+    return 'reused' if response['reused'] else response['stage']
+
+def deliver_result(client_id, response, committed, timings):
+    record_frame(timings, frame_outcome(response))
+    socketio.emit('prediction_response', response, to=client_id)
+    if committed:
+        socketio.emit('letter_committed', {'letter': committed}, to=client_id)
+    advice = frame_coalescer.throttle_advice(client_id)
+    if advice:
+        socketio.emit('throttle', advice, to=client_id)
+
+def start_worker_pool():
+    return InferenceWorkerPool(INFERENCE_WORKERS, deliver_result, frame_coalescer,
+                               prefork=INFERENCE_PREFORK).start()
+
+firestore_db = LazyResource('firestore', get_firestore_db, required=False)
+
+if INFERENCE_WORKERS > 0:
+    # Production mode: this process only receives frames and emits results
+    worker_pool = LazyResource('inference_workers', start_worker_pool, health=lambda pool: pool.healthy())
+    pipeline = None
+else:
+    worker_pool = None
+    cnn = LazyResource('cnn', start_model_registry)
+    hand_tracker = LazyResource('hand_tracker', load_hand_tracker, warm_up_hand_tracker)
+
+    # Frames from every connected client are batched into one forward pass on the active model
+    batcher = InferenceBatcher(lambda batch: cnn.get().predict_batch(batch),
+                               max_batch_size=BATCH_MAX_SIZE,
+                               max_wait_ms=BATCH_MAX_WAIT_MS,
+                               max_queue_size=BATCH_QUEUE_SIZE,
+                               prepare_fn=ModelInputBuffer(BATCH_MAX_SIZE))
+    hand_sessions = build_hand_sessions()
+    pipeline = build_sign_pipeline(batcher.predict, hand_sessions)
+    predict_sign_language = pipeline.predict_sign_language
+    # Cached predictions never outlive the model version that made them
+    model_registry.on_activate.append(lambda model: pipeline.set_model_version(model.key))
+
+# Set FAST_STARTUP=1 to start serving immediately and load models in the background
+FAST_STARTUP = os.environ.get('FAST_STARTUP', '0') == '1'
+
+# Track connected clients and the user each one authenticated as
+connected_clients = set()
+client_users = {}
+
+Gauge('sign_connected_clients', 'Connected Socket.IO clients', lambda: len(connected_clients))
+Gauge('sign_frames_coalesced', 'Frames parked behind an in-flight frame',
+      lambda: frame_coalescer.totals()['coalesced'])
+Gauge('sign_frames_dropped', 'Parked frames replaced by a newer one',
+      lambda: frame_coalescer.totals()['dropped'])
+if worker_pool is not None:
+    Gauge('sign_worker_queue_depth', 'Frames queued for the inference workers',
+          lambda: worker_pool.get().queue_depth() if worker_pool.status == 'ready' else 0)
+else:
+    Gauge('sign_batch_queue_depth', 'Model inputs waiting for the inference batcher',
+          lambda: batcher.pending.qsize())
+    if pipeline.recorder is not None:
+        Gauge('sign_record_queue_depth', 'Recording chunks waiting to be written',
+              lambda: pipeline.recorder.pending.qsize())
+        Gauge('sign_record_frames_dropped', 'Recorded frames dropped because the writer fell behind',
+              lambda: pipeline.recorder.dropped)
+    if pipeline.debug_archiver is not None:
+        Gauge('sign_debug_queue_depth', 'Frames waiting for the debug archiver',
+              lambda: pipeline.debug_archiver.pending.qsize())
+        Gauge('sign_debug_frames_dropped', 'Debug frames dropped because the archiver fell behind',
+              lambda: pipeline.debug_archiver.dropped)
+    Gauge('sign_hand_sessions', 'Open hand tracking sessions', lambda: len(hand_sessions.sessions))
+    for cache in (pipeline.payload_cache, pipeline.pose_cache):
+        if cache is not None:
+            Gauge(f'sign_{cache.name}_cache_bytes', f'Estimated memory held by the {cache.name} prediction cache',
+                  lambda cache=cache: cache.bytes)
+
+
+def handFider(img):
+    import HandTrackingModule as htm
+    detector = htm.handDetector(detectionCon = 0)
+    img = detector.findHands(img)
+    posList = detector.findPosition(img, draw=False)
+    while True:
+        img = detector.findHands(img)
+        posList = detector.findPosition(img, draw=False)
+        # print(posList)
+
+        # tips = [4, 8, 12, 16, 20]
+
+        if len(posList) != 0:
+            result = detect_hand_sign(posList)
+
+            cv2.rectangle(img, (28,255), (178, 425), (0, 225, 0), cv2.FILLED)
+            cv2.putText(img, str(result), (55,400), cv2.FONT_HERSHEY_COMPLEX,5, (255,0,0), 15)
+
+        cv2.imshow("Image", img)
+        cv2.waitKey(1)
+
+# Socket.IO and route handlers
+@app.route('/ready')
+def ready():
+    is_ready, report = readiness()
+    return jsonify({'ready': is_ready, 'resources': report}), 200 if is_ready else 503
+
+@app.route('/clients')
+def client_stats():
+    return jsonify(frame_coalescer.stats())
+
+@app.route('/metrics')
+def metrics():
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
+
+def admin_user():
+    """The admin user behind the request's `Authorization: Bearer <session token>`, else None"""
+    header = request.headers.get('Authorization', '')
+    if not header.startswith('Bearer '):
+        return None
+    try:
+        user = validate_session_token(header[len('Bearer '):])
+    except RuntimeError:
+        return None
+    return user if user and user.get('role') == 'admin' else None
+
+@app.route('/models')
+def model_status():
+    return jsonify(model_registry.status())
+
+@app.route('/models/activate', methods=['POST'])
+def activate_model():
+    """Load and warm `version` in the background, then swap it in (admin only)"""
+    if admin_user() is None:
+        return jsonify({'error': 'Admin session required'}), 403
+    version = (request.get_json(silent=True) or {}).get('version')
+    try:
+        model_registry.manifest(version)
+    except (KeyError, ValueError) as e:
+        return jsonify({'error': e.args[0]}), 404
+    if worker_pool is not None or cnn.status != 'ready':
+        # Not serving a model here (yet): the serving processes follow ACTIVE
+        model_registry.write_active(version)
+    elif not model_registry.activate(version):
+        return jsonify({'error': f'Model {model_registry.loading} is still loading'}), 409
+    return jsonify({'activating': version}), 202
+
+@app.route('/models/shadow', methods=['POST'])
+def shadow_model():
+    """Also run `percent` % of live batches on candidate `version`; percent 0 stops (admin only)
+
+    Agreement and latency against the active model are reported by /models.
+    """
+    if admin_user() is None:
+        return jsonify({'error': 'Admin session required'}), 403
+    if worker_pool is not None:
+        return jsonify({'error': 'Shadowing is only available with in-process inference'}), 503
+    data = request.get_json(silent=True) or {}
+    try:
+        percent = float(data.get('percent', 0))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'percent must be a number'}), 400
+    try:
+        started = cnn.get().shadow(data.get('version'), percent)
+    except (KeyError, ValueError) as e:
+        return jsonify({'error': e.args[0]}), 404
+    if not started:
+        return jsonify({'error': f'Model {model_registry.loading} is still loading'}), 409
+    return jsonify({'shadowing': data.get('version') if percent > 0 else None, 'percent': percent}), 202
+
+# Each clip holds its own MediaPipe tracker while it is processed
+clip_slots = threading.BoundedSemaphore(CLIP_MAX_CONCURRENT)
+
+@app.route('/predict-clip', methods=['POST'])
+def predict_clip():
+    """Per-frame timeline and collapsed letters for a `video` upload or a batch of image `files`
+
+    ?every=N keeps every Nth video frame; ?stream=1 streams NDJSON timeline
+    entries followed by a final summary line.
+    """
+    if pipeline is None:
+        return jsonify({'error': 'Clip prediction is only available with in-process inference'}), 503
+    video = request.files.get('video')
+    images = request.files.getlist('files')
+    if video is None and not images:
+        return jsonify({'error': 'Missing video or files'}), 400
+    try:
+        every = max(int(request.args.get('every', 1)), 1)
+    except ValueError:
+        return jsonify({'error': 'every must be an integer'}), 400
+    if not clip_slots.acquire(blocking=False):
+        return jsonify({'error': 'Too many clips in progress, try again later'}), 503
+
+    video_path = None
+    try:
+        if video is not None:
+            video_path = save_upload(video)
+            frames = iter_video_frames(video_path, every, CLIP_MAX_FRAMES)
+        else:
+            # Upload streams close with the request, before a streamed response is consumed
+            frames = iter_image_frames([image.read() for image in images[:CLIP_MAX_FRAMES]])
+        session = pipeline.hand_sessions.session_factory(f'clip-{uuid.uuid4().hex}')
+    except Exception:
+        clip_slots.release()
+        if video_path:
+            os.remove(video_path)
+        raise
+    predictor = ClipPredictor(batcher.submit, session, CLIP_WINDOW, pipeline.classify_landmarks)
+
+    def cleanup():
+        frames.close()
+        session.close()
+        if video_path:
+            os.remove(video_path)
+        clip_slots.release()
+
+    def results():
+        try:
+            yield from predictor.timeline(frames)
+        except Exception as e:
+            logger.error('Clip prediction failed: %s', e)
+            yield {'error': str(e)}
+        yield {'summary': predictor.summary()}
+
+    if request.args.get('stream', '0') in ('1', 'true'):
+        lines = (json.dumps(entry) + '\n' for entry in results())
+        response = Response(stream_with_context(lines), mimetype='application/x-ndjson')
+        # Runs even if the client disconnects before the stream is consumed
+        response.call_on_close(cleanup)
+        return response
+
+    try:
+        entries = list(results())
+    finally:
+        cleanup()
+    summary = entries.pop()['summary']
+    return jsonify({'timeline': entries, **summary})
+
+@socketio.on('connect')
+def handle_connect(auth=None):
+    client_id = request.sid
+    # Reconnecting clients present their session token instead of logging in again
+    try:
+        user = validate_session_token(auth['token']) if auth and auth.get('token') else None
+    except Exception as e:
+        # The user store is down or busy: refuse rather than connect half-authenticated
+        logger.warning('Session check for %s failed: %s', client_id, e)
+        raise ConnectionRefusedError('Authentication is unavailable, try again later')
+
+    connected_clients.add(client_id)
+    if pipeline is not None:
+        pipeline.hand_sessions.open(client_id)
+    if user:
+        client_users[client_id] = user['email']
+    logger.debug('Client connected: %s', client_id)
+    emit('connection_response', {'status': 'connected', 'authenticated': user is not None})
+
+@socketio.on('disconnect')
+def handle_disconnect():
+    client_id = request.sid
+    if client_id in connected_clients:
+        connected_clients.remove(client_id)
+    if pipeline is not None:
+        pipeline.close_client(client_id)
+        frame_coalescer.remove(client_id)
+    elif worker_pool.status == 'ready':
+        # No worker can hold state for the client before the pool is up; don't start or wait for it here
+        worker_pool.get().close_client(client_id)
+    client_users.pop(client_id, None)
+    logger.debug('Client disconnected: %s', client_id)
+
+@socketio.on('predict')
+def handle_prediction(data):
+    # Production mode: hand the frame to the worker pool, results are emitted by sid
+    if worker_pool is not None:
+        worker_pool.get().submit(request.sid, data)
+        return
+
+    # The client already has a frame in progress: park this one (latest wins)
+    client_id = request.sid
+    if not frame_coalescer.offer(client_id, data):
+        return
+
+    while data is not None:
+        try:
+            response, committed, timings = pipeline.process(client_id, data)
+        except Exception as e:
+            response, committed, timings = {'error': str(e)}, None, {}
+            logger.error('Prediction failed: %s', e)
+
+        # Pick up the newest frame that arrived while this one was processed
+        data = frame_coalescer.finish(client_id)
+        deliver_result(client_id, response, committed, timings)
+
+def report_ready():
+    logger.info("Server ready in %.2fs since import", time.perf_counter() - IMPORT_STARTED)
+
+if __name__ == '__main__':
+    SERVER_DEBUG = os.environ.get('SERVER_DEBUG', '1') == '1'
+    if not SERVER_DEBUG and not os.environ.get('SESSION_SECRET'):
+        # Replicas and restarts must agree on it, or clients' session tokens stop working
+        raise SystemExit('SESSION_SECRET must be set when SERVER_DEBUG=0')
+    logger.info("Starting server...")
+    load_all(background=FAST_STARTUP, on_ready=report_ready)
+    socketio.run(app, 
+                 host='0.0.0.0', 
+                 port=5000, 
+                 debug=SERVER_DEBUG, 
                  use_reloader=False)
\ No newline at end of file
@@ -0,0 +1,428 @@
+"""Offline benchmark for the sign-recognition hot path
+
+    python benchmark.py                                # synthetic frames, tracker and model
+    python benchmark.py --backend tflite --tracker mediapipe --clients 8
+    python benchmark.py --frames-dir samples/ --output before.json
+
+Runs each stage in isolation, the full per-frame pipeline, and the Socket.IO
+`predict` event with N concurrent simulated clients, then prints one JSON
+report (throughput, latency percentiles, peak RSS) that can be diffed across
+commits. The golden check compares the model input produced by the serving
+path with the original preprocess_image + prepare_for_model pipeline, bit for
+bit, and exits non-zero on any difference. Nothing needs a camera or the network: frames and hand landmarks are
+synthesized from a fixed seed unless --frames-dir is given.
+
+--backend synthetic stands in for the CNN with a fixed dense layer, so every
+stage except the real model forward pass can be measured without TensorFlow.
+"""
+import os
+
+# Serving settings that would skew measurements; set before the server modules import
+os.environ['INFERENCE_WORKERS'] = '0'
+os.environ.setdefault('RECORD_SESSIONS', '0')
+os.environ.setdefault('DEBUG_SAMPLE_RATE', '0')
+os.environ.setdefault('SOCKETIO_LOGGING', '0')
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+import argparse
+import hashlib
+import json
+import platform
+import resource
+import subprocess
+import sys
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from config.model_config import class_mapping, INFERENCE_BACKEND, MODEL_PATH, INFERENCE_THREADS
+from utils.frame_decoder import decode_frame
+from utils.golden_preprocessing import golden_crops, reference_model_input
+from utils.hand_signs import detect_hand_sign, landmarks_to_array
+from utils.model_registry import ModelVersion
+from utils.sign_preprocessing import (FramePreprocessor, IMG_SIZE, ModelInputBuffer, crop_hand_region,
+                                      normalize_batch, preprocess_image, prepare_for_model)
+from utils.stream_smoother import StreamState
+
+RESOLUTIONS = {'qvga': (320, 240), 'vga': (640, 480), 'hd': (1280, 720)}
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+# Open hand in a unit box (x right, y down), MediaPipe landmark order
+HAND_TEMPLATE = np.array([
+    (0.50, 1.00),
+    (0.35, 0.90), (0.25, 0.80), (0.18, 0.70), (0.12, 0.62),
+    (0.40, 0.60), (0.38, 0.45), (0.37, 0.35), (0.36, 0.25),
+    (0.50, 0.58), (0.50, 0.42), (0.50, 0.30), (0.50, 0.20),
+    (0.60, 0.60), (0.62, 0.46), (0.63, 0.36), (0.64, 0.28),
+    (0.70, 0.65), (0.73, 0.55), (0.75, 0.47), (0.77, 0.40),
+], dtype=np.float32)
+FINGERS = [(1, 2, 3, 4), (5, 6, 7, 8), (9, 10, 11, 12), (13, 14, 15, 16), (17, 18, 19, 20)]
+
+
+class Frame:
+    def __init__(self, resolution, image, payload, landmarks):
+        self.resolution = resolution
+        self.image = image
+        self.payload = payload  # `predict` event data, as the app sends it
+        self.landmarks = landmarks  # [[id, cx, cy], ...] or [] when there is no hand
+
+
+def synthetic_landmarks(rng, width, height):
+    """Randomly placed, scaled and curled hand as a [id, cx, cy] landmark list"""
+    points = HAND_TEMPLATE.copy()
+    for finger in FINGERS:
+        # Pull the joints toward the knuckle to fold some fingers
+        curl = rng.uniform(0, 0.8)
+        base = points[finger[0]]
+        for joint in finger[1:]:
+            points[joint] = points[joint] + (base - points[joint]) * curl
+    points += rng.normal(0, 0.01, points.shape)
+
+    size = rng.uniform(0.35, 0.6) * height
+    x0 = rng.uniform(0, width - size)
+    y0 = rng.uniform(0, height - size)
+    pixels = (points * size + (x0, y0)).astype(int)
+    return [[i, int(x), int(y)] for i, (x, y) in enumerate(pixels)]
+
+
+def draw_hand(image, landmarks):
+    points = np.array([(x, y) for _, x, y in landmarks], dtype=np.int32)
+    cv2.fillConvexPoly(image, cv2.convexHull(points[[0, 1, 5, 9, 13, 17]]), (120, 160, 210))
+    thickness = max(int(np.ptp(points[:, 1]) / 12), 2)
+    for finger in FINGERS:
+        chain = points[[0] + list(finger)]
+        cv2.polylines(image, [chain], False, (120, 160, 210), thickness)
+
+
+def synthesize_corpus(rng, resolutions, frames_per_resolution, hand_ratio=0.75):
+    frames = []
+    for name in resolutions:
+        width, height = RESOLUTIONS[name]
+        for _ in range(frames_per_resolution):
+            # Smooth noisy background so JPEG sizes resemble camera frames
+            image = cv2.resize(rng.integers(0, 256, (height // 8, width // 8, 3), dtype=np.uint8),
+                               (width, height), interpolation=cv2.INTER_LINEAR)
+            landmarks = []
+            if rng.random() < hand_ratio:
+                landmarks = synthetic_landmarks(rng, width, height)
+                draw_hand(image, landmarks)
+            ok, encoded = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, 80])
+            frames.append(Frame(name, image, {'image': encoded.tobytes(), 'format': 'jpeg'}, landmarks))
+    return frames
+
+
+def load_corpus(directory, tracker_factory):
+    """Real frames from disk, with landmarks from the chosen tracker"""
+    paths = sorted(os.path.join(root, f) for root, _, files in os.walk(directory)
+                   for f in files if f.lower().endswith(IMAGE_EXTENSIONS))
+    tracker = tracker_factory('corpus')
+    frames = []
+    for path in paths:
+        with open(path, 'rb') as f:
+            payload = {'image': f.read(), 'format': 'png' if path.lower().endswith('.png') else 'jpeg'}
+        try:
+            image = decode_frame(payload)
+        except ValueError:
+            continue
+        height, width = image.shape[:2]
+        frames.append(Frame(f'{width}x{height}', image, payload, tracker.find_position(image)))
+    tracker.close()
+    return frames
+
+
+def frame_key(image):
+    return hashlib.blake2b(np.ascontiguousarray(image[::16, ::16]).tobytes(), digest_size=16).digest()
+
+
+class SyntheticHandSession:
+    """Stands in for HandSession: returns the landmarks the corpus frame was drawn with"""
+
+    def __init__(self, client_id, landmarks_by_frame, stream_factory=StreamState):
+        self.client_id = client_id
+        self.landmarks_by_frame = landmarks_by_frame
+        self.stream = stream_factory()
+        self.last_used = time.monotonic()
+
+    def find_position(self, image):
+        self.last_used = time.monotonic()
+        return self.landmarks_by_frame.get(frame_key(image), [])
+
+    def close(self):
+        pass
+
+
+class SyntheticModel:
+    """Fixed dense layer with the CNN's input and output shapes"""
+
+    name = 'synthetic'
+    model_path = None
+
+    def __init__(self, seed=0):
+        features = IMG_SIZE[0] * IMG_SIZE[1]
+        rng = np.random.default_rng(seed)
+        self.weights = rng.normal(0, 0.01, (features, len(class_mapping))).astype(np.float32)
+
+    def predict(self, batch):
+        logits = batch.reshape(len(batch), -1) @ self.weights
+        exp = np.exp(logits - logits.max(axis=1, keepdims=True))
+        return exp / exp.sum(axis=1, keepdims=True)
+
+
+def load_model(name):
+    if name == 'synthetic':
+        return SyntheticModel()
+    from utils.inference_backends import load_backend
+    return load_backend(name, MODEL_PATH, INFERENCE_THREADS)
+
+
+def single_frame_predict(model):
+    """SignPipeline predict_fn running one frame per forward pass, as a worker process does"""
+    model_inputs = ModelInputBuffer(1)
+    version = ModelVersion(model.name, model)
+    return lambda model_pixels: (model.predict(model_inputs([model_pixels]))[0], version)
+
+
+def check_preprocessing(frames, seed, batch_size=16):
+    """Bitwise comparison of every serving preprocessing path against reference_model_input"""
+    crops = golden_crops(seed, [crop_hand_region(frame.image, landmarks_to_array(frame.landmarks))
+                                for frame in frames if frame.landmarks])
+
+    expected = [reference_model_input(crop) for crop in crops]
+    mismatches = 0
+    pixels = []
+    preprocessor = FramePreprocessor()
+    for crop, reference in zip(crops, expected):
+        mismatches += not np.array_equal(prepare_for_model(preprocess_image(crop)), reference)
+        model_pixels = preprocessor.model_pixels(crop)[1]
+        mismatches += not np.array_equal(normalize_batch(model_pixels[np.newaxis])[0], reference)
+        pixels.append(model_pixels.copy())
+
+    model_inputs = ModelInputBuffer(batch_size)
+    for start in range(0, len(pixels), batch_size):
+        batch = model_inputs(pixels[start:start + batch_size])
+        mismatches += sum(not np.array_equal(row, reference)
+                          for row, reference in zip(batch, expected[start:start + batch_size]))
+    return [{'name': 'golden_preprocessing', 'crops': len(crops), 'mismatches': int(mismatches)}]
+
+
+def peak_rss_mb():
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def summarize(name, latencies, wall_seconds, **extra):
+    latencies = np.asarray(latencies) * 1000
+    result = {'name': name, **extra, 'iterations': int(len(latencies))}
+    if len(latencies):
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+        result.update({
+            'throughput_per_s': round(len(latencies) / wall_seconds, 1) if wall_seconds > 0 else None,
+            'mean_ms': round(float(latencies.mean()), 3),
+            'p50_ms': round(float(p50), 3),
+            'p95_ms': round(float(p95), 3),
+            'p99_ms': round(float(p99), 3),
+        })
+    result['peak_rss_mb'] = peak_rss_mb()
+    return result
+
+
+def time_calls(fn, inputs, iterations, warmup=5):
+    """Run fn over inputs round-robin; returns (per-call latencies, wall seconds)"""
+    for i in range(min(warmup, iterations)):
+        fn(inputs[i % len(inputs)])
+    latencies = []
+    started = time.perf_counter()
+    for i in range(iterations):
+        call_started = time.perf_counter()
+        fn(inputs[i % len(inputs)])
+        latencies.append(time.perf_counter() - call_started)
+    return latencies, time.perf_counter() - started
+
+
+def bench_stages(frames, model, iterations):
+    from utils.sign_pipeline import SignPipeline
+
+    pipeline = SignPipeline(single_frame_predict(model), None)
+    preprocessor = FramePreprocessor()
+    model_inputs = ModelInputBuffer(16)
+    results = []
+    for resolution in sorted({frame.resolution for frame in frames}):
+        group = [frame for frame in frames if frame.resolution == resolution]
+        with_hand = [frame for frame in group if frame.landmarks]
+        crops = [crop_hand_region(frame.image, landmarks_to_array(frame.landmarks)) for frame in with_hand]
+        processed = [preprocess_image(crop) for crop in crops]
+        batches = [[preprocessor.model_pixels(crop)[1].copy() for crop in crops[:16]]] if crops else []
+
+        stages = [
+            ('decode', decode_frame, [frame.payload for frame in group], None),
+            ('detect_hand_sign', detect_hand_sign, [frame.landmarks for frame in group], None),
+            ('crop_hand_region', lambda frame: crop_hand_region(frame.image, landmarks_to_array(frame.landmarks)),
+             with_hand, True),
+            ('preprocess_image', preprocess_image, crops, True),
+            ('prepare_for_model', prepare_for_model, processed, True),
+            ('model_pixels', preprocessor.model_pixels, crops, True),
+            ('model_input_batch', model_inputs, batches, True),
+            ('predict_sign_language', pipeline.predict_sign_language, crops, True),
+        ]
+        for name, fn, inputs, hand in stages:
+            if not inputs:
+                continue
+            latencies, wall = time_calls(fn, inputs, iterations)
+            results.append(summarize(name, latencies, wall, resolution=resolution, hand=hand))
+    return results
+
+
+def bench_pipeline(frames, model, session_factory, iterations):
+    """SignPipeline.process end to end for one client, per resolution"""
+    from utils.hand_sessions import HandSessionPool
+    from utils.sign_pipeline import SignPipeline
+
+    results = []
+    for resolution in sorted({frame.resolution for frame in frames}):
+        group = [frame for frame in frames if frame.resolution == resolution]
+        pipeline = SignPipeline(single_frame_predict(model), HandSessionPool(session_factory=session_factory))
+        latencies, wall = time_calls(lambda frame: pipeline.process('bench', frame.payload), group, iterations)
+        results.append(summarize('pipeline', latencies, wall, resolution=resolution))
+        pipeline.hand_sessions.close('bench')
+    return results
+
+
+def bench_socketio(frames, model, session_factory, clients, frames_per_client):
+    """Drive the real `predict` handler from N concurrent Socket.IO test clients"""
+    import app as server
+
+    server.model_registry.install(ModelVersion(model.name, model))
+    server.cnn.set(server.model_registry)
+    server.hand_sessions.session_factory = session_factory
+    test_clients = [server.socketio.test_client(server.app) for _ in range(clients)]
+
+    latencies = [[] for _ in range(clients)]
+    barrier = threading.Barrier(clients + 1)
+
+    def run_client(index):
+        client = test_clients[index]
+        barrier.wait()
+        for i in range(frames_per_client):
+            frame = frames[(index * 7 + i) % len(frames)]
+            started = time.perf_counter()
+            # The threading-mode test client runs the handler in this thread, so the
+            # emit returns once the frame has been processed and its result emitted
+            client.emit('predict', frame.payload)
+            latencies[index].append(time.perf_counter() - started)
+
+    threads = [threading.Thread(target=run_client, args=(i,)) for i in range(clients)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+
+    responses = hands = errors = 0
+    for client in test_clients:
+        for packet in client.get_received():
+            if packet['name'] == 'prediction_response':
+                response = packet['args'][0]
+                responses += 1
+                hands += response.get('hand_detected', False)
+                errors += 'error' in response
+        client.disconnect()
+
+    all_latencies = [latency for per_client in latencies for latency in per_client]
+    return [summarize('socketio_predict', all_latencies, wall, clients=clients,
+                      responses=responses, hands_detected=hands, errors=errors)]
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--backend', choices=['synthetic', 'keras', 'tflite', 'onnx'], default='synthetic',
+                        help=f'Model backend (the server is configured for {INFERENCE_BACKEND})')
+    parser.add_argument('--tracker', choices=['synthetic', 'mediapipe'], default='synthetic')
+    parser.add_argument('--frames-dir', help='Benchmark these images instead of synthetic frames')
+    parser.add_argument('--resolutions', default='qvga,vga,hd', help=f"Any of {','.join(RESOLUTIONS)}")
+    parser.add_argument('--frames', type=int, default=32, help='Synthetic frames per resolution')
+    parser.add_argument('--iterations', type=int, default=200, help='Timed calls per stage')
+    parser.add_argument('--clients', type=int, default=4, help='Concurrent Socket.IO clients')
+    parser.add_argument('--frames-per-client', type=int, default=100)
+    parser.add_argument('--skip', default='',
+                        help='Comma-separated sections to skip: golden,stages,pipeline,socketio')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='Write the JSON report here instead of stdout')
+    args = parser.parse_args()
+
+    if args.tracker == 'mediapipe':
+        from utils.sign_pipeline import build_hand_sessions
+        session_factory = build_hand_sessions().session_factory
+    else:
+        session_factory = None
+
+    if args.frames_dir:
+        if session_factory is None:
+            parser.error('--frames-dir needs --tracker mediapipe to find hand landmarks')
+        frames = load_corpus(args.frames_dir, session_factory)
+    else:
+        resolutions = [name for name in args.resolutions.split(',') if name]
+        unknown = set(resolutions) - set(RESOLUTIONS)
+        if unknown:
+            parser.error(f"Unknown resolutions: {', '.join(sorted(unknown))}")
+        frames = synthesize_corpus(np.random.default_rng(args.seed), resolutions, args.frames)
+    if not frames:
+        parser.error('No frames to benchmark')
+
+    if session_factory is None:
+        landmarks_by_frame = {frame_key(decode_frame(frame.payload)): frame.landmarks for frame in frames}
+        session_factory = lambda client_id: SyntheticHandSession(client_id, landmarks_by_frame)
+
+    model = load_model(args.backend)
+    skip = set(args.skip.split(','))
+    results = []
+    if 'golden' not in skip:
+        results += check_preprocessing(frames, args.seed)
+    if 'stages' not in skip:
+        results += bench_stages(frames, model, args.iterations)
+    if 'pipeline' not in skip:
+        results += bench_pipeline(frames, model, session_factory, args.iterations)
+    if 'socketio' not in skip:
+        results += bench_socketio(frames, model, session_factory, args.clients, args.frames_per_client)
+
+    report = {
+        'meta': {
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'opencv': cv2.__version__,
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+            'cpus': os.cpu_count(),
+            'backend': args.backend,
+            'tracker': args.tracker,
+            'seed': args.seed,
+            'frames': len(frames),
+            'hand_frames': sum(1 for frame in frames if frame.landmarks),
+        },
+        'results': results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+    if any(result.get('mismatches') for result in results):
+        sys.exit('Preprocessing output differs from the reference pipeline')
+
+
+if __name__ == '__main__':
+    main()
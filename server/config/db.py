@@ -1,11 +1,88 @@
-# config/db.py
-import firebase_admin
-from firebase_admin import credentials, firestore
-
-cred = credentials.Certificate('config/firebase_key.json')
-firebase_admin.initialize_app(cred)
-
-db = firestore.client()
-
-def get_firestore_db():
-    return db
+# config/db.py
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+# Firebase is initialized on first use so importing the app stays fast
+db = None
+_db_lock = threading.Lock()
+
+def get_firestore_db():
+    global db
+    if db is None:
+        with _db_lock:
+            if db is None:
+                import firebase_admin
+                from firebase_admin import credentials, firestore
+
+                cred = credentials.Certificate('config/firebase_key.json')
+                firebase_admin.initialize_app(cred)
+                db = firestore.client()
+    return db
+
+# SQLite store for signature corrections
+CORRECTIONS_DB_PATH = 'signature_corrections.db'
+CORRECTIONS_INDEX_PATH = 'signature_corrections.fuzzy'
+# Request handlers run on short-lived threads, so connections are pooled rather than per thread
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 4))
+DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', 5))
+
+
+class ConnectionPool:
+    """Up to `size` long-lived WAL-mode connections, checked out for one use at a time"""
+
+    def __init__(self, path, size=DB_POOL_SIZE, timeout=DB_POOL_TIMEOUT):
+        self.path = path
+        self.size = size
+        self.timeout = timeout
+        self.opened = 0
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+
+    def _open(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        # WAL lets readers in other threads/processes run alongside a writer
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    def _checkout(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            grow = self.opened < self.size
+            if grow:
+                self.opened += 1
+        if not grow:
+            try:
+                return self._idle.get(timeout=self.timeout)
+            except queue.Empty:
+                raise RuntimeError('Database is busy, try again later')
+        try:
+            return self._open()
+        except Exception:
+            with self._lock:
+                self.opened -= 1
+            raise
+
+    @contextmanager
+    def connection(self):
+        conn = self._checkout()
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            self._idle.put(conn)
+
+
+_corrections_pool = ConnectionPool(CORRECTIONS_DB_PATH)
+
+def get_db_connection():
+    """Check out a corrections DB connection: `with get_db_connection() as conn:`"""
+    return _corrections_pool.connection()
@@ -0,0 +1,95 @@
+# config/model_config.py
+import os
+
+# Class mapping
+class_mapping = {
+    0: '0', 1: 'A', 2: 'B', 3: 'C', 4: 'D', 5: 'E', 
+    6: 'F', 7: 'G', 8: 'H', 9: 'I', 10: 'J',
+    11: 'K', 12: 'L', 13: 'M', 14: 'N', 15: 'O',
+    16: 'P', 17: 'Q', 18: 'R', 19: 'S', 20: 'T',
+    21: 'U', 22: 'V', 23: 'W', 24: 'X', 25: 'Y', 26: 'Z'
+}
+
+AMBIGUOUS_GROUPS = [
+    {'M', 'N', 'T'},
+    {'D', 'I'},
+    {'V', 'U'},
+]
+
+CONFIDENCE_THRESHOLD = 0.7
+
+# Inference backend: keras (.h5), tflite or onnx (see export_model.py)
+INFERENCE_BACKEND = os.environ.get('INFERENCE_BACKEND', 'keras')
+MODEL_PATH = os.environ.get('MODEL_PATH')
+INFERENCE_THREADS = int(os.environ.get('INFERENCE_THREADS', 0)) or None
+
+# MediaPipe: one tracking session per connected client
+HAND_SESSION_LIMIT = int(os.environ.get('HAND_SESSION_LIMIT', 64))
+HAND_SESSION_IDLE_TIMEOUT = float(os.environ.get('HAND_SESSION_IDLE_TIMEOUT', 120))
+
+# Streaming stage: reuse CNN results while the pose is unchanged and smooth letters
+STREAM_MOTION_THRESHOLD = float(os.environ.get('STREAM_MOTION_THRESHOLD', 0.03))
+STREAM_MAX_REUSE_AGE = float(os.environ.get('STREAM_MAX_REUSE_AGE', 2.0))
+STREAM_WINDOW = int(os.environ.get('STREAM_WINDOW', 5))
+STREAM_COMMIT_FRAMES = int(os.environ.get('STREAM_COMMIT_FRAMES', 3))
+
+# Micro-batching limits for the shared inference scheduler (in-process serving only, see INFERENCE_WORKERS)
+BATCH_MAX_SIZE = int(os.environ.get('BATCH_MAX_SIZE', 16))
+BATCH_MAX_WAIT_MS = float(os.environ.get('BATCH_MAX_WAIT_MS', 5))
+BATCH_QUEUE_SIZE = int(os.environ.get('BATCH_QUEUE_SIZE', 256))
+
+# Sampled debug frame archive (DEBUG_SAMPLE_RATE=0 turns it off)
+DEBUG_ARCHIVE_DIR = os.environ.get('DEBUG_ARCHIVE_DIR', 'debug')
+DEBUG_SAMPLE_RATE = float(os.environ.get('DEBUG_SAMPLE_RATE', 0.1))
+DEBUG_UNCERTAIN_ONLY = os.environ.get('DEBUG_UNCERTAIN_ONLY', '1') == '1'
+DEBUG_SHARD_MAX_MB = int(os.environ.get('DEBUG_SHARD_MAX_MB', 64))
+DEBUG_SHARD_MAX_AGE = float(os.environ.get('DEBUG_SHARD_MAX_AGE', 3600))
+DEBUG_MAX_SHARDS = int(os.environ.get('DEBUG_MAX_SHARDS', 20))
+
+# Session recordings for offline re-scoring (rescore.py); off unless RECORD_SESSIONS=1
+RECORD_SESSIONS = os.environ.get('RECORD_SESSIONS', '0') == '1'
+RECORD_DIR = os.environ.get('RECORD_DIR', 'recordings')
+RECORD_CHUNK_FRAMES = int(os.environ.get('RECORD_CHUNK_FRAMES', 256))
+RECORD_MAX_MB = int(os.environ.get('RECORD_MAX_MB', 1024))
+
+# Production mode: run inference in this many worker processes (0 = in-process).
+# Trade-off: a worker runs its clients' frames one at a time, each as its own
+# batch of 1, so the BATCH_* micro-batching across clients only applies in-process.
+# Workers scale with cores and isolate crashes; in-process batching gets more out
+# of one model, which matters most for GPU or large models with few cores
+INFERENCE_WORKERS = int(os.environ.get('INFERENCE_WORKERS', 0))
+# Versioned models (see utils/model_registry.py): MODEL_REGISTRY_DIR/<version>/manifest.json,
+# with MODEL_REGISTRY_DIR/ACTIVE naming the served version; every process re-reads ACTIVE
+# every MODEL_WATCH_INTERVAL seconds (0 = only at startup)
+MODEL_REGISTRY_DIR = os.environ.get('MODEL_REGISTRY_DIR', 'AI-Model/registry')
+MODEL_WATCH_INTERVAL = float(os.environ.get('MODEL_WATCH_INTERVAL', 5))
+# Prefork: load the weights once in a clean fork server and fork the workers from it so
+# they share one physical copy (tflite/onnx; keras models are still loaded per worker)
+INFERENCE_PREFORK = os.environ.get('INFERENCE_PREFORK', '0') == '1'
+
+# Landmark-first cascade (train_landmarks.py): the landmark classifier answers on its own
+# when it is at least CASCADE_MIN_CONFIDENCE sure and, with CASCADE_AMBIGUOUS_TO_CNN=1,
+# its letter is not in AMBIGUOUS_GROUPS; everything else goes on to the CNN
+LANDMARK_MODEL_PATH = os.environ.get('LANDMARK_MODEL_PATH', 'AI-Model/landmark_classifier.npz')
+CASCADE_ENABLED = os.environ.get('CASCADE_ENABLED', '1') == '1'
+CASCADE_MIN_CONFIDENCE = float(os.environ.get('CASCADE_MIN_CONFIDENCE', 0.9))
+CASCADE_AMBIGUOUS_TO_CNN = os.environ.get('CASCADE_AMBIGUOUS_TO_CNN', '1') == '1'
+
+# Prediction cache shared by all clients: exact payload hashes skip decoding and
+# tracking, landmark signatures snapped to a grid of PREDICTION_CACHE_POSE_STEP hand
+# sizes skip the CNN (coarser grids hit more often but merge more distinct poses; 0
+# turns that key off). Entries live for PREDICTION_CACHE_TTL seconds;
+# PREDICTION_CACHE_MB=0 turns the cache off
+PREDICTION_CACHE_MB = float(os.environ.get('PREDICTION_CACHE_MB', 32))
+PREDICTION_CACHE_TTL = float(os.environ.get('PREDICTION_CACHE_TTL', 30))
+PREDICTION_CACHE_POSE_STEP = float(os.environ.get('PREDICTION_CACHE_POSE_STEP', 0.05))
+
+# REST clip/image-batch prediction: frame cap per request, frames per CNN window
+# and how many clips may be tracked at once
+CLIP_MAX_FRAMES = int(os.environ.get('CLIP_MAX_FRAMES', 1800))
+CLIP_WINDOW = int(os.environ.get('CLIP_WINDOW', 32))
+CLIP_MAX_CONCURRENT = int(os.environ.get('CLIP_MAX_CONCURRENT', 2))
+
+# Bounds for the capture interval advised to clients in `throttle` events
+THROTTLE_MIN_INTERVAL_MS = int(os.environ.get('THROTTLE_MIN_INTERVAL_MS', 200))
+THROTTLE_MAX_INTERVAL_MS = int(os.environ.get('THROTTLE_MAX_INTERVAL_MS', 5000))
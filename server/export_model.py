@@ -0,0 +1,161 @@
+"""Export the Keras ASL model to an optimized CPU format and check accuracy parity
+
+    python export_model.py --format tflite --quantize int8 --calibration-dir samples/
+    python export_model.py --format onnx --check labelled/
+
+A labelled set is a directory with one sub-directory per letter (A/, B/, ...)
+holding hand-crop images.
+"""
+import argparse
+import os
+import time
+
+import cv2
+import numpy as np
+
+from config.model_config import class_mapping
+from utils.inference_backends import DEFAULT_MODEL_PATHS, load_backend
+from utils.sign_preprocessing import IMG_SIZE, preprocess_image, prepare_for_model
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+
+def load_model_inputs(paths):
+    """Run images through the same preprocessing as the server"""
+    inputs = []
+    for path in paths:
+        image = cv2.imread(path)
+        if image is not None:
+            inputs.append(prepare_for_model(preprocess_image(image)))
+    return np.stack(inputs) if inputs else np.zeros((0,) + IMG_SIZE + (1,), np.float32)
+
+
+def list_images(directory):
+    return sorted(os.path.join(root, f)
+                  for root, _, files in os.walk(directory)
+                  for f in files if f.lower().endswith(IMAGE_EXTENSIONS))
+
+
+def load_labelled_set(directory, class_mapping):
+    letter_to_class = {letter: idx for idx, letter in class_mapping.items()}
+    paths, labels = [], []
+    for letter in sorted(os.listdir(directory)):
+        if letter not in letter_to_class:
+            continue
+        for path in list_images(os.path.join(directory, letter)):
+            paths.append(path)
+            labels.append(letter_to_class[letter])
+    return paths, np.array(labels)
+
+
+def calibration_batches(directory, limit=200):
+    """Representative dataset generator for int8 calibration"""
+    inputs = load_model_inputs(list_images(directory)[:limit])
+    if len(inputs) == 0:
+        raise ValueError(f'No calibration images found in {directory}')
+    for model_input in inputs:
+        yield [model_input[np.newaxis]]
+
+
+def export_tflite(keras_model, output, quantize, calibration_dir):
+    import tensorflow as tf
+    converter = tf.lite.TFLiteConverter.from_keras_model(keras_model)
+    if quantize != 'none':
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    if quantize == 'float16':
+        converter.target_spec.supported_types = [tf.float16]
+    elif quantize == 'int8':
+        # Full-integer kernels; model inputs/outputs stay float32
+        converter.representative_dataset = lambda: calibration_batches(calibration_dir)
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+    with open(output, 'wb') as f:
+        f.write(converter.convert())
+
+
+def export_onnx(keras_model, output, quantize, calibration_dir):
+    import tensorflow as tf
+    import tf2onnx
+
+    spec = (tf.TensorSpec((None,) + IMG_SIZE + (1,), tf.float32, name='input'),)
+    float_path = output if quantize == 'none' else output + '.float32'
+    tf2onnx.convert.from_keras(keras_model, input_signature=spec, opset=13, output_path=float_path)
+
+    if quantize == 'float16':
+        import onnx
+        from onnxconverter_common import float16
+        model = float16.convert_float_to_float16(onnx.load(float_path), keep_io_types=True)
+        onnx.save(model, output)
+    elif quantize == 'int8':
+        from onnxruntime.quantization import CalibrationDataReader, QuantType, quantize_static
+
+        class Reader(CalibrationDataReader):
+            def __init__(self):
+                self.batches = iter(calibration_batches(calibration_dir))
+
+            def get_next(self):
+                batch = next(self.batches, None)
+                return {'input': batch[0]} if batch is not None else None
+
+        quantize_static(float_path, output, Reader(), weight_type=QuantType.QInt8)
+
+    if float_path != output:
+        os.remove(float_path)
+
+
+def check_parity(reference, candidate, labelled_dir, class_mapping, batch_size=64):
+    """Compare accuracy and agreement of two backends over a labelled set"""
+    paths, labels = load_labelled_set(labelled_dir, class_mapping)
+    inputs = load_model_inputs(paths)
+    if len(inputs) == 0:
+        raise ValueError(f'No labelled images found in {labelled_dir}')
+
+    report = {'samples': len(inputs)}
+    predictions = {}
+    for backend in (reference, candidate):
+        start = time.perf_counter()
+        probs = np.concatenate([backend.predict(inputs[i:i + batch_size])
+                                for i in range(0, len(inputs), batch_size)])
+        elapsed = time.perf_counter() - start
+        predictions[backend.name] = probs
+        report[backend.name] = {
+            'accuracy': float(np.mean(probs.argmax(axis=1) == labels)),
+            'ms_per_frame': 1000 * elapsed / len(inputs),
+        }
+
+    ref, cand = predictions[reference.name], predictions[candidate.name]
+    report['agreement'] = float(np.mean(ref.argmax(axis=1) == cand.argmax(axis=1)))
+    report['max_abs_prob_diff'] = float(np.abs(ref - cand).max())
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--model', default=DEFAULT_MODEL_PATHS['keras'])
+    parser.add_argument('--format', choices=['tflite', 'onnx'], default='tflite')
+    parser.add_argument('--quantize', choices=['none', 'float16', 'int8'], default='none')
+    parser.add_argument('--calibration-dir', help='Sample frames used to calibrate int8 quantization')
+    parser.add_argument('--output', help='Defaults to the backend path used by the server')
+    parser.add_argument('--check', metavar='LABELLED_DIR', help='Run an accuracy-parity check after export')
+    parser.add_argument('--skip-export', action='store_true', help='Only check an already exported model')
+    parser.add_argument('--threads', type=int, default=None)
+    args = parser.parse_args()
+
+    if args.quantize == 'int8' and not args.calibration_dir and not args.skip_export:
+        parser.error('--quantize int8 needs --calibration-dir')
+
+    output = args.output or DEFAULT_MODEL_PATHS[args.format]
+    reference = load_backend('keras', args.model, args.threads)
+    if not args.skip_export:
+        exporter = export_tflite if args.format == 'tflite' else export_onnx
+        exporter(reference.model, output, args.quantize, args.calibration_dir)
+        print(f"Exported {args.model} -> {output} ({args.format}, quantize={args.quantize})")
+
+    if args.check:
+        candidate = load_backend(args.format, output, args.threads)
+        report = check_parity(reference, candidate, args.check, class_mapping)
+        for key, value in report.items():
+            print(f"{key}: {value}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,18 +1,134 @@
-from config.db import get_db_connection
-
-def get_corrected_name(predicted_text):
-    conn = get_db_connection()
-    cursor = conn.execute(
-        'SELECT corrected_name FROM signature_corrections WHERE predicted_text = ?', 
-        (predicted_text,))
-    row = cursor.fetchone()
-    conn.close()
-    return row['corrected_name'] if row else None
-
-def save_corrected_name(predicted_text, corrected_name):
-    conn = get_db_connection()
-    conn.execute(
-        'INSERT OR REPLACE INTO signature_corrections (predicted_text, corrected_name) VALUES (?, ?)', 
-        (predicted_text, corrected_name))
-    conn.commit()
-    conn.close()
+import atexit
+import os
+import threading
+from collections import OrderedDict
+
+from config.db import CORRECTIONS_INDEX_PATH, get_db_connection
+from utils.fuzzy_index import FuzzyIndex
+from utils.lazy_loader import LazyResource
+
+# SQLite caps bound parameters per statement; bulk lookups are chunked below it
+MAX_QUERY_PARAMS = 500
+CACHE_SIZE = 10000
+
+# Near-miss OCR output is resolved through the fuzzy index within this edit distance
+FUZZY_MAX_DISTANCE = int(os.environ.get('FUZZY_MAX_DISTANCE', 2))
+FUZZY_PREFIX_LENGTH = int(os.environ.get('FUZZY_PREFIX_LENGTH', 6))
+
+_MISSING = object()
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _cache_get(predicted_text):
+    with _cache_lock:
+        value = _cache.get(predicted_text, _MISSING)
+        if value is not _MISSING:
+            _cache.move_to_end(predicted_text)
+        return value
+
+
+def _cache_put(predicted_text, corrected_name):
+    # Unknown texts are cached as None so repeated misses skip the query too
+    with _cache_lock:
+        _cache[predicted_text] = corrected_name
+        _cache.move_to_end(predicted_text)
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+
+
+def clear_cache():
+    with _cache_lock:
+        _cache.clear()
+
+
+def _table_signature(conn):
+    # INSERT OR REPLACE always allocates a new rowid, so this changes on every write
+    row = conn.execute('SELECT COUNT(*), COALESCE(MAX(rowid), 0) FROM signature_corrections').fetchone()
+    return tuple(row)
+
+
+def load_fuzzy_index():
+    """Load the saved fuzzy index, rebuilding it if the table changed since it was saved"""
+    with get_db_connection() as conn:
+        signature = _table_signature(conn)
+        index = FuzzyIndex.load(CORRECTIONS_INDEX_PATH, FUZZY_MAX_DISTANCE, FUZZY_PREFIX_LENGTH)
+        if index is None or index.signature != signature:
+            index = FuzzyIndex(FUZZY_MAX_DISTANCE, FUZZY_PREFIX_LENGTH)
+            index.add_many(conn.execute('SELECT predicted_text, corrected_name FROM signature_corrections'))
+            index.signature = signature
+            index.save(CORRECTIONS_INDEX_PATH)
+    return index
+
+
+fuzzy_index = LazyResource('corrections_index', load_fuzzy_index, required=False)
+_index_dirty = False
+
+
+@atexit.register
+def save_fuzzy_index():
+    """Persist incremental index updates so the next start skips the rebuild"""
+    if _index_dirty and fuzzy_index.status == 'ready':
+        index = fuzzy_index.get()
+        with get_db_connection() as conn:
+            index.signature = _table_signature(conn)
+        index.save(CORRECTIONS_INDEX_PATH)
+
+
+def get_corrected_name(predicted_text):
+    return get_corrected_names([predicted_text])[predicted_text]
+
+def get_corrected_names(predicted_texts):
+    """Resolve many texts at once; returns {predicted_text: corrected_name or None}"""
+    results = {}
+    misses = []
+    for text in dict.fromkeys(predicted_texts):
+        cached = _cache_get(text)
+        if cached is _MISSING:
+            misses.append(text)
+        else:
+            results[text] = cached
+
+    unresolved = []
+    if misses:
+        with get_db_connection() as conn:
+            for start in range(0, len(misses), MAX_QUERY_PARAMS):
+                chunk = misses[start:start + MAX_QUERY_PARAMS]
+                placeholders = ','.join('?' * len(chunk))
+                cursor = conn.execute(
+                    f'SELECT predicted_text, corrected_name FROM signature_corrections WHERE predicted_text IN ({placeholders})',
+                    chunk)
+                found = {row['predicted_text']: row['corrected_name'] for row in cursor}
+                unresolved.extend(text for text in chunk if text not in found)
+                results.update(found)
+
+    # Texts with no exact row fall back to the closest stored correction
+    if unresolved and FUZZY_MAX_DISTANCE > 0:
+        index = fuzzy_index.get()
+        for text in unresolved:
+            match = index.lookup(text)
+            results[text] = match[1] if match else None
+    else:
+        results.update(dict.fromkeys(unresolved))
+
+    for text in misses:
+        _cache_put(text, results[text])
+    return results
+
+def save_corrected_name(predicted_text, corrected_name):
+    save_corrected_names([(predicted_text, corrected_name)])
+
+def save_corrected_names(pairs):
+    """Upsert many (predicted_text, corrected_name) pairs in one transaction"""
+    global _index_dirty
+    pairs = list(pairs)
+    with get_db_connection() as conn, conn:
+        conn.executemany(
+            'INSERT OR REPLACE INTO signature_corrections (predicted_text, corrected_name) VALUES (?, ?)', 
+            pairs)
+
+    if fuzzy_index.status == 'ready':
+        fuzzy_index.get().add_many(pairs)
+        _index_dirty = True
+    # A new key can change fuzzy answers for other texts, so drop every cached answer
+    clear_cache()
@@ -1,41 +1,142 @@
-from config.db import get_firestore_db
-from werkzeug.security import generate_password_hash, check_password_hash
-from datetime import datetime
-
-db = get_firestore_db()
-users_collection = db.collection('users')
-
-def create_user(name, email, password, role='user'):
-    password_hash = generate_password_hash(password)
-    created_at = datetime.utcnow().isoformat()
-
-    user_data = {
-        'name': name,
-        'email': email,
-        'password_hash': password_hash,
-        'role': role,
-        'created_at': created_at
-    }
-
-    # Use email as unique document ID or auto-ID
-    users_collection.document(email).set(user_data)
-
-def get_user_by_email(email):
-    doc = users_collection.document(email).get()
-    if doc.exists:
-        return doc.to_dict()
-    return None
-
-def update_user(email, name, role):
-    doc_ref = users_collection.document(email)
-    if doc_ref.get().exists:
-        doc_ref.update({
-            'name': name,
-            'role': role
-        })
-
-def validate_login(email, password):
-    user = get_user_by_email(email)
-    if user and check_password_hash(user['password_hash'], password):
-        return user
-    return None
+from models.user_store import get_user_store
+from werkzeug.security import generate_password_hash, check_password_hash
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from functools import lru_cache
+import logging
+import os
+import secrets
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Short-lived cache of user records; unknown emails are cached for less time
+USER_CACHE_TTL = float(os.environ.get('USER_CACHE_TTL', 30))
+USER_NEGATIVE_CACHE_TTL = float(os.environ.get('USER_NEGATIVE_CACHE_TTL', 5))
+
+# Password hashing is CPU-heavy, so it runs on a small bounded pool
+AUTH_HASH_WORKERS = int(os.environ.get('AUTH_HASH_WORKERS', 2))
+AUTH_HASH_QUEUE = int(os.environ.get('AUTH_HASH_QUEUE', 32))
+
+# Signed session tokens let reconnecting clients skip the password check. Every process
+# serving the same clients needs the same SESSION_SECRET; without one a generated secret
+# is kept in SESSION_SECRET_FILE so at least restarts on this machine keep tokens valid
+SESSION_SECRET_FILE = os.environ.get('SESSION_SECRET_FILE', os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'config', 'session_secret'))
+SESSION_TOKEN_TTL = int(os.environ.get('SESSION_TOKEN_TTL', 7 * 24 * 3600))
+
+
+def load_session_secret(path=SESSION_SECRET_FILE):
+    """SESSION_SECRET, else the secret persisted at path (generated by the first process)"""
+    secret = os.environ.get('SESSION_SECRET')
+    if secret:
+        return secret
+    if not os.path.exists(path):
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w') as f:
+            f.write(secrets.token_hex(32))
+        try:
+            # Fails if another process got there first; everyone then reads its secret
+            os.link(tmp_path, path)
+        except FileExistsError:
+            pass
+        finally:
+            os.remove(tmp_path)
+    logger.warning("SESSION_SECRET is not set: using the secret in %s. Set SESSION_SECRET to the same "
+                   "value on every server, or their session tokens won't be accepted by each other", path)
+    with open(path) as f:
+        return f.read().strip()
+
+
+@lru_cache(maxsize=None)
+def token_serializer():
+    """Session token signer, built on first use so importing never reads or writes the secret"""
+    return URLSafeTimedSerializer(load_session_secret(), salt='session')
+
+
+_user_cache = {}
+_user_cache_lock = threading.Lock()
+_hash_pool = ThreadPoolExecutor(max_workers=AUTH_HASH_WORKERS, thread_name_prefix='auth-hash')
+_hash_slots = threading.BoundedSemaphore(AUTH_HASH_WORKERS + AUTH_HASH_QUEUE)
+
+
+def limited_hash(fn, *args):
+    """Run a password hash function on the bounded pool, blocking the calling thread until it's done
+
+    This limits concurrency rather than freeing the caller: at most
+    AUTH_HASH_WORKERS hashes run at once and AUTH_HASH_QUEUE more wait, so a
+    burst of logins can't take every core from inference. Callers past that
+    wait up to 5 s for a slot, then get a RuntimeError.
+    """
+    if not _hash_slots.acquire(timeout=5):
+        raise RuntimeError('Authentication is busy, try again later')
+    try:
+        return _hash_pool.submit(fn, *args).result()
+    finally:
+        _hash_slots.release()
+
+
+def invalidate_user(email):
+    with _user_cache_lock:
+        _user_cache.pop(email, None)
+
+
+def create_user(name, email, password, role='user'):
+    """Create a user; returns False if the email is already registered"""
+    password_hash = limited_hash(generate_password_hash, password)
+    created_at = datetime.utcnow().isoformat()
+
+    user_data = {
+        'name': name,
+        'email': email,
+        'password_hash': password_hash,
+        'role': role,
+        'created_at': created_at
+    }
+
+    # Use email as unique document ID or auto-ID
+    created = get_user_store().create(user_data)
+    invalidate_user(email)
+    return created
+
+def get_user_by_email(email):
+    now = time.monotonic()
+    with _user_cache_lock:
+        cached = _user_cache.get(email)
+    if cached and cached[0] > now:
+        return dict(cached[1]) if cached[1] else None
+
+    user = get_user_store().get(email)
+    ttl = USER_CACHE_TTL if user else USER_NEGATIVE_CACHE_TTL
+    with _user_cache_lock:
+        _user_cache[email] = (now + ttl, user)
+    return dict(user) if user else None
+
+def update_user(email, name):
+    get_user_store().update(email, {
+        'name': name
+    })
+    invalidate_user(email)
+
+def validate_login(email, password):
+    user = get_user_by_email(email)
+    if user and limited_hash(check_password_hash, user['password_hash'], password):
+        return user
+    return None
+
+def public_user(user):
+    return {k: v for k, v in user.items() if k != 'password_hash'}
+
+def issue_session_token(user):
+    return token_serializer().dumps({'email': user['email']})
+
+def validate_session_token(token):
+    """Return the user for a valid, unexpired session token, else None"""
+    try:
+        data = token_serializer().loads(token, max_age=SESSION_TOKEN_TTL)
+    except BadSignature:
+        return None
+    return get_user_by_email(data['email'])
@@ -0,0 +1,113 @@
+import os
+import sqlite3
+import threading
+
+from config.db import CORRECTIONS_DB_PATH, ConnectionPool, get_firestore_db
+
+
+class FirestoreUserStore:
+    """Users stored in the Firestore `users` collection, keyed by email"""
+
+    def collection(self):
+        return get_firestore_db().collection('users')
+
+    def get(self, email):
+        doc = self.collection().document(email).get()
+        return doc.to_dict() if doc.exists else None
+
+    def create(self, user_data):
+        from google.api_core.exceptions import AlreadyExists
+
+        # create() fails if the document exists, so no separate read is needed
+        try:
+            self.collection().document(user_data['email']).create(user_data)
+        except AlreadyExists:
+            return False
+        return True
+
+    def update(self, email, fields):
+        from google.api_core.exceptions import NotFound
+
+        try:
+            self.collection().document(email).update(fields)
+        except NotFound:
+            return False
+        return True
+
+
+class MemoryUserStore:
+    """In-process stand-in for load tests and offline development"""
+
+    def __init__(self):
+        self.users = {}
+        self._lock = threading.Lock()
+
+    def get(self, email):
+        user = self.users.get(email)
+        return dict(user) if user else None
+
+    def create(self, user_data):
+        with self._lock:
+            if user_data['email'] in self.users:
+                return False
+            self.users[user_data['email']] = dict(user_data)
+        return True
+
+    def update(self, email, fields):
+        with self._lock:
+            if email not in self.users:
+                return False
+            self.users[email].update(fields)
+        return True
+
+
+class SQLiteUserStore:
+    """Users stored in the local SQLite `users` table"""
+
+    COLUMNS = ('name', 'email', 'password_hash', 'role', 'created_at')
+
+    def __init__(self, path=CORRECTIONS_DB_PATH):
+        self.path = path
+        self.pool = ConnectionPool(path)
+
+    def get(self, email):
+        with self.pool.connection() as conn:
+            row = conn.execute(
+                'SELECT name, email, password_hash, role, created_at FROM users WHERE email = ?',
+                (email,)).fetchone()
+        return dict(row) if row else None
+
+    def create(self, user_data):
+        try:
+            with self.pool.connection() as conn, conn:
+                conn.execute(
+                    'INSERT INTO users (name, email, password_hash, role, created_at) VALUES (?, ?, ?, ?, ?)',
+                    tuple(user_data[column] for column in self.COLUMNS))
+        except sqlite3.IntegrityError:
+            return False
+        return True
+
+    def update(self, email, fields):
+        fields = {k: v for k, v in fields.items() if k in self.COLUMNS}
+        assignments = ', '.join(f'{column} = ?' for column in fields)
+        with self.pool.connection() as conn, conn:
+            cursor = conn.execute(f'UPDATE users SET {assignments} WHERE email = ?',
+                                  (*fields.values(), email))
+        return cursor.rowcount > 0
+
+
+USER_STORES = {
+    'firestore': FirestoreUserStore,
+    'sqlite': SQLiteUserStore,
+    'memory': MemoryUserStore,
+}
+
+_store = None
+
+
+def get_user_store():
+    """Store selected by USER_STORE (firestore, sqlite or memory)"""
+    global _store
+    if _store is None:
+        _store = USER_STORES[os.environ.get('USER_STORE', 'firestore')]()
+    return _store
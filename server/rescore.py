@@ -0,0 +1,158 @@
+"""Re-score recorded sessions through the current CNN and hand-sign rules
+
+    python rescore.py recordings/
+    python rescore.py recordings/ --backend tflite --workers 8 --output report.json
+
+Recordings are written by the server when RECORD_SESSIONS=1. Every chunk is
+re-run through the serving preprocessing, the configured model and the rule
+engine in large batches, one process per core. The JSON report has accuracy
+against the labels clients sent (when there are any), how often the current
+code disagrees with what was predicted live, confusion matrices and speed.
+"""
+import argparse
+import json
+import multiprocessing as mp
+import os
+import time
+from collections import Counter, defaultdict
+
+import cv2
+import numpy as np
+
+from config.model_config import (class_mapping, CONFIDENCE_THRESHOLD,
+                                 INFERENCE_BACKEND, MODEL_PATH)
+from utils.hand_signs import classify_hand_signs
+from utils.session_recorder import list_chunks, load_chunk
+from utils.sign_pipeline import AMBIGUOUS_LETTERS
+from utils.sign_preprocessing import CROP_SIZE, IMG_SIZE, FramePreprocessor, normalize_batch
+
+_worker = {}
+
+
+def init_worker(backend_name, model_path, threads, batch_size):
+    from utils.inference_backends import load_backend
+
+    # One process per core: keep OpenCV and the backend from spawning their own pools
+    cv2.setNumThreads(1)
+    _worker['model'] = load_backend(backend_name, model_path, threads)
+    _worker['pixels'] = np.empty((batch_size,) + IMG_SIZE[::-1], dtype=np.uint8)
+    _worker['inputs'] = np.empty((batch_size,) + IMG_SIZE[::-1] + (1,), dtype=np.float32)
+    _worker['preprocessor'] = FramePreprocessor()
+
+
+def score_chunk(path):
+    """Run one recording chunk through preprocessing, the CNN and the rules"""
+    started = time.perf_counter()
+    chunk = load_chunk(path)
+    model, pixels, inputs = _worker['model'], _worker['pixels'], _worker['inputs']
+    preprocessor = _worker['preprocessor']
+
+    crops = chunk['crops']
+    cnn_class = np.empty(len(crops), dtype=np.int16)
+    confidence = np.empty(len(crops), dtype=np.float32)
+    for start in range(0, len(crops), len(pixels)):
+        batch = crops[start:start + len(pixels)]
+        for i, crop in enumerate(batch):
+            pixels[i] = preprocessor.model_pixels(crop)[1]
+        predictions = model.predict(normalize_batch(pixels[:len(batch)], out=inputs[:len(batch)]))
+        cnn_class[start:start + len(batch)] = np.argmax(predictions, axis=1)
+        confidence[start:start + len(batch)] = np.max(predictions, axis=1)
+
+    return {
+        'path': path,
+        'crop_size': chunk['meta'].get('crop_size'),
+        'label': chunk['label'],
+        'recorded_cnn': chunk['cnn_class'],
+        'recorded_hand_sign': chunk['hand_sign'],
+        'cnn': cnn_class,
+        'confidence': confidence,
+        'hand_sign': classify_hand_signs(chunk['landmarks']),
+        'seconds': time.perf_counter() - started,
+    }
+
+
+def accuracy(predicted, labels):
+    return round(float(np.mean(predicted == labels)), 4) if len(labels) else None
+
+
+def confusion(labels, predicted):
+    matrix = defaultdict(Counter)
+    for label, prediction in zip(labels, predicted):
+        matrix[str(label)][str(prediction) or '-'] += 1
+    return {label: dict(sorted(row.items())) for label, row in sorted(matrix.items())}
+
+
+def summarize(results, confidence_threshold, wall_seconds):
+    def joined(key):
+        return np.concatenate([result[key] for result in results])
+
+    # Trailing '' so class -1 (a letter outside the built-in mapping) reads as no letter
+    letters = np.array([class_mapping[i] for i in range(len(class_mapping))] + [''])
+    labels = joined('label')
+    cnn = letters[joined('cnn')]
+    recorded_cnn = letters[joined('recorded_cnn')]
+    hand_sign = joined('hand_sign')
+    recorded_hand_sign = joined('recorded_hand_sign')
+    confidence = joined('confidence')
+    ambiguous = np.isin(cnn, sorted(AMBIGUOUS_LETTERS))
+
+    labelled = labels != ''
+    frames = len(labels)
+    return {
+        'chunks': len(results),
+        'frames': int(frames),
+        'labelled_frames': int(labelled.sum()),
+        'cnn_accuracy': accuracy(cnn[labelled], labels[labelled]),
+        'recorded_cnn_accuracy': accuracy(recorded_cnn[labelled], labels[labelled]),
+        'hand_sign_accuracy': accuracy(hand_sign[labelled], labels[labelled]),
+        'recorded_hand_sign_accuracy': accuracy(recorded_hand_sign[labelled], labels[labelled]),
+        'hand_sign_coverage': round(float(np.mean(hand_sign != '')), 4),
+        'cnn_changed': round(float(np.mean(cnn != recorded_cnn)), 4),
+        'hand_sign_changed': round(float(np.mean(hand_sign != recorded_hand_sign)), 4),
+        'confidence_threshold': confidence_threshold,
+        'confident_fraction': round(float(np.mean(confidence >= confidence_threshold)), 4),
+        'ambiguous_fraction': round(float(np.mean(ambiguous)), 4),
+        'cnn_confusion': confusion(labels[labelled], cnn[labelled]),
+        'hand_sign_confusion': confusion(labels[labelled], hand_sign[labelled]),
+        'crop_size_mismatches': sum(1 for result in results
+                                    if result['crop_size'] not in (None, CROP_SIZE)),
+        'wall_seconds': round(wall_seconds, 2),
+        'frames_per_second': round(frames / wall_seconds, 1) if wall_seconds > 0 else None,
+        'worker_seconds': round(sum(result['seconds'] for result in results), 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('recordings', nargs='+', help='Recording directories, session directories or chunk files')
+    parser.add_argument('--backend', choices=['keras', 'tflite', 'onnx'], default=INFERENCE_BACKEND)
+    parser.add_argument('--model', default=MODEL_PATH)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--threads', type=int, default=1, help='Inference threads per worker')
+    parser.add_argument('--batch-size', type=int, default=256)
+    parser.add_argument('--confidence-threshold', type=float, default=CONFIDENCE_THRESHOLD)
+    parser.add_argument('--output', help='Write the JSON report here instead of stdout')
+    args = parser.parse_args()
+
+    chunks = list_chunks(args.recordings)
+    if not chunks:
+        parser.error('No recording chunks found')
+
+    started = time.perf_counter()
+    context = mp.get_context('spawn')
+    with context.Pool(args.workers, initializer=init_worker,
+                      initargs=(args.backend, args.model, args.threads, args.batch_size)) as pool:
+        results = pool.map(score_chunk, chunks, chunksize=1)
+    report = summarize(results, args.confidence_threshold, time.perf_counter() - started)
+    report.update({'backend': args.backend, 'workers': args.workers})
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
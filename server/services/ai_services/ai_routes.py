@@ -0,0 +1,92 @@
+import base64
+import json
+
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+
+from models.correction_model import save_corrected_name
+from utils.document_pipeline import process_documents, remove_documents, spool_document
+
+ai_bp = Blueprint('ai_services', __name__)
+
+
+def decode_base64_document(image_base64):
+    _, encoded = image_base64.split(',', 1) if ',' in image_base64 else ('', image_base64)
+    return base64.b64decode(encoded)
+
+
+def load_documents(limit=None):
+    """Temporary files for documents from multipart uploads and/or base64 strings in the JSON body"""
+    sources = [f.stream for f in request.files.getlist('files')]
+    if 'file' in request.files:
+        sources.append(request.files['file'].stream)
+
+    data = request.get_json(silent=True) or {}
+    if data.get('image_base64'):
+        sources.append(data['image_base64'])
+    sources.extend(data.get('documents', []))
+
+    paths = []
+    try:
+        for source in sources[:limit]:
+            paths.append(spool_document(decode_base64_document(source) if isinstance(source, str) else source))
+    except Exception:
+        remove_documents(paths)
+        raise
+    return paths
+
+
+def wants_stream():
+    return request.args.get('stream', '0') in ('1', 'true')
+
+
+def respond(paths):
+    """Stream results as NDJSON when ?stream=1, otherwise return one JSON body
+
+    The spooled documents are removed once the response is done.
+    """
+    results = process_documents(paths)
+    if wants_stream():
+        lines = (json.dumps(result) + '\n' for result in results)
+        response = Response(stream_with_context(lines), mimetype='application/x-ndjson')
+        response.call_on_close(lambda: remove_documents(paths))
+        return response
+
+    try:
+        results = list(results)
+    finally:
+        remove_documents(paths)
+    return jsonify({'results': results, 'count': len(results)})
+
+
+@ai_bp.route('/predict-from-document', methods=['POST'])
+def predict_from_document():
+    try:
+        paths = load_documents(limit=1)
+    except Exception as e:
+        return jsonify({'error': f'Invalid image: {str(e)}'}), 400
+    if not paths:
+        return jsonify({'error': 'Missing image'}), 400
+
+    return respond(paths)
+
+
+@ai_bp.route('/predict-from-documents', methods=['POST'])
+def predict_from_documents():
+    try:
+        paths = load_documents()
+    except Exception as e:
+        return jsonify({'error': f'Invalid image: {str(e)}'}), 400
+    if not paths:
+        return jsonify({'error': 'Missing documents'}), 400
+
+    return respond(paths)
+
+
+@ai_bp.route('/submit-correction', methods=['POST'])
+def submit_correction():
+    data = request.get_json()
+    if not all(k in data for k in ('predicted_text', 'corrected_name')):
+        return jsonify({'error': 'Missing fields'}), 400
+
+    save_corrected_name(data['predicted_text'], data['corrected_name'])
+    return jsonify({'message': 'Correction saved'})
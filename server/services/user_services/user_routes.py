@@ -1,5 +1,6 @@
 from flask import Blueprint, request, jsonify
-from models.user_model import create_user, get_user_by_email, update_user, validate_login
+from models.user_model import (create_user, update_user, validate_login,
+                               issue_session_token, validate_session_token, public_user)
 
 user_bp = Blueprint('user_services', __name__)
 
@@ -9,22 +10,38 @@ def create():
     if not all(k in data for k in ('name', 'email', 'password')):
         return jsonify({'error': 'Missing fields'}), 400
 
-    if get_user_by_email(data['email']):
+    # Roles are never taken from the client: admins are promoted in the user store
+    try:
+        created = create_user(data['name'], data['email'], data['password'])
+    except RuntimeError as e:
+        return jsonify({'error': str(e)}), 503
+    if not created:
         return jsonify({'error': 'User already exists'}), 409
-
-    create_user(data['name'], data['email'], data['password'], data.get('role', 'user'))
     return jsonify({'message': 'User created'}), 201
 
 @user_bp.route('/login', methods=['POST'])
 def login():
     data = request.get_json()
-    user = validate_login(data.get('email'), data.get('password'))
+    try:
+        user = validate_login(data.get('email'), data.get('password'))
+    except RuntimeError as e:
+        return jsonify({'error': str(e)}), 503
     if user:
-        return jsonify({'message': 'Login successful', 'user': dict(user)})
+        return jsonify({'message': 'Login successful',
+                        'user': public_user(user),
+                        'token': issue_session_token(user)})
     return jsonify({'error': 'Invalid credentials'}), 401
 
+@user_bp.route('/session', methods=['POST'])
+def session():
+    data = request.get_json()
+    user = validate_session_token(data.get('token', ''))
+    if user:
+        return jsonify({'message': 'Session valid', 'user': public_user(user)})
+    return jsonify({'error': 'Invalid or expired session'}), 401
+
 @user_bp.route('/update/<int:user_id>', methods=['PUT'])
 def update(user_id):
     data = request.get_json()
-    update_user(user_id, data.get('name'), data.get('role', 'user'))
+    update_user(user_id, data.get('name'))
     return jsonify({'message': 'User updated'})
@@ -0,0 +1,8 @@
+import os
+import sys
+
+# Tests import the server modules the way app.py does, from the server directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('USER_STORE', 'memory')
+os.environ.setdefault('SOCKETIO_LOGGING', '0')
+os.environ.setdefault('SESSION_SECRET', 'test-secret')
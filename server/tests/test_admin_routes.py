@@ -0,0 +1,47 @@
+import json
+import os
+
+import pytest
+
+import app as server
+from models.user_model import invalidate_user
+from models.user_store import get_user_store
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    version_dir = tmp_path / 'candidate'
+    version_dir.mkdir()
+    (version_dir / 'manifest.json').write_text(json.dumps({'model': 'model.tflite'}))
+    monkeypatch.setattr(server.model_registry, 'directory', str(tmp_path))
+    return server.app.test_client()
+
+
+def session_token(client, email, role=None):
+    account = {'name': 'Test', 'email': email, 'password': 'secret'}
+    if role is not None:
+        account['role'] = role
+    assert client.post('/user_services/create', json=account).status_code == 201
+    return client.post('/user_services/login', json=account).get_json()['token']
+
+
+def activate(client, token):
+    return client.post('/models/activate', json={'version': 'candidate'},
+                       headers={'Authorization': f'Bearer {token}'})
+
+
+def test_self_registered_admin_is_forbidden(client):
+    token = session_token(client, 'mallory@example.com', role='admin')
+
+    assert activate(client, token).status_code == 403
+    assert get_user_store().get('mallory@example.com')['role'] == 'user'
+    assert not os.path.exists(os.path.join(server.model_registry.directory, 'ACTIVE'))
+
+
+def test_admin_can_activate(client):
+    token = session_token(client, 'admin@example.com')
+    get_user_store().update('admin@example.com', {'role': 'admin'})
+    invalidate_user('admin@example.com')
+
+    assert activate(client, token).status_code == 202
+    assert server.model_registry.active_name() == 'candidate'
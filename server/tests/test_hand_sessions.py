@@ -0,0 +1,38 @@
+import time
+
+from utils.hand_sessions import HandSessionPool
+
+
+class FakeSession:
+    def __init__(self, client_id):
+        self.client_id = client_id
+        self.last_used = time.monotonic()
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def test_evicted_session_stays_open_until_released():
+    pool = HandSessionPool(max_sessions=1, session_factory=FakeSession)
+    with pool.lease('a') as first:
+        pool.get('b')  # evicts 'a' while its frame is still running
+        assert 'a' not in pool.sessions
+        assert not first.closed
+    assert first.closed
+
+    with pool.lease('b') as second:
+        pool.close('b')
+        assert not second.closed
+    assert second.closed
+
+
+def test_reap_idle_closes_unleased_sessions():
+    pool = HandSessionPool(idle_timeout=60, session_factory=FakeSession)
+    idle, busy = pool.get('idle'), pool.get('busy')
+    idle.last_used = busy.last_used = time.monotonic() - 120
+    with pool.lease('busy'):
+        assert pool.reap_idle() == 2
+        assert idle.closed and not busy.closed
+    assert busy.closed
+    assert len(pool) == 0
@@ -0,0 +1,38 @@
+import cv2
+import numpy as np
+import pytest
+from PIL import Image
+
+import utils.image_utils as image_utils
+
+
+@pytest.fixture
+def page():
+    page = np.full((3000, 2000, 3), 255, np.uint8)
+    for i in range(3):
+        stroke = np.array([[300 + x, 600 + 900 * i + int(40 * np.sin(x / 30))] for x in range(0, 900, 5)], np.int32)
+        cv2.polylines(page, [stroke], False, (20, 20, 20), 10)
+    return Image.fromarray(page)
+
+
+def test_striped_tiff_matches_full_decode(page, tmp_path):
+    page.save(tmp_path / 'page.png')
+    page.save(tmp_path / 'page.tif')
+    with Image.open(tmp_path / 'page.tif') as tiff:
+        assert image_utils.raw_strips(tiff) is not None
+
+    expected = image_utils.locate_signatures(tmp_path / 'page.png', max_side=800)
+    found = image_utils.locate_signatures(tmp_path / 'page.tif', max_side=800)
+    assert len(expected) == 3
+    assert [box for box, _ in found] == [box for box, _ in expected]
+    for (_, crop), (_, reference) in zip(found, expected):
+        assert np.array_equal(np.asarray(crop), np.asarray(reference))
+
+
+def test_pages_over_max_pixels_are_refused_unless_striped(page, tmp_path, monkeypatch):
+    monkeypatch.setattr(image_utils, 'DOCUMENT_MAX_PIXELS', 1_000_000)
+    page.save(tmp_path / 'page.png')
+    page.save(tmp_path / 'page.tif')
+    with pytest.raises(ValueError, match='DOCUMENT_MAX_PIXELS'):
+        image_utils.locate_signatures(tmp_path / 'page.png', max_side=800)
+    assert len(image_utils.locate_signatures(tmp_path / 'page.tif', max_side=800)) == 3
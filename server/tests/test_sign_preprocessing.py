@@ -0,0 +1,52 @@
+import threading
+
+import numpy as np
+import pytest
+
+from utils.golden_preprocessing import golden_crops, reference_model_input
+from utils.sign_preprocessing import (ModelInputBuffer, PreprocessorPool, normalize_batch, preprocess_image,
+                                      prepare_for_model)
+
+
+@pytest.fixture(scope='module')
+def crops():
+    return golden_crops()
+
+
+def test_preprocess_matches_reference(crops):
+    for crop in crops:
+        assert np.array_equal(prepare_for_model(preprocess_image(crop)), reference_model_input(crop))
+
+
+def test_pooled_preprocessor_matches_reference(crops):
+    pool = PreprocessorPool()
+    pixels = []
+    for crop in crops:
+        with pool.checkout() as preprocessor:
+            model_pixels = preprocessor.model_pixels(crop)[1]
+            assert np.array_equal(normalize_batch(model_pixels[np.newaxis])[0], reference_model_input(crop))
+            pixels.append(model_pixels.copy())
+
+    model_inputs = ModelInputBuffer(16)
+    for start in range(0, len(pixels), 16):
+        batch = model_inputs(pixels[start:start + 16])
+        for row, crop in zip(batch, crops[start:start + 16]):
+            assert np.array_equal(row, reference_model_input(crop))
+
+
+def test_pool_reuses_preprocessors_across_threads(crops):
+    pool = PreprocessorPool()
+    used = []
+
+    def preprocess(crop):
+        with pool.checkout() as preprocessor:
+            preprocessor.model_pixels(crop)
+            used.append(preprocessor)
+
+    # One short-lived thread per frame, as Socket.IO events run
+    for crop in crops[:8]:
+        thread = threading.Thread(target=preprocess, args=(crop,))
+        thread.start()
+        thread.join()
+    assert len({id(preprocessor) for preprocessor in used}) == 1
+    assert len(pool) == 1
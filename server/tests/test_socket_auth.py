@@ -0,0 +1,12 @@
+import app as server
+
+
+def test_connect_is_refused_when_the_user_store_fails(monkeypatch):
+    def store_down(token):
+        raise RuntimeError('Authentication is busy, try again later')
+
+    monkeypatch.setattr(server, 'validate_session_token', store_down)
+    client = server.socketio.test_client(server.app, auth={'token': 'any'})
+
+    assert not client.is_connected()
+    assert not server.connected_clients
@@ -0,0 +1,99 @@
+"""Train the landmark classifier used as the first stage of the prediction cascade
+
+    python train_landmarks.py recordings/
+    python train_landmarks.py recordings/ --hidden 128 --output AI-Model/landmark_classifier.npz
+
+Uses the labelled frames of session recordings (RECORD_SESSIONS=1 with a
+`label` in the predict payload). Sessions, not frames, are split between
+training and validation so near-identical neighbouring frames don't leak.
+The report shows, per confidence threshold, the share of frames the landmark
+stage would answer on its own and its accuracy on them, for choosing
+CASCADE_MIN_CONFIDENCE.
+"""
+import argparse
+import json
+import os
+
+import numpy as np
+
+from config.model_config import class_mapping, LANDMARK_MODEL_PATH
+from utils.landmark_classifier import LandmarkClassifier
+from utils.session_recorder import list_chunks, load_chunk
+from utils.sign_pipeline import AMBIGUOUS_LETTERS
+
+
+def load_labelled_landmarks(paths):
+    """(points, labels, session ids) for every labelled frame in the recordings"""
+    known = set(class_mapping.values())
+    points, labels, sessions = [], [], []
+    for path in list_chunks(paths):
+        chunk = load_chunk(path)
+        keep = np.isin(chunk['label'], sorted(known))
+        points.append(chunk['landmarks'][keep])
+        labels.append(chunk['label'][keep])
+        sessions.append(np.full(keep.sum(), os.path.dirname(path)))
+    if not points:
+        return np.zeros((0, 21, 2), np.float32), np.array([]), np.array([])
+    return np.concatenate(points), np.concatenate(labels), np.concatenate(sessions)
+
+
+def split_by_session(sessions, val_fraction, seed):
+    names = np.unique(sessions)
+    rng = np.random.default_rng(seed)
+    rng.shuffle(names)
+    val_names = names[:int(round(len(names) * val_fraction))]
+    return ~np.isin(sessions, val_names), np.isin(sessions, val_names)
+
+
+def cascade_report(letters, confidences, labels, thresholds):
+    """Coverage and accuracy of the frames the landmark stage would answer at each threshold"""
+    decidable = ~np.isin(letters, sorted(AMBIGUOUS_LETTERS))
+    report = []
+    for threshold in thresholds:
+        answered = decidable & (confidences >= threshold)
+        report.append({
+            'threshold': threshold,
+            'answered': round(float(answered.mean()), 4) if len(labels) else None,
+            'accuracy': round(float(np.mean(letters[answered] == labels[answered])), 4) if answered.any() else None,
+        })
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('recordings', nargs='+', help='Recording directories, session directories or chunk files')
+    parser.add_argument('--output', default=LANDMARK_MODEL_PATH)
+    parser.add_argument('--hidden', type=int, default=64)
+    parser.add_argument('--epochs', type=int, default=60)
+    parser.add_argument('--val-fraction', type=float, default=0.2)
+    parser.add_argument('--thresholds', default='0.5,0.7,0.8,0.9,0.95,0.99')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    points, labels, sessions = load_labelled_landmarks(args.recordings)
+    if not len(labels):
+        parser.error('No labelled frames found in the recordings')
+    train, val = split_by_session(sessions, args.val_fraction, args.seed)
+    if not val.any():
+        # Too few sessions to hold one out: validate on the training frames
+        val = train
+
+    classifier = LandmarkClassifier.train(points[train], labels[train], hidden=args.hidden,
+                                          epochs=args.epochs, seed=args.seed)
+    letters, confidences = classifier.predict(points[val])
+    classifier.save(args.output)
+
+    thresholds = [float(t) for t in args.thresholds.split(',') if t]
+    print(json.dumps({
+        'output': args.output,
+        'classes': [str(c) for c in classifier.classes],
+        'train_frames': int(train.sum()),
+        'val_frames': int(val.sum()),
+        'val_sessions': int(len(np.unique(sessions[val]))),
+        'val_accuracy': round(float(np.mean(letters == labels[val])), 4),
+        'cascade': cascade_report(letters, confidences, labels[val], thresholds),
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+from utils.metrics import batch_seconds, batch_size
+
+
+class InferenceBatcher:
+    """Collects model inputs from concurrent handlers and runs them as one batch"""
+
+    def __init__(self, predict_fn, max_batch_size=16, max_wait_ms=5, max_queue_size=256, prepare_fn=np.stack):
+        self.predict_fn = predict_fn
+        # prepare_fn turns the list of queued inputs into the model's batch tensor
+        self.prepare_fn = prepare_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.pending = queue.Queue(maxsize=max_queue_size)
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='inference-batcher', daemon=True)
+                self._thread.start()
+        return self
+
+    def submit(self, model_input):
+        """Queue a single model input and return a Future for its prediction row"""
+        self.start()
+        future = Future()
+        try:
+            self.pending.put_nowait((model_input, future))
+        except queue.Full:
+            raise RuntimeError('Inference queue is full, try again later')
+        return future
+
+    def predict(self, model_input, timeout=None):
+        return self.submit(model_input).result(timeout=timeout)
+
+    def _collect(self):
+        # Block for the first item, then wait at most max_wait for the batch to fill
+        batch = [self.pending.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.pending.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            futures = [future for _, future in batch]
+            try:
+                inputs = self.prepare_fn([model_input for model_input, _ in batch])
+                started = time.perf_counter()
+                predictions = self.predict_fn(inputs)
+                batch_seconds.observe(time.perf_counter() - started)
+                batch_size.observe(len(batch))
+                if len(predictions) != len(futures):
+                    # zip() would leave the extra callers waiting forever
+                    raise RuntimeError(f'Model returned {len(predictions)} predictions '
+                                       f'for a batch of {len(futures)}')
+            except Exception as e:
+                for future in futures:
+                    future.set_exception(e)
+                continue
+
+            for future, prediction in zip(futures, predictions):
+                future.set_result(prediction)
@@ -0,0 +1,127 @@
+import os
+import shutil
+import tempfile
+
+import cv2
+
+from utils.frame_decoder import decode_encoded_image
+from utils.hand_signs import detect_hand_sign, landmarks_to_array
+from utils.sign_preprocessing import crop_hand_region, preprocessors
+
+
+def save_upload(upload):
+    """Copy an uploaded video to a temporary file in chunks (OpenCV needs a path)"""
+    suffix = os.path.splitext(upload.filename or '')[1] or '.mp4'
+    fd, path = tempfile.mkstemp(suffix=suffix, prefix='clip_')
+    with os.fdopen(fd, 'wb') as f:
+        shutil.copyfileobj(upload.stream, f, 1024 * 1024)
+    return path
+
+
+def iter_video_frames(path, every=1, max_frames=None):
+    """Yield (index, time_ms, BGR frame) while reading the video one frame at a time"""
+    capture = cv2.VideoCapture(path)
+    try:
+        if not capture.isOpened():
+            raise ValueError('Could not open video')
+        index = yielded = 0
+        while max_frames is None or yielded < max_frames:
+            # grab() skips decoding frames that are stepped over
+            if not capture.grab():
+                break
+            if index % every == 0:
+                time_ms = capture.get(cv2.CAP_PROP_POS_MSEC)
+                ok, frame = capture.retrieve()
+                if not ok:
+                    break
+                yield index, round(time_ms, 1), frame
+                yielded += 1
+            index += 1
+    finally:
+        capture.release()
+
+
+def iter_image_frames(payloads, max_frames=None):
+    """Yield (index, None, BGR frame) for encoded images, decoding each only when reached"""
+    for index, payload in enumerate(payloads[:max_frames]):
+        yield index, None, decode_encoded_image(memoryview(payload))
+
+
+class ClipPredictor:
+    """Per-frame predictions for a clip with one video-mode hand tracker
+
+    Frames are tracked in order. Frames the landmark stage of the cascade
+    (classify_landmarks) can't settle have their hand crops submitted to the
+    shared inference batcher a window at a time, so the CNN sees them in batches.
+    Results are smoothed with the tracker's StreamState, the same way the live
+    `predict` event is, and the letters it commits form the collapsed sequence.
+    """
+
+    def __init__(self, submit, session, window=32, classify_landmarks=None):
+        self.submit = submit
+        self.classify_landmarks = classify_landmarks
+        self.session = session
+        self.window = window
+        self.sequence = []
+        self.frames = 0
+        self.hand_frames = 0
+
+    def timeline(self, frames):
+        pending = []
+        for frame in frames:
+            pending.append(self._track(*frame))
+            if len(pending) >= self.window:
+                yield from self._resolve(pending)
+                pending = []
+        yield from self._resolve(pending)
+
+    def _track(self, index, time_ms, image):
+        posList = self.session.find_position(image)
+        entry = {'frame': index, 'time_ms': time_ms, 'hand_sign': detect_hand_sign(posList)}
+        if not posList:
+            return entry, None
+        points = landmarks_to_array(posList)
+        answer = self.classify_landmarks(points) if self.classify_landmarks else None
+        if answer is not None:
+            return entry, ('landmarks',) + answer
+        hand_crop = crop_hand_region(image, points)
+        if hand_crop is None:
+            return entry, None
+        # Copy: several frames' pixels are queued in the batcher at once
+        with preprocessors.checkout() as preprocessor:
+            pixels = preprocessor.model_pixels(hand_crop)[1].copy()
+        return entry, ('cnn', self.submit(pixels))
+
+    def _resolve(self, pending):
+        for entry, result in pending:
+            self.frames += 1
+            stage, letter, confidence = 'none', '', 0.0
+            if result is not None:
+                stage = result[0]
+                if stage == 'cnn':
+                    prediction, model = result[1].result()
+                    letter, confidence = model.class_mapping[int(prediction.argmax())], float(prediction.max())
+                else:
+                    letter, confidence = result[1], float(result[2])
+                self.hand_frames += 1
+            stable_letter, committed = self.session.stream.update(letter, confidence, entry['hand_sign'])
+            if committed:
+                self.sequence.append(committed)
+            entry.update({
+                'hand_detected': result is not None,
+                'cnn_prediction': letter,
+                'confidence': round(confidence, 3),
+                'stage': stage,
+                'stable_letter': stable_letter,
+                'committed': committed,
+            })
+            yield entry
+
+    def summary(self):
+        return {
+            'frames': self.frames,
+            'hand_frames': self.hand_frames,
+            'letters': self.sequence,
+            'sequence': ''.join(self.sequence),
+        }
+
@@ -0,0 +1,112 @@
+import io
+import itertools
+import logging
+import os
+import queue
+import random
+import tarfile
+import threading
+import time
+
+import cv2
+
+from utils.metrics import stage_seconds
+
+logger = logging.getLogger(__name__)
+
+
+class DebugArchiver:
+    """Samples debug frames off the request path and packs them into tar shards"""
+
+    def __init__(self, directory='debug', sample_rate=0.1, uncertain_only=True,
+                 confidence_threshold=0.7, max_queue_size=64,
+                 shard_max_bytes=64 * 1024 * 1024, shard_max_age=3600, max_shards=20):
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.uncertain_only = uncertain_only
+        self.confidence_threshold = confidence_threshold
+        self.shard_max_bytes = shard_max_bytes
+        self.shard_max_age = shard_max_age
+        self.max_shards = max_shards
+
+        self.pending = queue.Queue(maxsize=max_queue_size)
+        self.dropped = 0
+        self._sequence = itertools.count()
+        self._shard = None
+        self._shard_path = None
+        self._shard_opened = 0
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                os.makedirs(self.directory, exist_ok=True)
+                self._thread = threading.Thread(target=self._run, name='debug-archiver', daemon=True)
+                self._thread.start()
+        return self
+
+    def should_sample(self, confidence, ambiguous):
+        if self.sample_rate <= 0:
+            return False
+        if self.uncertain_only and confidence >= self.confidence_threshold and not ambiguous:
+            return False
+        return random.random() < self.sample_rate
+
+    def submit(self, client_id, images, confidence, ambiguous=False):
+        """Queue named images for archiving; never blocks the caller"""
+        if not self.should_sample(confidence, ambiguous):
+            return False
+        self.start()
+
+        # Collision-free prefix: client sid + nanosecond clock + sequence number
+        prefix = f"{client_id}_{time.time_ns()}_{next(self._sequence)}"
+        try:
+            self.pending.put_nowait((prefix, images, confidence))
+        except queue.Full:
+            self.dropped += 1
+            return False
+        return True
+
+    def _run(self):
+        while True:
+            prefix, images, confidence = self.pending.get()
+            started = time.perf_counter()
+            try:
+                self._rotate_if_needed()
+                for name, image in images.items():
+                    ok, encoded = cv2.imencode('.jpg', image)
+                    if ok:
+                        self._add_member(f"{prefix}_{name}_{confidence:.3f}.jpg", encoded.tobytes())
+                # Push completed members to disk in one go per frame
+                self._shard.fileobj.flush()
+            except Exception as e:
+                logger.error("Debug archiving failed: %s", e)
+            stage_seconds.observe(time.perf_counter() - started, 'debug_write')
+
+    def _add_member(self, name, payload):
+        info = tarfile.TarInfo(name)
+        info.size = len(payload)
+        info.mtime = time.time()
+        self._shard.addfile(info, io.BytesIO(payload))
+
+    def _rotate_if_needed(self):
+        if self._shard is not None:
+            too_big = self._shard.fileobj.tell() >= self.shard_max_bytes
+            too_old = time.monotonic() - self._shard_opened >= self.shard_max_age
+            if not (too_big or too_old):
+                return
+            self._shard.close()
+
+        self._shard_path = os.path.join(self.directory, f"frames_{os.getpid()}_{time.time_ns()}.tar")
+        self._shard = tarfile.open(self._shard_path, 'w')
+        self._shard_opened = time.monotonic()
+        self._prune_old_shards()
+
+    def _prune_old_shards(self):
+        shards = sorted(
+            (os.path.join(self.directory, f) for f in os.listdir(self.directory) if f.endswith('.tar')),
+            key=os.path.getmtime)
+        for path in shards[:-self.max_shards]:
+            if path != self._shard_path:
+                os.remove(path)
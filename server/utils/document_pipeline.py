@@ -0,0 +1,147 @@
+import multiprocessing as mp
+import os
+import shutil
+import tempfile
+from collections import deque
+
+import cv2
+from PIL import Image
+
+from models.correction_model import get_corrected_names
+from utils.image_utils import check_page_size, locate_signatures
+from utils.lazy_loader import LazyResource
+from utils.trocr_loader import load_trocr
+
+# Crops per TrOCR forward pass and the cap on generated tokens per crop
+TROCR_BATCH_SIZE = int(os.environ.get('TROCR_BATCH_SIZE', 8))
+TROCR_MAX_NEW_TOKENS = int(os.environ.get('TROCR_MAX_NEW_TOKENS', 32))
+
+# Processes that find signatures on pages (0 = in the request thread) and the
+# longest side of the downscaled page they search before re-reading regions
+DOCUMENT_WORKERS = int(os.environ.get('DOCUMENT_WORKERS', max(1, (os.cpu_count() or 2) // 2)))
+DOCUMENT_PROXY_SIDE = int(os.environ.get('DOCUMENT_PROXY_SIDE', 1600))
+
+
+def warm_up_trocr(loaded):
+    recognize_batch([Image.new('RGB', (384, 96), 'white')], loaded=loaded)
+
+
+trocr = LazyResource('trocr', load_trocr, warm_up_trocr, required=False)
+
+
+def init_page_worker():
+    # One page per process at a time: keep OpenCV from starting its own thread pool
+    cv2.setNumThreads(1)
+
+
+def start_page_workers():
+    return mp.get_context('spawn').Pool(DOCUMENT_WORKERS, initializer=init_page_worker)
+
+
+page_workers = LazyResource('document_workers', start_page_workers, required=False)
+
+
+def spool_document(source):
+    """Write an uploaded file or bytes to a temporary file, checking it opens as an image
+
+    Pages are read back from the file by the page workers, one at a time.
+    Raises ValueError up front when a page is over DOCUMENT_MAX_PIXELS.
+    """
+    fd, path = tempfile.mkstemp(prefix='document_')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            if isinstance(source, bytes):
+                f.write(source)
+            else:
+                shutil.copyfileobj(source, f, 1024 * 1024)
+        with Image.open(path) as document:
+            for index in range(getattr(document, 'n_frames', 1)):
+                document.seek(index)
+                check_page_size(document)
+    except Exception:
+        os.remove(path)
+        raise
+    return path
+
+
+def remove_documents(paths):
+    for path in paths:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def count_pages(path):
+    with Image.open(path) as document:
+        return getattr(document, 'n_frames', 1)
+
+
+def iter_regions(paths, max_side=DOCUMENT_PROXY_SIDE):
+    """Yield (document, page, region, box, crop) for every signature on every page
+
+    Pages are searched by the page workers, at most two per worker ahead of
+    the consumer, so memory stays at a few pages however many there are.
+    Results keep document and page order.
+    """
+    pages = ((doc_idx, page_idx, path) for doc_idx, path in enumerate(paths)
+             for page_idx in range(count_pages(path)))
+    pool = page_workers.get() if DOCUMENT_WORKERS > 0 else None
+    if pool is None:
+        for doc_idx, page_idx, path in pages:
+            yield from _page_regions(doc_idx, page_idx, locate_signatures(path, page_idx, max_side))
+        return
+
+    pending = deque()
+    for doc_idx, page_idx, path in pages:
+        pending.append((doc_idx, page_idx, pool.apply_async(locate_signatures, (path, page_idx, max_side))))
+        if len(pending) >= 2 * DOCUMENT_WORKERS:
+            doc_idx, page_idx, result = pending.popleft()
+            yield from _page_regions(doc_idx, page_idx, result.get())
+    while pending:
+        doc_idx, page_idx, result = pending.popleft()
+        yield from _page_regions(doc_idx, page_idx, result.get())
+
+
+def _page_regions(doc_idx, page_idx, signatures):
+    for region_idx, (box, crop) in enumerate(signatures):
+        yield doc_idx, page_idx, region_idx, box, crop
+
+
+def recognize_batch(crops, max_new_tokens=TROCR_MAX_NEW_TOKENS, loaded=None):
+    """Run one padded TrOCR batch over signature crops and return the raw texts"""
+    import torch
+
+    processor, model = loaded or trocr.get()
+    pixel_values = processor(images=crops, return_tensors='pt', padding=True).pixel_values
+    with torch.inference_mode():
+        generated = model.generate(pixel_values, max_new_tokens=max_new_tokens, num_beams=1)
+    return [text.strip() for text in processor.batch_decode(generated, skip_special_tokens=True)]
+
+
+def process_documents(paths, batch_size=TROCR_BATCH_SIZE):
+    """Recognize signatures across document files/pages, yielding results batch by batch"""
+    pending = []
+    for item in iter_regions(paths):
+        pending.append(item)
+        if len(pending) >= batch_size:
+            yield from _finish_batch(pending)
+            pending = []
+    if pending:
+        yield from _finish_batch(pending)
+
+
+def _finish_batch(items):
+    texts = recognize_batch([crop for *_, crop in items])
+    corrections = get_corrected_names(texts)
+    for (doc_idx, page_idx, region_idx, box, _), text in zip(items, texts):
+        corrected = corrections[text]
+        yield {
+            'document': doc_idx,
+            'page': page_idx,
+            'region': region_idx,
+            'box': list(box),
+            'predicted_text': text,
+            'corrected_name': corrected,
+            'name': corrected or text,
+        }
@@ -0,0 +1,110 @@
+import threading
+import time
+
+
+class ClientFrames:
+    """Frame bookkeeping for one client"""
+
+    def __init__(self):
+        self.in_flight = False
+        self.waiting = None
+        self.started = 0.0
+        self.service_time = None
+        self.advised_interval = None
+        self.received = 0
+        self.processed = 0
+        self.coalesced = 0
+        self.dropped = 0
+
+
+class FrameCoalescer:
+    """Latest-wins frame slot per client plus capture-rate advice
+
+    A client has at most one frame being processed and one waiting. Frames that
+    arrive while the client is busy are parked (coalesced); a newer one replaces
+    a parked frame, which is dropped, so the server never works through a
+    backlog of stale frames.
+    """
+
+    def __init__(self, min_interval_ms=200, max_interval_ms=5000, headroom=1.5, smoothing=0.3):
+        self.min_interval_ms = min_interval_ms
+        self.max_interval_ms = max_interval_ms
+        self.headroom = headroom
+        self.smoothing = smoothing
+        self.clients = {}
+        self._lock = threading.Lock()
+
+    def offer(self, client_id, data):
+        """Returns True if the caller should process `data` now, False if it was parked"""
+        with self._lock:
+            client = self.clients.setdefault(client_id, ClientFrames())
+            client.received += 1
+            if not client.in_flight:
+                client.in_flight = True
+                client.started = time.monotonic()
+                return True
+            client.coalesced += 1
+            if client.waiting is not None:
+                client.dropped += 1
+            client.waiting = data
+            return False
+
+    def finish(self, client_id):
+        """Record a completed frame; returns the next waiting frame to process, if any"""
+        with self._lock:
+            client = self.clients.get(client_id)
+            if client is None:
+                return None
+            now = time.monotonic()
+            elapsed = now - client.started
+            client.processed += 1
+            if client.service_time is None:
+                client.service_time = elapsed
+            else:
+                client.service_time += self.smoothing * (elapsed - client.service_time)
+
+            data, client.waiting = client.waiting, None
+            if data is None:
+                client.in_flight = False
+            else:
+                client.started = now
+            return data
+
+    def throttle_advice(self, client_id):
+        """Recommended capture interval, only when it moved by more than 20% since last advised"""
+        with self._lock:
+            client = self.clients.get(client_id)
+            if client is None or client.service_time is None:
+                return None
+            interval = client.service_time * 1000 * self.headroom
+            interval = int(min(max(interval, self.min_interval_ms), self.max_interval_ms))
+            previous = client.advised_interval
+            if previous is not None and abs(interval - previous) <= 0.2 * previous:
+                return None
+            client.advised_interval = interval
+            return {'interval_ms': interval, 'coalesced': client.coalesced, 'dropped': client.dropped}
+
+    def remove(self, client_id):
+        with self._lock:
+            self.clients.pop(client_id, None)
+
+    def stats(self):
+        with self._lock:
+            return {
+                client_id: {
+                    'received': client.received,
+                    'processed': client.processed,
+                    'coalesced': client.coalesced,
+                    'dropped': client.dropped,
+                    'service_ms': round(client.service_time * 1000, 1) if client.service_time else None,
+                    'advised_interval_ms': client.advised_interval,
+                }
+                for client_id, client in self.clients.items()
+            }
+
+    def totals(self):
+        with self._lock:
+            return {
+                'coalesced': sum(client.coalesced for client in self.clients.values()),
+                'dropped': sum(client.dropped for client in self.clients.values()),
+            }
@@ -0,0 +1,70 @@
+import base64
+
+import cv2
+import numpy as np
+
+# Raw buffer layouts a client may send, with their OpenCV colour conversion
+# and the number of bytes per pixel row relative to the image width
+RAW_FORMATS = {
+    'nv21': (cv2.COLOR_YUV2BGR_NV21, 1.5),
+    'nv12': (cv2.COLOR_YUV2BGR_NV12, 1.5),
+    'i420': (cv2.COLOR_YUV2BGR_I420, 1.5),
+    'rgba': (cv2.COLOR_RGBA2BGR, 4),
+    'bgra': (cv2.COLOR_BGRA2BGR, 4),
+    'rgb': (cv2.COLOR_RGB2BGR, 3),
+    'bgr': (None, 3),
+}
+
+
+def decode_frame(data):
+    """Decode a `predict` payload into a BGR OpenCV image
+
+    Accepts the legacy base64 data-URL string as well as binary attachments
+    (encoded JPEG/PNG bytes or a raw buffer with width/height metadata).
+    """
+    image = data['image']
+    if isinstance(image, str):
+        return decode_base64_image(image)
+
+    buffer = memoryview(image)
+    fmt = data.get('format', 'jpeg').lower()
+    if fmt in ('jpeg', 'jpg', 'png'):
+        return decode_encoded_image(buffer)
+    return decode_raw_image(buffer, fmt, int(data['width']), int(data['height']))
+
+
+def decode_base64_image(base64_image):
+    _, encoded = base64_image.split(',', 1) if ',' in base64_image else ('', base64_image)
+    return decode_encoded_image(base64.b64decode(encoded))
+
+
+def decode_encoded_image(buffer):
+    # np.frombuffer wraps the received bytes without copying them
+    image = cv2.imdecode(np.frombuffer(buffer, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        raise ValueError('Could not decode image data')
+    return image
+
+
+def decode_raw_image(buffer, fmt, width, height):
+    if fmt not in RAW_FORMATS:
+        raise ValueError(f'Unsupported frame format: {fmt}')
+    conversion, bytes_per_pixel = RAW_FORMATS[fmt]
+    if bytes_per_pixel == 1.5 and (width % 2 or height % 2):
+        # Chroma is subsampled 2x2, so YUV 4:2:0 frames have even dimensions
+        raise ValueError(f'{fmt} frames need an even width and height, got {width}x{height}')
+
+    expected = int(width * height * bytes_per_pixel)
+    if len(buffer) < expected:
+        raise ValueError(f'Frame buffer too small for {width}x{height} {fmt}')
+
+    pixels = np.frombuffer(buffer, dtype=np.uint8, count=expected)
+    if bytes_per_pixel == 1.5:
+        # Planar/semi-planar YUV: full-res luma plane followed by chroma
+        pixels = pixels.reshape(height * 3 // 2, width)
+    else:
+        pixels = pixels.reshape(height, width, int(bytes_per_pixel))
+
+    if conversion is None:
+        return pixels
+    return cv2.cvtColor(pixels, conversion)
@@ -0,0 +1,136 @@
+import os
+import pickle
+import threading
+from itertools import combinations
+
+INDEX_FORMAT_VERSION = 1
+
+# One edit is allowed per this many query characters (up to max_distance), so
+# short OCR fragments are never "corrected" to an unrelated short key
+CHARS_PER_EDIT = 4
+
+
+def edit_distance(a, b, max_distance):
+    """Levenshtein distance, or max_distance + 1 as soon as it is exceeded"""
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1,
+                               current[j - 1] + 1,
+                               previous[j - 1] + (ca != cb)))
+        if min(current) > max_distance:
+            return max_distance + 1
+        previous = current
+    return previous[-1]
+
+
+class FuzzyIndex:
+    """Symmetric-delete index for near-miss lookups of OCR text
+
+    Every key is indexed under all strings reachable by deleting up to
+    max_distance characters from its prefix. A query generates the same
+    deletes, so candidates come from a handful of dict lookups and only
+    those few are verified with a bounded edit distance.
+    """
+
+    def __init__(self, max_distance=2, prefix_length=6):
+        self.max_distance = max_distance
+        self.prefix_length = prefix_length
+        self.entries = {}
+        self.deletes = {}
+        self.signature = None
+        self._lock = threading.Lock()
+
+    def _delete_variants(self, text):
+        prefix = text[:self.prefix_length]
+        variants = {prefix}
+        for n in range(1, min(self.max_distance, len(prefix)) + 1):
+            for positions in combinations(range(len(prefix)), n):
+                variants.add(''.join(c for i, c in enumerate(prefix) if i not in positions))
+        return variants
+
+    def add(self, key, value):
+        with self._lock:
+            is_new = key not in self.entries
+            self.entries[key] = value
+            if not is_new:
+                return
+            for variant in self._delete_variants(key):
+                # Most variants belong to a single key; only grow to a list on collision
+                existing = self.deletes.get(variant)
+                if existing is None:
+                    self.deletes[variant] = key
+                elif isinstance(existing, list):
+                    existing.append(key)
+                else:
+                    self.deletes[variant] = [existing, key]
+
+    def add_many(self, pairs):
+        for key, value in pairs:
+            self.add(key, value)
+
+    def lookup(self, query, max_distance=None):
+        """Return (key, value, distance) of the closest key within max_distance, or None
+
+        The distance allowed also shrinks with the query: len(query) // CHARS_PER_EDIT.
+        """
+        max_distance = self.max_distance if max_distance is None else min(max_distance, self.max_distance)
+        if query in self.entries:
+            return query, self.entries[query], 0
+        max_distance = min(max_distance, len(query) // CHARS_PER_EDIT)
+        if max_distance <= 0:
+            return None
+
+        best = None
+        seen = set()
+        for variant in self._delete_variants(query):
+            candidates = self.deletes.get(variant)
+            if candidates is None:
+                continue
+            for key in (candidates if isinstance(candidates, list) else (candidates,)):
+                if key in seen:
+                    continue
+                seen.add(key)
+                distance = edit_distance(query, key, max_distance)
+                # Ties go to the lexicographically smallest key so results are stable
+                if distance <= max_distance and (best is None or (distance, key) < (best[2], best[0])):
+                    best = (key, self.entries[key], distance)
+        return best
+
+    def __len__(self):
+        return len(self.entries)
+
+    def save(self, path):
+        state = {
+            'version': INDEX_FORMAT_VERSION,
+            'max_distance': self.max_distance,
+            'prefix_length': self.prefix_length,
+            'signature': self.signature,
+            'entries': self.entries,
+            'deletes': self.deletes,
+        }
+        # Write then rename so a crash never leaves a half-written index behind
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, max_distance=2, prefix_length=6):
+        """Load a saved index, or None if it is missing or built with other settings"""
+        if not os.path.exists(path):
+            return None
+        with open(path, 'rb') as f:
+            state = pickle.load(f)
+        if (state.get('version') != INDEX_FORMAT_VERSION
+                or state['max_distance'] != max_distance
+                or state['prefix_length'] != prefix_length):
+            return None
+        index = cls(max_distance, prefix_length)
+        index.entries = state['entries']
+        index.deletes = state['deletes']
+        index.signature = state['signature']
+        return index
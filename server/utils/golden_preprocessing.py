@@ -0,0 +1,50 @@
+"""Golden output for the CNN preprocessing, shared by the tests and benchmark.py
+
+reference_model_input is the original preprocess_image + prepare_for_model,
+kept verbatim: every serving preprocessing path must give the model exactly
+these pixels. golden_crops builds the crops they are compared on.
+"""
+import cv2
+import numpy as np
+
+from utils.sign_preprocessing import IMG_SIZE, crop_hand_region
+
+
+def reference_model_input(image):
+    """The original preprocess_image + prepare_for_model, kept verbatim as the golden output"""
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    blur = cv2.GaussianBlur(gray, (5, 5), 2)
+    thresh = cv2.adaptiveThreshold(blur, 255,
+                                   cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+                                   cv2.THRESH_BINARY_INV, 11, 2)
+    _, final = cv2.threshold(thresh, 70, 255,
+                             cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    resized = cv2.resize(final, IMG_SIZE)
+    return np.expand_dims(resized.astype('float32') / 255.0, axis=-1)
+
+
+def synthetic_hand_crops(rng, resolutions=((480, 640), (720, 1280), (240, 320)), per_frame=4):
+    """Hand crops from noise frames of different resolutions, hands partly outside the frame included"""
+    crops = []
+    for height, width in resolutions:
+        frame = cv2.resize(rng.integers(0, 256, (height // 8, width // 8, 3), dtype=np.uint8), (width, height))
+        for _ in range(per_frame):
+            center = rng.uniform((0, 0), (width, height))
+            points = center + rng.normal(0, min(width, height) / 10, (21, 2))
+            crop = crop_hand_region(frame, points.astype(np.int32))
+            if crop is not None:
+                crops.append(crop)
+    return crops
+
+
+def golden_crops(seed=0, hand_crops=None, odd_crops=64):
+    """Crops to compare on: hand crops (synthetic unless given), then odd sizes and flat images"""
+    rng = np.random.default_rng(seed)
+    crops = list(synthetic_hand_crops(rng) if hand_crops is None else hand_crops)
+    # Odd sizes, non-square crops and flat images exercise borders and degenerate thresholds
+    for _ in range(odd_crops):
+        height, width = rng.integers(16, 400, 2)
+        crops.append(cv2.resize(rng.integers(0, 256, (height // 4 + 1, width // 4 + 1, 3), dtype=np.uint8),
+                                (int(width), int(height))))
+    crops += [np.full((256, 256, 3), value, dtype=np.uint8) for value in (0, 127, 255)]
+    return crops
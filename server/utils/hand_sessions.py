@@ -0,0 +1,163 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from utils.stream_smoother import StreamState
+
+logger = logging.getLogger(__name__)
+
+
+class HandSession:
+    """Per-client hand tracker that keeps MediaPipe state between frames"""
+
+    def __init__(self, client_id, detection_con=0.5, track_con=0.5, stream_factory=StreamState):
+        import HandTrackingModule as htm  # imports MediaPipe on first session
+
+        self.client_id = client_id
+        # Video mode: after the first detection MediaPipe tracks landmarks
+        # from the previous frame instead of re-running palm detection
+        self.detector = htm.handDetector(mode=False, maxHands=1,
+                                         detectionCon=detection_con,
+                                         trackCon=track_con)
+        self.stream = stream_factory()
+        self.lock = threading.Lock()
+        self.last_used = time.monotonic()
+
+    def find_position(self, image):
+        """Run the tracker on a BGR frame and return [id, cx, cy] landmarks"""
+        with self.lock:
+            self.last_used = time.monotonic()
+            self.detector.findHands(image, draw=False)
+            return self.detector.findPosition(image, draw=False)
+
+    def close(self):
+        with self.lock:
+            self.detector.close()
+
+
+class HandSessionPool:
+    """LRU-capped pool of hand tracking sessions keyed by Socket.IO sid"""
+
+    def __init__(self, max_sessions=64, idle_timeout=120, session_factory=HandSession):
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.session_factory = session_factory
+        self.sessions = OrderedDict()
+        # Frames running on each session; a session dropped while leased
+        # goes to _retired and is closed when its last lease ends
+        self._leases = {}
+        self._retired = set()
+        self._lock = threading.Lock()
+
+    def open(self, client_id):
+        return self.get(client_id)
+
+    def get(self, client_id):
+        """Return the client's session, creating it (and evicting old ones) if needed
+
+        The session can be closed by a later eviction at any time; use lease()
+        to run the tracker on it.
+        """
+        return self._get(client_id, 0)
+
+    @contextmanager
+    def lease(self, client_id):
+        """The client's session, kept open until the block ends even if it is evicted meanwhile"""
+        session = self._get(client_id, 1)
+        try:
+            yield session
+        finally:
+            with self._lock:
+                remaining = self._leases.pop(session) - 1
+                if remaining:
+                    self._leases[session] = remaining
+                release = not remaining and session in self._retired
+                if release:
+                    self._retired.remove(session)
+            if release:
+                session.close()
+
+    def _get(self, client_id, lease):
+        with self._lock:
+            session = self.sessions.get(client_id)
+            if session is not None:
+                self.sessions.move_to_end(client_id)
+                self._lease(session, lease)
+                return session
+
+        # Building a MediaPipe graph is slow: don't hold up every other client's frames
+        created = self.session_factory(client_id)
+
+        expired = []
+        with self._lock:
+            session = self.sessions.get(client_id)
+            if session is not None:
+                # Another thread created one first
+                self.sessions.move_to_end(client_id)
+                expired.append(created)
+            else:
+                evicted = self._pop_idle()
+                while len(self.sessions) >= self.max_sessions:
+                    evicted.append(self.sessions.popitem(last=False)[1])
+                expired.extend(self._retire(evicted))
+                session = self.sessions[client_id] = created
+            self._lease(session, lease)
+
+        # Release MediaPipe graphs outside the pool lock
+        for old in expired:
+            old.close()
+        return session
+
+    def close(self, client_id):
+        with self._lock:
+            session = self.sessions.pop(client_id, None)
+            expired = self._retire([session] if session is not None else [])
+        for old in expired:
+            old.close()
+
+    def reap_idle(self):
+        with self._lock:
+            evicted = self._pop_idle()
+            expired = self._retire(evicted)
+        for old in expired:
+            old.close()
+        return len(evicted)
+
+    def reap_in_background(self, interval=None):
+        """Close idle sessions from a background thread (every idle_timeout / 2 by default)"""
+        interval = interval or max(self.idle_timeout / 2, 1.0)
+
+        def run():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.reap_idle()
+                except Exception as e:
+                    logger.error("Reaping idle hand sessions failed: %s", e)
+
+        threading.Thread(target=run, name='hand-session-reaper', daemon=True).start()
+        return self
+
+    def _lease(self, session, count):
+        if count:
+            self._leases[session] = self._leases.get(session, 0) + count
+
+    def _retire(self, sessions):
+        """Sessions that left the pool and can be closed now; leased ones close on release"""
+        closable = []
+        for session in sessions:
+            if session in self._leases:
+                self._retired.add(session)
+            else:
+                closable.append(session)
+        return closable
+
+    def _pop_idle(self):
+        cutoff = time.monotonic() - self.idle_timeout
+        idle = [cid for cid, s in self.sessions.items() if s.last_used < cutoff]
+        return [self.sessions.pop(cid) for cid in idle]
+
+    def __len__(self):
+        return len(self.sessions)
@@ -0,0 +1,132 @@
+import numpy as np
+
+# MediaPipe landmark indices used by the finger-state rules
+FINGER_DIP = [6, 10, 14, 18]
+FINGER_PIP = [7, 11, 15, 19]
+FINGER_TIP = [8, 12, 16, 20]
+
+# Finger state codes; NaN means no state rule matched for that finger
+BENT_SIDEWAYS = 0.25
+CLOSED = 0.0
+HALF_OPEN = 0.5
+OPEN = 1.0
+
+
+def landmarks_to_array(posList):
+    """Convert a [(id, cx, cy), ...] landmark list into a (21, 2) float array"""
+    points = np.zeros((21, 2), dtype=np.float32)
+    for id, cx, cy in posList[:21]:
+        points[id] = (cx, cy)
+    return points
+
+
+class HandFeatures:
+    """Vectorized landmark features for a batch of (N, 21, 2) hands"""
+
+    def __init__(self, points):
+        self.X = points[..., 0]
+        self.Y = points[..., 1]
+        self.states = finger_states(points)
+        self.n = np.count_nonzero(~np.isnan(self.states), axis=1)
+
+    def x(self, i):
+        return self.X[:, i]
+
+    def y(self, i):
+        return self.Y[:, i]
+
+    def count(self, state):
+        return np.count_nonzero(self.states == state, axis=1)
+
+    def finger(self, k):
+        # Equivalent of fingers[k] on the compacted per-hand list (NaN if missing)
+        return self.states[:, k]
+
+
+def finger_states(points):
+    """Return (N, 4) finger states, compacted left like the original list appends"""
+    X = points[..., 0]
+    Y = points[..., 1]
+    tip_x, tip_y = X[:, FINGER_TIP], Y[:, FINGER_TIP]
+    dip_x, dip_y = X[:, FINGER_DIP], Y[:, FINGER_DIP]
+    pip_x, pip_y = X[:, FINGER_PIP], Y[:, FINGER_PIP]
+
+    sideways = (tip_x + 25 < dip_x) & (Y[:, [16]] < Y[:, [20]])
+    closed = tip_y > dip_y
+    opened = tip_y < pip_y
+    half_open = (tip_x > pip_x) & (tip_x > dip_x)
+
+    states = np.select([sideways, closed, opened, half_open],
+                       [BENT_SIDEWAYS, CLOSED, OPEN, HALF_OPEN],
+                       default=np.nan)
+
+    # Fingers without a state were never appended, so later ones shift left
+    order = np.argsort(np.isnan(states), axis=1, kind='stable')
+    return np.take_along_axis(states, order, axis=1)
+
+
+# Declarative rule table, evaluated top to bottom: the first rule whose `when`
+# mask matches decides the hand. If it also has a `then` mask, the letter is
+# only emitted where that holds; otherwise the result stays empty.
+SIGN_RULES = [
+    ('A', lambda f: (f.y(3) > f.y(4)) & (f.x(3) > f.x(6)) & (f.y(4) < f.y(6)) & (f.count(CLOSED) == 4), None),
+    ('B', lambda f: (f.x(3) > f.x(4)) & (f.count(OPEN) == 4), None),
+    ('C', lambda f: (f.x(3) > f.x(6)) & (f.count(HALF_OPEN) >= 1) & (f.y(4) > f.y(8)), None),
+    ('D', lambda f: (f.finger(0) == OPEN) & (f.count(CLOSED) == 3) & (f.x(3) > f.x(4)), None),
+    ('E', lambda f: (f.x(3) < f.x(6)) & (f.count(CLOSED) == 4) & (f.y(12) < f.y(4)), None),
+    ('F', lambda f: (f.count(OPEN) == 3) & (f.finger(0) == CLOSED) & (f.y(3) > f.y(4)), None),
+    ('G', lambda f: (f.finger(0) == BENT_SIDEWAYS) & (f.count(CLOSED) == 3), None),
+    ('H', lambda f: (f.finger(0) == BENT_SIDEWAYS) & (f.finger(1) == BENT_SIDEWAYS) & (f.count(CLOSED) == 2), None),
+    ('I', lambda f: (f.x(4) < f.x(6)) & (f.count(CLOSED) == 3),
+          lambda f: (f.n == 4) & (f.finger(3) == OPEN)),
+    ('K', lambda f: (f.x(4) < f.x(6)) & (f.x(4) > f.x(10)) & (f.count(OPEN) == 2), None),
+    ('L', lambda f: (f.finger(0) == OPEN) & (f.count(CLOSED) == 3) & (f.x(3) < f.x(4)), None),
+    ('M', lambda f: (f.x(4) < f.x(16)) & (f.count(CLOSED) == 4), None),
+    ('N', lambda f: (f.x(4) < f.x(12)) & (f.count(CLOSED) == 4), None),
+    ('O', lambda f: (f.y(4) < f.y(8)) & (f.y(4) < f.y(12)) & (f.y(4) < f.y(16)) & (f.y(4) < f.y(20)), None),
+    ('P', lambda f: (f.finger(2) == CLOSED) & (f.y(4) < f.y(12)) & (f.y(4) > f.y(6)),
+          lambda f: (f.n == 4) & (f.finger(3) == CLOSED)),
+    ('Q', lambda f: (f.finger(1) == CLOSED) & (f.finger(2) == CLOSED) & (f.finger(3) == CLOSED)
+                    & (f.y(8) > f.y(5)) & (f.y(4) < f.y(1)), None),
+    ('R', lambda f: (f.x(8) < f.x(12)) & (f.count(OPEN) == 2) & (f.x(9) > f.x(4)), None),
+    ('T', lambda f: (f.x(4) > f.x(12)) & (f.y(4) < f.y(6)) & (f.count(CLOSED) == 4), None),
+    ('S', lambda f: (f.x(4) > f.x(12)) & (f.y(4) < f.y(12)) & (f.count(CLOSED) == 4), None),
+    ('U', lambda f: (f.x(4) < f.x(6)) & (f.x(4) < f.x(10)) & (f.count(OPEN) == 2) & (f.y(3) > f.y(4))
+                    & ((f.x(8) - f.x(11)) <= 50), None),
+    ('V', lambda f: (f.x(4) < f.x(6)) & (f.x(4) < f.x(10)) & (f.count(OPEN) == 2) & (f.y(3) > f.y(4)), None),
+    ('W', lambda f: (f.x(4) < f.x(6)) & (f.x(4) < f.x(10)) & (f.count(OPEN) == 3), None),
+    ('X', lambda f: (f.finger(0) == HALF_OPEN) & (f.count(CLOSED) == 3) & (f.x(4) > f.x(6)), None),
+    ('Y', lambda f: (f.count(CLOSED) == 3) & (f.x(3) < f.x(4)),
+          lambda f: (f.n == 4) & (f.finger(3) == OPEN)),
+]
+
+
+def classify_hand_signs(points):
+    """Classify a (21, 2) hand or an (N, 21, 2) batch; returns an array of letters"""
+    points = np.asarray(points, dtype=np.float32)
+    single = points.ndim == 2
+    if single:
+        points = points[np.newaxis]
+
+    features = HandFeatures(points)
+    results = np.full(len(points), '', dtype='<U1')
+    decided = np.zeros(len(points), dtype=bool)
+
+    for letter, when, then in SIGN_RULES:
+        matched = when(features) & ~decided
+        if not matched.any():
+            continue
+        emit = matched if then is None else matched & then(features)
+        results[emit] = letter
+        decided |= matched
+        if decided.all():
+            break
+
+    return results[0] if single else results
+
+
+def detect_hand_sign(posList):
+    """Rule-based letter for a single [(id, cx, cy), ...] landmark list"""
+    if not posList or len(posList) < 21:  # Need all 21 hand landmarks
+        return ""
+    return str(classify_hand_signs(landmarks_to_array(posList)))
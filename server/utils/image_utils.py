@@ -1,24 +1,223 @@
-import cv2
-import numpy as np
-from PIL import Image
-
-def extract_signature_regions(pil_image):
-    # Convert to grayscale and detect edges
-    open_cv_image = np.array(pil_image)
-    gray = cv2.cvtColor(open_cv_image, cv2.COLOR_RGB2GRAY)
-    blur = cv2.GaussianBlur(gray, (5, 5), 0)
-    _, thresh = cv2.threshold(blur, 127, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
-
-    # Find contours
-    contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-
-    signature_images = []
-    for cnt in contours:
-        x, y, w, h = cv2.boundingRect(cnt)
-
-        # Heuristic: Signature-like bounding box (adjust as needed)
-        if w > 100 and h > 30 and w/h > 2:
-            cropped = pil_image.crop((x, y, x + w, y + h))
-            signature_images.append(cropped)
-
-    return signature_images
+import math
+import os
+
+import cv2
+import numpy as np
+from PIL import Image
+
+# Heuristic: Signature-like bounding box (adjust as needed)
+MIN_WIDTH, MIN_HEIGHT, MIN_ASPECT = 100, 30, 2
+
+# Margin (full-resolution pixels) kept around proxy candidates when they are re-read
+REFINE_MARGIN = 16
+
+# Largest page (in pixels) decoded in full; uncompressed striped pages are read strip by strip instead
+DOCUMENT_MAX_PIXELS = int(os.environ.get('DOCUMENT_MAX_PIXELS', 64_000_000))
+# Rows per strip-wise read of a striped page
+STRIP_ROWS = 256
+
+
+def threshold_ink(gray, threshold=None):
+    """Blur and binarize a grayscale page (ink = 255) with Otsu's threshold unless one is given"""
+    blur = cv2.GaussianBlur(gray, (5, 5), 0)
+    if threshold is None:
+        return cv2.threshold(blur, 127, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)[::-1]
+    return cv2.threshold(blur, threshold, 255, cv2.THRESH_BINARY_INV)[1], threshold
+
+
+def contour_boxes(thresh, min_width=MIN_WIDTH, min_height=MIN_HEIGHT, min_aspect=MIN_ASPECT):
+    # Find contours
+    contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+    boxes = []
+    for cnt in contours:
+        x, y, w, h = cv2.boundingRect(cnt)
+        if w > min_width and h > min_height and w / h > min_aspect:
+            boxes.append((x, y, w, h))
+
+    return boxes
+
+
+def signature_boxes(gray, threshold=None):
+    """(x, y, w, h) boxes of signature-like contours on a grayscale array, and the threshold used"""
+    thresh, threshold = threshold_ink(gray, threshold)
+    return contour_boxes(thresh), threshold
+
+
+def find_signature_boxes(pil_image):
+    """Return (x, y, w, h) boxes of signature-like contours on a page"""
+    return signature_boxes(np.asarray(pil_image.convert('L')))[0]
+
+
+def extract_signature_regions(pil_image):
+    signature_images = []
+    for x, y, w, h in find_signature_boxes(pil_image):
+        cropped = pil_image.crop((x, y, x + w, y + h))
+        signature_images.append(cropped)
+
+    return signature_images
+
+
+def raw_strips(image):
+    """[(y0, y1, offset, rawmode, stride)] for a page stored as uncompressed full-width strips, else None
+
+    Such pages (uncompressed TIFF, top-down raw formats) can be read a few
+    rows at a time. Compressed TIFFs are decoded by libtiff as one tile and
+    so are never split here.
+    """
+    if image.mode not in ('1', 'L', 'RGB', 'RGBA'):
+        return None
+    strips = []
+    for decoder, (x0, y0, x1, y1), offset, args in image.tile:
+        rawmode, stride, orientation = (args + (0, 1))[:3] if isinstance(args, tuple) else (args, 0, 1)
+        if decoder != 'raw' or (x0, x1) != (0, image.width) or orientation < 0:
+            return None
+        if not stride:
+            try:
+                stride = len(Image.new(image.mode, (image.width, 1)).tobytes('raw', rawmode))
+            except (ValueError, OSError):
+                return None
+        strips.append((y0, y1, offset, rawmode, stride))
+    return strips or None
+
+
+def read_rows(image, strips, top, bottom):
+    """Rows [top, bottom) of a striped page (see raw_strips), reading only those rows from the file"""
+    bands = []
+    for y0, y1, offset, rawmode, stride in strips:
+        lo, hi = max(top, y0), min(bottom, y1)
+        if lo < hi:
+            image.fp.seek(offset + (lo - y0) * stride)
+            data = image.fp.read((hi - lo) * stride)
+            bands.append(Image.frombytes(image.mode, (image.width, hi - lo), data, 'raw', rawmode, stride))
+    if len(bands) == 1:
+        return bands[0]
+    rows = Image.new(image.mode, (image.width, bottom - top))
+    y = 0
+    for band in bands:
+        rows.paste(band, (0, y))
+        y += band.height
+    return rows
+
+
+def crop_page(image, strips, box):
+    """image.crop(box), reading only the rows it covers when the page is striped"""
+    if strips is None:
+        return image.crop(box)
+    x0, y0, x1, y1 = box
+    return read_rows(image, strips, y0, y1).crop((x0, 0, x1, y1 - y0))
+
+
+def check_page_size(image):
+    """Raise ValueError for a page too large to decode in full (striped pages never are)
+
+    JPEG pages count too: their proxy is drafted, but the regions around
+    candidates are cropped from the fully decoded page.
+    """
+    width, height = image.size
+    if width * height > DOCUMENT_MAX_PIXELS and raw_strips(image) is None:
+        raise ValueError(f"Page of {width}x{height} pixels is larger than "
+                         f"DOCUMENT_MAX_PIXELS ({DOCUMENT_MAX_PIXELS})")
+
+
+def page_proxy(image, max_side):
+    """Grayscale copy of a page with its longest side at most max_side
+
+    - JPEG pages are decoded at reduced size (draft, 1/2 to 1/8 scale).
+    - Uncompressed striped pages are read STRIP_ROWS rows at a time and each
+      band is box-filtered down (reduce); memory stays at one band.
+    - Anything else (PNG, compressed TIFF, ...) is decoded in full, then
+      reduced: a page of W x H pixels needs W * H * bands bytes.
+
+    Pages that are not striped and are over DOCUMENT_MAX_PIXELS, JPEG
+    included, are refused with ValueError (see check_page_size).
+
+    Returns the proxy and whether `image` was drafted and so can no longer
+    give full-resolution pixels.
+    """
+    width, height = image.size
+    drafted = False
+    strips = raw_strips(image)
+    if strips is not None:
+        factor = math.ceil(max(width, height) / max_side)
+        if factor > 1:
+            step = max(STRIP_ROWS // factor, 1) * factor
+            bands = []
+            for top in range(0, height, step):
+                band = read_rows(image, strips, top, min(top + step, height))
+                if band.mode not in ('L', 'RGB', 'RGBA'):
+                    band = band.convert('L')
+                bands.append(band.reduce(factor).convert('L'))
+            proxy = Image.new('L', (bands[0].width, sum(band.height for band in bands)))
+            for i, band in enumerate(bands):
+                proxy.paste(band, (0, i * step // factor))
+            return proxy, False
+    else:
+        check_page_size(image)
+    if image.format == 'JPEG' and max(width, height) > max_side:
+        # Decodes straight from the DCT coefficients at 1/2, 1/4 or 1/8 scale
+        image.draft('L', (width * max_side // max(width, height), height * max_side // max(width, height)))
+        drafted = image.size != (width, height)
+    if image.mode not in ('L', 'RGB', 'RGBA'):
+        image = image.convert('L')
+    factor = math.ceil(max(image.size) / max_side)
+    proxy = image.reduce(factor) if factor > 1 else image
+    return proxy.convert('L'), drafted
+
+
+def merge_regions(regions):
+    """Merge overlapping (x0, y0, x1, y1) regions so no pixel is re-read twice"""
+    merged = []
+    for region in sorted(regions):
+        for i, other in enumerate(merged):
+            if region[0] < other[2] and other[0] < region[2] and region[1] < other[3] and other[1] < region[3]:
+                merged[i] = (min(region[0], other[0]), min(region[1], other[1]),
+                             max(region[2], other[2]), max(region[3], other[3]))
+                break
+        else:
+            merged.append(region)
+    return merged if len(merged) == len(regions) else merge_regions(merged)
+
+
+def locate_signatures(path, index=0, max_side=1600):
+    """[(box, RGB crop)] for the signatures on page `index` of an image file
+
+    Candidates are found on a downscaled proxy of the page. Only the regions
+    around them are then thresholded at full resolution, with the proxy's
+    Otsu threshold, and only the final boxes are converted to RGB.
+    """
+    with Image.open(path) as image:
+        image.seek(index)
+        width, height = image.size
+        proxy, drafted = page_proxy(image, max_side)
+        scale_x, scale_y = width / proxy.width, height / proxy.height
+
+        thresh, threshold = threshold_ink(np.asarray(proxy))
+        # Strokes blur together on the proxy: keep anything half the minimum size, whatever its shape
+        candidates = contour_boxes(thresh, MIN_WIDTH / scale_x / 2, MIN_HEIGHT / scale_y / 2, 0)
+        if not candidates:
+            return []
+        regions = merge_regions([
+            (max(int(x * scale_x) - REFINE_MARGIN, 0), max(int(y * scale_y) - REFINE_MARGIN, 0),
+             min(math.ceil((x + w) * scale_x) + REFINE_MARGIN, width),
+             min(math.ceil((y + h) * scale_y) + REFINE_MARGIN, height))
+            for x, y, w, h in candidates
+        ])
+
+        if not drafted:
+            return refine_regions(image, regions, threshold)
+    with Image.open(path) as image:
+        image.seek(index)
+        return refine_regions(image, regions, threshold)
+
+
+def refine_regions(page, regions, threshold):
+    """Signature boxes and RGB crops inside the given full-resolution regions, top to bottom"""
+    strips = raw_strips(page)
+    found = set()
+    for x0, y0, x1, y1 in regions:
+        gray = np.asarray(crop_page(page, strips, (x0, y0, x1, y1)).convert('L'))
+        for x, y, w, h in signature_boxes(gray, threshold)[0]:
+            found.add((x + x0, y + y0, w, h))
+    return [((x, y, w, h), crop_page(page, strips, (x, y, x + w, y + h)).convert('RGB'))
+            for x, y, w, h in sorted(found, key=lambda box: (box[1], box[0]))]
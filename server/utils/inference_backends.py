@@ -0,0 +1,161 @@
+import os
+
+import numpy as np
+
+# Default model file for each backend, as written by export_model.py
+DEFAULT_MODEL_PATHS = {
+    'keras': 'AI-Model/asl_to_text_advanced.h5',
+    'tflite': 'AI-Model/asl_to_text_advanced.tflite',
+    'onnx': 'AI-Model/asl_to_text_advanced.onnx',
+}
+
+
+class KerasBackend:
+    """Runs the original .h5 model through TensorFlow/Keras"""
+
+    name = 'keras'
+
+    def __init__(self, model_path, threads=None, model_bytes=None):
+        import tensorflow as tf
+        if threads:
+            tf.config.threading.set_intra_op_parallelism_threads(threads)
+            tf.config.threading.set_inter_op_parallelism_threads(1)
+        self.model_path = model_path
+        self.model = tf.keras.models.load_model(model_path)
+
+    def predict(self, batch):
+        return np.asarray(self.model.predict_on_batch(batch))
+
+
+class TFLiteBackend:
+    """Runs an exported .tflite model, handling int8-quantized inputs and outputs
+
+    Resizing an interpreter reallocates all of its tensors, and batch sizes
+    change from one micro-batch to the next. Batches are instead padded up to
+    a power of two, and each padded size gets its own interpreter, allocated
+    once. All of them run from the same model bytes or memory-mapped file.
+    """
+
+    name = 'tflite'
+
+    def __init__(self, model_path, threads=None, model_bytes=None):
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            from tensorflow.lite import Interpreter
+        self.model_path = model_path
+        if model_bytes is not None:
+            # The interpreter keeps pointing into model_bytes instead of copying it
+            self._make_interpreter = lambda: Interpreter(model_content=model_bytes,
+                                                         num_threads=threads or os.cpu_count())
+        else:
+            self._make_interpreter = lambda: Interpreter(model_path=model_path,
+                                                         num_threads=threads or os.cpu_count())
+        self._spare = self._make_interpreter()
+        self.input = self._spare.get_input_details()[0]
+        self.output = self._spare.get_output_details()[0]
+        # padded batch size -> (interpreter allocated for it, input buffer)
+        self.interpreters = {}
+
+    def _interpreter(self, batch_size):
+        padded = 1 << (batch_size - 1).bit_length()
+        if padded not in self.interpreters:
+            interpreter, self._spare = self._spare or self._make_interpreter(), None
+            shape = [padded] + list(self.input['shape'][1:])
+            interpreter.resize_tensor_input(self.input['index'], shape)
+            interpreter.allocate_tensors()
+            # Rows past the real batch keep stale frames; their outputs are sliced off
+            self.interpreters[padded] = (interpreter, np.zeros(shape, dtype=self.input['dtype']))
+        return self.interpreters[padded]
+
+    def predict(self, batch):
+        interpreter, inputs = self._interpreter(len(batch))
+
+        scale, zero_point = self.input['quantization']
+        if self.input['dtype'] != np.float32 and scale:
+            # Out-of-range values saturate instead of wrapping around on the cast to int8/uint8
+            limits = np.iinfo(self.input['dtype'])
+            batch = np.clip(np.round(batch / scale + zero_point), limits.min, limits.max)
+        inputs[:len(batch)] = batch
+        interpreter.set_tensor(self.input['index'], inputs)
+        interpreter.invoke()
+        result = interpreter.get_tensor(self.output['index'])[:len(batch)]
+
+        scale, zero_point = self.output['quantization']
+        if self.output['dtype'] != np.float32 and scale:
+            result = (result.astype(np.float32) - zero_point) * scale
+        return result
+
+
+class ONNXBackend:
+    """Runs an exported .onnx model through ONNX Runtime on the CPU"""
+
+    name = 'onnx'
+
+    def __init__(self, model_path, threads=None, model_bytes=None):
+        import onnxruntime as ort
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+            options.inter_op_num_threads = 1
+        self.model_path = model_path
+        if model_bytes is not None:
+            # ORT-format bytes (see load_weights): initializers are used in place, not copied
+            options.add_session_config_entry('session.use_ort_model_bytes_directly', '1')
+            options.add_session_config_entry('session.use_ort_model_bytes_for_initializers', '1')
+            self.session = ort.InferenceSession(model_bytes, options, providers=['CPUExecutionProvider'])
+        else:
+            self.session = ort.InferenceSession(model_path, options, providers=['CPUExecutionProvider'])
+        self.input_name = self.session.get_inputs()[0].name
+
+    def predict(self, batch):
+        return self.session.run(None, {self.input_name: batch.astype(np.float32)})[0]
+
+
+BACKENDS = {
+    'keras': KerasBackend,
+    'tflite': TFLiteBackend,
+    'onnx': ONNXBackend,
+}
+
+
+def load_backend(name='keras', model_path=None, threads=None, model_bytes=None):
+    """Create the inference backend selected by name, optionally over weights from load_weights"""
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown inference backend '{name}', expected one of {sorted(BACKENDS)}")
+    return BACKENDS[name](model_path or DEFAULT_MODEL_PATHS[name], threads=threads, model_bytes=model_bytes)
+
+
+def ort_format_model(model_path):
+    """Path of an ORT-format copy of an .onnx model, converting it when missing or stale"""
+    if model_path.endswith('.ort'):
+        return model_path
+    ort_path = os.path.splitext(model_path)[0] + '.ort'
+    if os.path.exists(ort_path) and os.path.getmtime(ort_path) >= os.path.getmtime(model_path):
+        return ort_path
+
+    import onnxruntime as ort
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    options.optimized_model_filepath = ort_path + '.tmp'
+    options.add_session_config_entry('session.save_model_format', 'ORT')
+    ort.InferenceSession(model_path, options, providers=['CPUExecutionProvider'])
+    os.replace(ort_path + '.tmp', ort_path)
+    return ort_path
+
+
+def load_weights(name='keras', model_path=None):
+    """Model file bytes that tflite/onnx backends can run from without copying, or None
+
+    Read once in a parent process before forking, the bytes stay one physical
+    copy shared by every worker. Keras models are always copied into
+    TensorFlow tensors, so there is nothing to share.
+    """
+    if name == 'keras':
+        return None
+    model_path = model_path or DEFAULT_MODEL_PATHS[name]
+    if name == 'onnx':
+        model_path = ort_format_model(model_path)
+    with open(model_path, 'rb') as f:
+        return f.read()
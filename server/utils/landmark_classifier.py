@@ -0,0 +1,107 @@
+import os
+
+import numpy as np
+
+WRIST, INDEX_MCP, PINKY_MCP = 0, 5, 17
+
+
+def normalize_landmarks(points, mirror=True):
+    """(N, 21, 2) or (21, 2) pixel landmarks -> (N, 42) translation, scale and handedness invariant features
+
+    Landmarks are moved so the wrist is the origin, scaled by the largest
+    wrist distance and, with mirror, flipped so the palm always faces the same
+    way, which makes left and right hands (and front/back cameras) look alike.
+    """
+    points = np.asarray(points, dtype=np.float32)
+    if points.ndim == 2:
+        points = points[np.newaxis]
+    centered = points - points[:, WRIST:WRIST + 1]
+
+    scale = np.linalg.norm(centered, axis=2).max(axis=1)
+    centered = centered / np.maximum(scale, 1e-6)[:, np.newaxis, np.newaxis]
+
+    if mirror:
+        # Sign of the palm's winding (wrist -> index knuckle -> pinky knuckle) tells the hands apart
+        index, pinky = centered[:, INDEX_MCP], centered[:, PINKY_MCP]
+        winding = index[:, 0] * pinky[:, 1] - index[:, 1] * pinky[:, 0]
+        centered[winding < 0, :, 0] *= -1
+
+    return centered.reshape(len(points), -1)
+
+
+class LandmarkClassifier:
+    """One-hidden-layer MLP over normalized landmarks; tens of microseconds per hand"""
+
+    def __init__(self, classes, w1, b1, w2, b2):
+        self.classes = np.asarray(classes)
+        self.w1, self.b1, self.w2, self.b2 = w1, b1, w2, b2
+
+    def predict_proba(self, points):
+        hidden = np.maximum(normalize_landmarks(points) @ self.w1 + self.b1, 0)
+        logits = hidden @ self.w2 + self.b2
+        exp = np.exp(logits - logits.max(axis=1, keepdims=True))
+        return exp / exp.sum(axis=1, keepdims=True)
+
+    def predict(self, points):
+        """Returns (letters, confidences) arrays for a batch, or a (letter, confidence) pair for one hand"""
+        probabilities = self.predict_proba(points)
+        best = probabilities.argmax(axis=1)
+        letters, confidences = self.classes[best], probabilities[np.arange(len(best)), best]
+        if np.ndim(points) == 2:
+            return str(letters[0]), float(confidences[0])
+        return letters, confidences
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = path + '.tmp.npz'
+        np.savez(tmp_path, classes=self.classes, w1=self.w1, b1=self.b1, w2=self.w2, b2=self.b2)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data['classes'], data['w1'], data['b1'], data['w2'], data['b2'])
+
+    @classmethod
+    def train(cls, points, labels, hidden=64, epochs=60, batch_size=256, learning_rate=0.005,
+              weight_decay=1e-4, seed=0):
+        """Mini-batch Adam on softmax cross-entropy"""
+        features = normalize_landmarks(points)
+        classes, targets = np.unique(labels, return_inverse=True)
+        one_hot = np.eye(len(classes), dtype=np.float32)[targets]
+        rng = np.random.default_rng(seed)
+        params = [
+            rng.normal(0, np.sqrt(2 / features.shape[1]), (features.shape[1], hidden)).astype(np.float32),
+            np.zeros(hidden, dtype=np.float32),
+            rng.normal(0, np.sqrt(1 / hidden), (hidden, len(classes))).astype(np.float32),
+            np.zeros(len(classes), dtype=np.float32),
+        ]
+        moments = [np.zeros_like(p) for p in params]
+        velocities = [np.zeros_like(p) for p in params]
+
+        step = 0
+        for _ in range(epochs):
+            order = rng.permutation(len(features))
+            for start in range(0, len(order), batch_size):
+                batch = order[start:start + batch_size]
+                x, y = features[batch], one_hot[batch]
+                w1, b1, w2, b2 = params
+
+                pre = x @ w1 + b1
+                hidden_out = np.maximum(pre, 0)
+                logits = hidden_out @ w2 + b2
+                exp = np.exp(logits - logits.max(axis=1, keepdims=True))
+                d_logits = (exp / exp.sum(axis=1, keepdims=True) - y) / len(batch)
+                d_hidden = (d_logits @ w2.T) * (pre > 0)
+                grads = [x.T @ d_hidden + weight_decay * w1, d_hidden.sum(axis=0),
+                         hidden_out.T @ d_logits + weight_decay * w2, d_logits.sum(axis=0)]
+
+                step += 1
+                for p, g, m, v in zip(params, grads, moments, velocities):
+                    m *= 0.9
+                    m += 0.1 * g
+                    v *= 0.999
+                    v += 0.001 * g * g
+                    p -= learning_rate * (m / (1 - 0.9 ** step)) / (np.sqrt(v / (1 - 0.999 ** step)) + 1e-8)
+
+        return cls(classes, *params)
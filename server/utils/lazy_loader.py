@@ -0,0 +1,112 @@
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Every LazyResource registers itself here so readiness can be reported in one place
+resources = {}
+
+
+class LazyResource:
+    """A heavy subsystem that is loaded and warmed on first use or in the background"""
+
+    def __init__(self, name, loader, warmup=None, required=True, health=None):
+        self.name = name
+        self.loader = loader
+        self.warmup = warmup
+        self.required = required
+        # Optional check on the loaded value, e.g. that worker processes are still alive
+        self.health = health
+        self.status = 'cold'
+        self.error = None
+        self.load_seconds = None
+        self._value = None
+        self._lock = threading.Lock()
+        resources[name] = self
+
+    def get(self):
+        if self.status == 'ready':
+            return self._value
+        with self._lock:
+            if self.status != 'ready':
+                self._load()
+        return self._value
+
+    def _load(self):
+        self.status = 'loading'
+        start = time.perf_counter()
+        try:
+            value = self.loader()
+            if self.warmup is not None:
+                self.warmup(value)
+        except Exception as e:
+            self.status = 'failed'
+            self.error = str(e)
+            logger.error("Loading %s failed: %s", self.name, e)
+            raise
+        self._value = value
+        self.load_seconds = time.perf_counter() - start
+        self.error = None
+        self.status = 'ready'
+        logger.info("%s ready in %.2fs", self.name, self.load_seconds)
+
+    def set(self, value):
+        """Install an already loaded value, e.g. a stand-in model in benchmarks"""
+        with self._lock:
+            self._value = value
+            self.load_seconds = 0.0
+            self.error = None
+            self.status = 'ready'
+
+    def start_background(self):
+        def load_quietly():
+            try:
+                self.get()
+            except Exception:
+                pass
+        thread = threading.Thread(target=load_quietly, name=f"load-{self.name}", daemon=True)
+        thread.start()
+        return thread
+
+    def healthy(self):
+        return self.status == 'ready' and (self.health is None or self.health(self._value))
+
+    def describe(self):
+        return {
+            'status': 'degraded' if self.status == 'ready' and not self.healthy() else self.status,
+            'required': self.required,
+            'load_seconds': round(self.load_seconds, 3) if self.load_seconds is not None else None,
+            'error': self.error,
+        }
+
+
+def readiness():
+    """Return (ready, per-resource status) for all registered resources"""
+    report = {name: resource.describe() for name, resource in resources.items()}
+    ready = all(r.healthy() for r in resources.values() if r.required)
+    return ready, report
+
+
+def load_all(background=False, on_ready=None):
+    """Load every registered resource, either inline or on background threads"""
+    if not background:
+        for resource in resources.values():
+            try:
+                resource.get()
+            except Exception:
+                # Optional subsystems may stay cold; required ones abort startup
+                if resource.required:
+                    raise
+        if on_ready:
+            on_ready()
+        return
+
+    threads = [resource.start_background() for resource in resources.values()]
+
+    def wait_for_all():
+        for thread in threads:
+            thread.join()
+        if on_ready and readiness()[0]:
+            on_ready()
+    threading.Thread(target=wait_for_all, name='load-all', daemon=True).start()
@@ -0,0 +1,173 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Latency buckets in seconds, from sub-millisecond stages up to slow full frames
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+
+metrics = []
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{k}="{v}"' for k, v in labels) + '}'
+
+
+class Counter:
+    def __init__(self, name, help, label=None):
+        self.name = name
+        self.help = help
+        self.label = label
+        self.values = {}
+        self._lock = threading.Lock()
+        metrics.append(self)
+
+    def inc(self, amount=1, label=None):
+        with self._lock:
+            self.values[label] = self.values.get(label, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+        # inc() may add a label mid-scrape: iterate over a copy
+        with self._lock:
+            snapshot = dict(self.values)
+        for label, value in sorted(snapshot.items(), key=lambda item: str(item[0])):
+            labels = [(self.label, label)] if label is not None else []
+            lines.append(f'{self.name}{_format_labels(labels)} {value}')
+        return lines
+
+
+class Gauge:
+    """Gauge whose value is read from a callback at scrape time
+
+    Concurrent scrapes call the callback one at a time, so it only has to be
+    safe against the code that updates what it reads.
+    """
+
+    def __init__(self, name, help, read):
+        self.name = name
+        self.help = help
+        self.read = read
+        self._lock = threading.Lock()
+        metrics.append(self)
+
+    def render(self):
+        try:
+            with self._lock:
+                value = self.read()
+        except Exception:
+            return []
+        return [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} gauge', f'{self.name} {value}']
+
+
+class Histogram:
+    def __init__(self, name, help, buckets=LATENCY_BUCKETS, label=None):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self.label = label
+        self.series = {}
+        self._lock = threading.Lock()
+        metrics.append(self)
+
+    def observe(self, value, label=None):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self.series.get(label)
+            if series is None:
+                # Per-bucket counts (not cumulative) plus an overflow slot, sum, count
+                series = self.series[label] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            snapshot = {label: (list(s[0]), s[1], s[2]) for label, s in self.series.items()}
+        for label, (counts, total, count) in sorted(snapshot.items(), key=lambda item: str(item[0])):
+            base = [(self.label, label)] if label is not None else []
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f'{self.name}_bucket{_format_labels(base + [("le", bound)])} {cumulative}')
+            lines.append(f'{self.name}_bucket{_format_labels(base + [("le", "+Inf")])} {count}')
+            lines.append(f'{self.name}_sum{_format_labels(base)} {total}')
+            lines.append(f'{self.name}_count{_format_labels(base)} {count}')
+        return lines
+
+
+def render_metrics():
+    """All registered metrics in Prometheus text exposition format"""
+    lines = []
+    for metric in metrics:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+stage_seconds = Histogram('sign_stage_seconds', 'Time spent in each prediction pipeline stage', label='stage')
+frame_seconds = Histogram('sign_frame_seconds', 'End-to-end time to process one predict frame')
+batch_size = Histogram('sign_inference_batch_size', 'Frames per batched CNN forward pass', buckets=SIZE_BUCKETS)
+batch_seconds = Histogram('sign_inference_batch_seconds', 'Time spent in one batched CNN forward pass')
+frames_total = Counter('sign_frames_total', 'Predict frames by outcome', label='outcome')
+cache_hits = Counter('sign_prediction_cache_hits_total', 'Prediction cache hits', label='cache')
+cache_misses = Counter('sign_prediction_cache_misses_total', 'Prediction cache misses', label='cache')
+model_seconds = Histogram('sign_model_batch_seconds', 'CNN forward pass time by model version, shadow runs included',
+                          label='version')
+shadow_frames = Counter('sign_shadow_frames_total', 'Shadowed frames by whether the candidate model agreed',
+                        label='outcome')
+worker_restarts = Counter('sign_worker_restarts_total', 'Inference workers restarted after exiting')
+
+
+@contextmanager
+def timed(timings, stage):
+    """Record how long the block took into timings[stage] (seconds)"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[stage] = timings.get(stage, 0.0) + time.perf_counter() - start
+
+
+def memory_usage():
+    """This process's memory in MB from /proc/self/smaps_rollup
+
+    pss splits each shared page between the processes mapping it, so summing it
+    over workers gives their real footprint; shared/private separate pages
+    other processes also map (e.g. weights inherited from the prefork fork server).
+    Falls back to the peak RSS where smaps_rollup is unavailable, and to {} on
+    Windows, which has neither.
+    """
+    fields = {}
+    try:
+        with open('/proc/self/smaps_rollup') as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) == 3 and parts[2] == 'kB':
+                    fields[parts[0].rstrip(':')] = int(parts[1])
+    except OSError:
+        try:
+            import resource
+        except ImportError:
+            return {}
+        return {'rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)}
+    usage = {
+        'rss_mb': fields.get('Rss', 0),
+        'pss_mb': fields.get('Pss', 0),
+        'shared_mb': fields.get('Shared_Clean', 0) + fields.get('Shared_Dirty', 0),
+        'private_mb': fields.get('Private_Clean', 0) + fields.get('Private_Dirty', 0),
+    }
+    return {name: round(kb / 1024, 1) for name, kb in usage.items()}
+
+
+def record_frame(timings, outcome):
+    """Fold one frame's stage timings (from SignPipeline.process) into the histograms"""
+    frames_total.inc(label=outcome)
+    for stage, seconds in timings.items():
+        if stage == 'frame':
+            frame_seconds.observe(seconds)
+        else:
+            stage_seconds.observe(seconds, stage)
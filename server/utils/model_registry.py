@@ -0,0 +1,291 @@
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+
+import numpy as np
+
+from config.model_config import class_mapping, CONFIDENCE_THRESHOLD, INFERENCE_BACKEND, MODEL_PATH
+from utils.inference_backends import DEFAULT_MODEL_PATHS, load_backend
+from utils.metrics import model_seconds, shadow_frames
+from utils.prediction_cache import model_version
+
+logger = logging.getLogger(__name__)
+
+# MODEL_PATH (or the backend's default file) with the built-in class mapping
+DEFAULT_VERSION = 'default'
+ACTIVE_FILE = 'ACTIVE'
+MANIFEST_FILE = 'manifest.json'
+
+
+class ModelVersion:
+    """A loaded CNN with the class mapping and thresholds it was trained with"""
+
+    def __init__(self, name, backend, class_mapping=class_mapping, confidence_threshold=CONFIDENCE_THRESHOLD,
+                 key=None):
+        self.name = name
+        self.backend = backend
+        self.class_mapping = {int(idx): letter for idx, letter in class_mapping.items()}
+        self.confidence_threshold = confidence_threshold
+        # Scopes cached predictions (see PredictionCache) to these exact weights
+        self.key = key or name
+
+    def predict(self, batch):
+        return self.backend.predict(batch)
+
+    def letters(self, predictions):
+        return [self.class_mapping[int(idx)] for idx in np.argmax(predictions, axis=1)]
+
+
+class ModelRegistry:
+    """Versioned CNNs under directory/<version>/manifest.json, one of them active
+
+    A manifest names the model file (relative to its directory) and may set
+    `backend`, `class_mapping` and `confidence_threshold`; missing fields fall
+    back to the server configuration. directory/ACTIVE holds the active
+    version's name, and every process serving the directory follows it while
+    watch() runs.
+
+    New versions are loaded and warmed in the background and then swapped in
+    with a single assignment: batches that already picked up the old version
+    finish on it. A shadow candidate can be run on a share of the live batches,
+    off the request path, to compare its latency and letters before promotion.
+    """
+
+    def __init__(self, directory, threads=None, warmup=None):
+        self.directory = directory
+        self.threads = threads
+        self.warmup = warmup
+        self.active = None
+        self.candidate = None
+        self.shadow_percent = 0.0
+        self.shadow_stats = {}
+        self.loading = None
+        self.error = None
+        # Called with the new ModelVersion after every swap
+        self.on_activate = []
+
+        self._lock = threading.Lock()
+        self._active_mtime = None
+        self._shadow_queue = queue.Queue(maxsize=4)
+        self._shadow_thread = None
+
+    def versions(self):
+        names = [DEFAULT_VERSION]
+        if os.path.isdir(self.directory):
+            names.extend(sorted(entry.name for entry in os.scandir(self.directory)
+                                if os.path.isfile(os.path.join(entry.path, MANIFEST_FILE))))
+        return names
+
+    def manifest(self, name):
+        """The version's manifest with defaults filled in and the model path resolved"""
+        if name == DEFAULT_VERSION:
+            return {
+                'backend': INFERENCE_BACKEND,
+                'model': MODEL_PATH or DEFAULT_MODEL_PATHS[INFERENCE_BACKEND],
+                'class_mapping': class_mapping,
+                'confidence_threshold': CONFIDENCE_THRESHOLD,
+            }
+        if not name or name != os.path.basename(name) or name.startswith('.'):
+            raise ValueError(f"Invalid model version '{name}'")
+        version_dir = os.path.join(self.directory, name)
+        try:
+            with open(os.path.join(version_dir, MANIFEST_FILE)) as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            raise KeyError(f"Unknown model version '{name}'")
+        manifest['model'] = os.path.join(version_dir, manifest['model'])
+        manifest.setdefault('backend', INFERENCE_BACKEND)
+        manifest.setdefault('class_mapping', class_mapping)
+        manifest.setdefault('confidence_threshold', CONFIDENCE_THRESHOLD)
+        return manifest
+
+    def active_name(self):
+        """Version named by the ACTIVE file, or 'default' without one"""
+        try:
+            with open(os.path.join(self.directory, ACTIVE_FILE)) as f:
+                return f.read().strip() or DEFAULT_VERSION
+        except OSError:
+            return DEFAULT_VERSION
+
+    def write_active(self, name):
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, ACTIVE_FILE)
+        with open(path + '.tmp', 'w') as f:
+            f.write(name + '\n')
+        os.replace(path + '.tmp', path)
+
+    def load(self, name, model_bytes=None):
+        """Load and warm one version without activating it"""
+        manifest = self.manifest(name)
+        started = time.perf_counter()
+        backend = load_backend(manifest['backend'], manifest['model'], self.threads, model_bytes)
+        model = ModelVersion(name, backend, manifest['class_mapping'], manifest['confidence_threshold'],
+                             key=f"{name}:{model_version(manifest['model'])}")
+        if self.warmup is not None:
+            self.warmup(model)
+        logger.info("Model %s loaded in %.2fs", name, time.perf_counter() - started)
+        return model
+
+    def start(self, name=None, model_bytes=None):
+        """Load the ACTIVE version (or `name`) and make it active; blocks until it is warm"""
+        self._active_mtime = self._read_active_mtime()
+        self.install(self.load(name or self.active_name(), model_bytes))
+        return self
+
+    def install(self, model):
+        """Make an already loaded ModelVersion active, e.g. a stand-in model in benchmarks"""
+        previous, self.active = self.active, model
+        if self.candidate is not None and self.candidate.name == model.name:
+            self.shadow(None)
+        for callback in self.on_activate:
+            callback(model)
+        logger.info("Model %s active (was %s)", model.name, previous.name if previous else None)
+
+    def activate(self, name, persist=True):
+        """Load and warm `name` in the background, then swap it in
+
+        Returns False when another version is still loading. With persist the
+        ACTIVE file is updated once the swap is done, so other processes follow.
+        """
+        self.manifest(name)
+        return self._load_in_background(name, lambda model: self._promote(model, persist))
+
+    def shadow(self, name, percent=0.0):
+        """Run `percent` % of live batches through version `name` as well; None stops shadowing"""
+        if name is None or percent <= 0:
+            self.candidate, self.shadow_percent = None, 0.0
+            return True
+        self.manifest(name)
+
+        def start_shadowing(model):
+            self.shadow_stats = {'batches': 0, 'frames': 0, 'agree': 0, 'dropped': 0,
+                                 'live_seconds': 0.0, 'shadow_seconds': 0.0}
+            self.candidate, self.shadow_percent = model, min(float(percent), 100.0)
+            with self._lock:
+                if self._shadow_thread is None:
+                    self._shadow_thread = threading.Thread(target=self._run_shadow, name='model-shadow',
+                                                           daemon=True)
+                    self._shadow_thread.start()
+        return self._load_in_background(name, start_shadowing)
+
+    def watch(self, interval=5.0):
+        """Follow changes to the ACTIVE file from a background thread"""
+        def run():
+            while True:
+                time.sleep(interval)
+                mtime = self._read_active_mtime()
+                if mtime == self._active_mtime or self.loading is not None:
+                    continue
+                self._active_mtime = mtime
+                name = self.active_name()
+                if self.active is None or name != self.active.name:
+                    try:
+                        self.activate(name, persist=False)
+                    except (KeyError, ValueError) as e:
+                        self.error = str(e)
+                        logger.error("ACTIVE names an unusable model version: %s", e)
+
+        threading.Thread(target=run, name='model-watcher', daemon=True).start()
+        return self
+
+    def predict_batch(self, batch):
+        """InferenceBatcher predict_fn: a (probabilities, ModelVersion) pair per frame
+
+        The whole batch runs on the version that was active when it started.
+        """
+        model = self.active
+        started = time.perf_counter()
+        predictions = model.predict(batch)
+        elapsed = time.perf_counter() - started
+        model_seconds.observe(elapsed, model.name)
+
+        candidate = self.candidate
+        if candidate is not None and random.random() * 100 < self.shadow_percent:
+            try:
+                # Copy: the batch is a reused input buffer
+                self._shadow_queue.put_nowait((candidate, model, np.array(batch), predictions, elapsed))
+            except queue.Full:
+                self.shadow_stats['dropped'] += 1
+        return [(prediction, model) for prediction in predictions]
+
+    def status(self):
+        stats = self.shadow_stats
+        shadow = None
+        if self.candidate is not None:
+            shadow = {
+                'version': self.candidate.name,
+                'percent': self.shadow_percent,
+                'batches': stats['batches'],
+                'frames': stats['frames'],
+                'dropped_batches': stats['dropped'],
+                'agreement': round(stats['agree'] / stats['frames'], 4) if stats['frames'] else None,
+                'latency_ratio': (round(stats['shadow_seconds'] / stats['live_seconds'], 3)
+                                  if stats['live_seconds'] else None),
+            }
+        return {
+            'active': self.active.name if self.active else self.active_name(),
+            'versions': self.versions(),
+            'loading': self.loading,
+            'error': self.error,
+            'shadow': shadow,
+        }
+
+    def _promote(self, model, persist):
+        self.install(model)
+        if persist:
+            self.write_active(model.name)
+            self._active_mtime = self._read_active_mtime()
+
+    def _load_in_background(self, name, on_loaded):
+        with self._lock:
+            if self.loading is not None:
+                return False
+            self.loading = name
+
+        def run():
+            try:
+                model = self.load(name)
+                on_loaded(model)
+                self.error = None
+            except Exception as e:
+                self.error = f'{name}: {e}'
+                logger.error("Loading model %s failed: %s", name, e)
+            finally:
+                self.loading = None
+
+        threading.Thread(target=run, name=f'model-load-{name}', daemon=True).start()
+        return True
+
+    def _read_active_mtime(self):
+        try:
+            return os.stat(os.path.join(self.directory, ACTIVE_FILE)).st_mtime_ns
+        except OSError:
+            return None
+
+    def _run_shadow(self):
+        while True:
+            candidate, model, batch, live_predictions, live_seconds = self._shadow_queue.get()
+            started = time.perf_counter()
+            try:
+                predictions = candidate.predict(batch)
+            except Exception as e:
+                logger.warning("Shadow model %s failed: %s", candidate.name, e)
+                continue
+            elapsed = time.perf_counter() - started
+            model_seconds.observe(elapsed, candidate.name)
+
+            agree = sum(live == shadow for live, shadow in
+                        zip(model.letters(live_predictions), candidate.letters(predictions)))
+            shadow_frames.inc(agree, 'agree')
+            shadow_frames.inc(len(batch) - agree, 'disagree')
+            if candidate is self.candidate:
+                stats = self.shadow_stats
+                stats['batches'] += 1
+                stats['frames'] += len(batch)
+                stats['agree'] += agree
+                stats['live_seconds'] += live_seconds
+                stats['shadow_seconds'] += elapsed
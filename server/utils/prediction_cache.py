@@ -0,0 +1,113 @@
+import hashlib
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from utils.landmark_classifier import normalize_landmarks
+from utils.metrics import cache_hits, cache_misses
+
+# Rough per-entry cost of the key, tuple and dict slot on top of any arrays
+ENTRY_OVERHEAD = 256
+
+
+def payload_key(data):
+    """Digest of a `predict` payload's image bytes and the metadata needed to decode them"""
+    digest = hashlib.blake2b(digest_size=16)
+    image = data['image']
+    digest.update(image.encode() if isinstance(image, str) else memoryview(image))
+    digest.update(f"|{data.get('format', '')}|{data.get('width', '')}|{data.get('height', '')}".encode())
+    return digest.digest()
+
+
+def pose_key(points, step):
+    """Digest of the hand pose with landmarks snapped to a grid of `step` hand sizes
+
+    Not mirrored: the CNN sees the crop, so left and right hands stay apart.
+    """
+    features = normalize_landmarks(points, mirror=False)[0]
+    return hashlib.blake2b(np.round(features / step).astype(np.int16).tobytes(), digest_size=16).digest()
+
+
+def model_version(*paths):
+    """Short fingerprint of the model files (path, size and mtime) behind the predictions"""
+    digest = hashlib.blake2b(digest_size=8)
+    for path in paths:
+        if not path:
+            continue
+        try:
+            stat = os.stat(path)
+            digest.update(f'{os.path.abspath(path)}|{stat.st_size}|{stat.st_mtime_ns};'.encode())
+        except OSError:
+            digest.update(f'{path};'.encode())
+    return digest.hexdigest()
+
+
+def entry_size(value):
+    return ENTRY_OVERHEAD + sum(v.nbytes if isinstance(v, np.ndarray) else sys.getsizeof(v)
+                                for v in (value if isinstance(value, tuple) else (value,)))
+
+
+class PredictionCache:
+    """Thread-safe LRU cache with a time-to-live and a memory budget
+
+    Keys are scoped to a model version: entries written under one version are
+    never returned under another, and set_version() drops them.
+    """
+
+    def __init__(self, name, max_bytes=16 * 1024 * 1024, ttl=30.0, version=''):
+        self.name = name
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.version = version
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self.entries.get((self.version, key))
+            if entry is not None and entry[1] < now:
+                self._pop((self.version, key))
+                entry = None
+            if entry is not None:
+                self.entries.move_to_end((self.version, key))
+        if entry is None:
+            cache_misses.inc(label=self.name)
+            return None
+        cache_hits.inc(label=self.name)
+        return entry[0]
+
+    def put(self, key, value, version=None):
+        """Store value under the current version (or under `version` if it still is current)"""
+        size = entry_size(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if version is not None and version != self.version:
+                return
+            full_key = (self.version, key)
+            if full_key in self.entries:
+                self._pop(full_key)
+            self.entries[full_key] = (value, time.monotonic() + self.ttl, size)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                self._pop(next(iter(self.entries)))
+
+    def set_version(self, version):
+        with self._lock:
+            if version != self.version:
+                self.version = version
+                self.entries.clear()
+                self.bytes = 0
+
+    def _pop(self, full_key):
+        # Caller holds the lock
+        self.bytes -= self.entries.pop(full_key)[2]
+
+    def __len__(self):
+        return len(self.entries)
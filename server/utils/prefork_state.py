@@ -0,0 +1,18 @@
+"""State the prefork inference workers share, loaded by their fork server
+
+InferenceWorkerPool preloads this module in the multiprocessing fork server,
+a fresh interpreter started before the first worker. Every worker is forked
+from it and inherits these pages; no other process ever imports it.
+"""
+import logging
+
+from utils.worker_pool import preload_shared_state
+
+logger = logging.getLogger(__name__)
+
+try:
+    shared_state = preload_shared_state()
+except Exception as e:
+    # Workers still start, each loading its own copy
+    logger.error("Prefork: preloading the shared weights failed: %s", e)
+    shared_state = None
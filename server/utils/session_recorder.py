@@ -0,0 +1,192 @@
+import io
+import json
+import logging
+import os
+import queue
+import shutil
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from utils.metrics import stage_seconds
+
+logger = logging.getLogger(__name__)
+
+CHUNK_PATTERN = 'chunk_{:05d}.npz'
+
+
+class SessionChunk:
+    """Frames of one session waiting to be written as a chunk"""
+
+    def __init__(self):
+        self.crops = []
+        self.landmarks = []
+        self.cnn_class = []
+        self.confidence = []
+        self.hand_sign = []
+        self.stable_letter = []
+        self.label = []
+        self.stage = []
+        self.timestamp = []
+
+    def __len__(self):
+        return len(self.timestamp)
+
+    def arrays(self):
+        return {
+            'crops': np.stack(self.crops),
+            'landmarks': np.stack(self.landmarks).astype(np.float32),
+            'cnn_class': np.array(self.cnn_class, dtype=np.int16),
+            'confidence': np.array(self.confidence, dtype=np.float32),
+            'hand_sign': np.array(self.hand_sign, dtype='<U4'),
+            'stable_letter': np.array(self.stable_letter, dtype='<U4'),
+            'label': np.array(self.label, dtype='<U4'),
+            'stage': np.array(self.stage, dtype='<U9'),
+            'timestamp': np.array(self.timestamp, dtype=np.float64),
+        }
+
+
+class SessionRecording:
+    def __init__(self, directory):
+        self.directory = directory
+        self.chunk = SessionChunk()
+        self.next_chunk = 0
+
+
+class SessionRecorder:
+    """Appends each client's hand frames to chunked .npz files off the request path
+
+    A session is a directory of chunk_NNNNN.npz files, each holding up to
+    chunk_frames frames: grayscale hand crops, the 21 landmarks as float32
+    pixels, the predicted class and confidence with the cascade stage that
+    produced it, the rule-engine letter, the stable letter and the client's
+    label if it sent one. Chunks are written whole by a
+    background thread, so a crash loses at most the chunk being filled.
+    """
+
+    def __init__(self, directory='recordings', chunk_frames=256, max_bytes=1024 * 1024 * 1024,
+                 max_queue_size=16, metadata=None):
+        self.directory = directory
+        self.chunk_frames = chunk_frames
+        self.max_bytes = max_bytes
+        self.metadata = metadata or {}
+
+        self.pending = queue.Queue(maxsize=max_queue_size)
+        self.dropped = 0
+        self.sessions = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                os.makedirs(self.directory, exist_ok=True)
+                self._thread = threading.Thread(target=self._run, name='session-recorder', daemon=True)
+                self._thread.start()
+        return self
+
+    def record(self, client_id, crop, points, cnn_class, confidence, hand_sign, stable_letter, label='',
+               stage='cnn'):
+        """Buffer one frame; never blocks the caller"""
+        gray = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY) if crop.ndim == 3 else crop.copy()
+        with self._lock:
+            session = self.sessions.get(client_id)
+            if session is None:
+                name = f"{time.strftime('%Y%m%d-%H%M%S')}_{client_id}"
+                session = self.sessions[client_id] = SessionRecording(os.path.join(self.directory, name))
+            chunk = session.chunk
+            chunk.crops.append(gray)
+            chunk.landmarks.append(points)
+            chunk.cnn_class.append(cnn_class)
+            chunk.confidence.append(confidence)
+            chunk.hand_sign.append(hand_sign)
+            chunk.stable_letter.append(stable_letter)
+            chunk.label.append(label or '')
+            chunk.stage.append(stage)
+            chunk.timestamp.append(time.time())
+            full = len(chunk) >= self.chunk_frames
+            if full:
+                self._hand_off(session)
+        if full:
+            self.start()
+
+    def close(self, client_id):
+        """Write out whatever the client's session has buffered"""
+        with self._lock:
+            session = self.sessions.pop(client_id, None)
+            if session is None or not len(session.chunk):
+                return
+            self._hand_off(session)
+        self.start()
+
+    def _hand_off(self, session):
+        # Caller holds the lock
+        chunk, session.chunk = session.chunk, SessionChunk()
+        path = os.path.join(session.directory, CHUNK_PATTERN.format(session.next_chunk))
+        session.next_chunk += 1
+        try:
+            self.pending.put_nowait((path, chunk))
+        except queue.Full:
+            self.dropped += len(chunk)
+
+    def _run(self):
+        while True:
+            path, chunk = self.pending.get()
+            started = time.perf_counter()
+            try:
+                self._write(path, chunk)
+                self._prune()
+            except Exception as e:
+                logger.error("Writing recording chunk %s failed: %s", path, e)
+            stage_seconds.observe(time.perf_counter() - started, 'record_write')
+
+    def _write(self, path, chunk):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        buffer = io.BytesIO()
+        np.savez_compressed(buffer, meta=np.array(json.dumps(self.metadata)), **chunk.arrays())
+        # Write then rename so readers never see a half-written chunk
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(buffer.getbuffer())
+        os.replace(tmp_path, path)
+
+    def _prune(self):
+        """Delete the oldest sessions once the recordings exceed max_bytes"""
+        if not self.max_bytes:
+            return
+        sessions = []
+        total = 0
+        for entry in os.scandir(self.directory):
+            if entry.is_dir():
+                size = sum(f.stat().st_size for f in os.scandir(entry.path) if f.is_file())
+                sessions.append((entry.stat().st_mtime, entry.path, size))
+                total += size
+        with self._lock:
+            active = {session.directory for session in self.sessions.values()}
+        for _, path, size in sorted(sessions):
+            if total <= self.max_bytes:
+                break
+            if path not in active:
+                shutil.rmtree(path, ignore_errors=True)
+                total -= size
+
+
+def list_chunks(paths):
+    """Every chunk file under the given recording directories or session directories"""
+    chunks = []
+    for path in paths:
+        if os.path.isfile(path):
+            chunks.append(path)
+            continue
+        for root, _, files in os.walk(path):
+            chunks.extend(os.path.join(root, f) for f in files if f.startswith('chunk_') and f.endswith('.npz'))
+    return sorted(chunks)
+
+
+def load_chunk(path):
+    with np.load(path) as data:
+        chunk = {name: data[name] for name in data.files}
+    chunk['meta'] = json.loads(str(chunk['meta']))
+    return chunk
@@ -0,0 +1,317 @@
+import logging
+import os
+from functools import partial
+
+import numpy as np
+
+from config.model_config import (class_mapping, AMBIGUOUS_GROUPS, CONFIDENCE_THRESHOLD,
+                                 HAND_SESSION_LIMIT, HAND_SESSION_IDLE_TIMEOUT,
+                                 STREAM_MOTION_THRESHOLD, STREAM_MAX_REUSE_AGE,
+                                 STREAM_WINDOW, STREAM_COMMIT_FRAMES,
+                                 INFERENCE_BACKEND, MODEL_PATH,
+                                 RECORD_SESSIONS, RECORD_DIR, RECORD_CHUNK_FRAMES, RECORD_MAX_MB,
+                                 DEBUG_ARCHIVE_DIR, DEBUG_SAMPLE_RATE, DEBUG_UNCERTAIN_ONLY,
+                                 DEBUG_SHARD_MAX_MB, DEBUG_SHARD_MAX_AGE, DEBUG_MAX_SHARDS,
+                                 LANDMARK_MODEL_PATH, CASCADE_ENABLED, CASCADE_MIN_CONFIDENCE,
+                                 CASCADE_AMBIGUOUS_TO_CNN, PREDICTION_CACHE_MB, PREDICTION_CACHE_TTL,
+                                 PREDICTION_CACHE_POSE_STEP)
+from utils.debug_archiver import DebugArchiver
+from utils.frame_decoder import decode_frame
+from utils.hand_sessions import HandSession, HandSessionPool
+from utils.hand_signs import detect_hand_sign, landmarks_to_array
+from utils.inference_backends import DEFAULT_MODEL_PATHS
+from utils.landmark_classifier import LandmarkClassifier
+from utils.metrics import timed
+from utils.prediction_cache import PredictionCache, model_version, payload_key, pose_key
+from utils.session_recorder import SessionRecorder
+from utils.sign_preprocessing import CROP_SIZE, crop_hand_region, preprocessors
+from utils.stream_smoother import StreamState
+
+logger = logging.getLogger(__name__)
+
+# Letters that belong to an ambiguous group, e.g. M/N/T
+AMBIGUOUS_LETTERS = frozenset().union(*AMBIGUOUS_GROUPS)
+LETTER_TO_CLASS = {letter: idx for idx, letter in class_mapping.items()}
+# Observation of a frame without a (croppable) hand
+NO_HAND = ('', None, '', 0.0, 'none')
+
+
+def build_hand_sessions():
+    stream_factory = partial(StreamState,
+                             motion_threshold=STREAM_MOTION_THRESHOLD,
+                             max_reuse_age=STREAM_MAX_REUSE_AGE,
+                             window=STREAM_WINDOW,
+                             commit_frames=STREAM_COMMIT_FRAMES)
+    return HandSessionPool(max_sessions=HAND_SESSION_LIMIT,
+                           idle_timeout=HAND_SESSION_IDLE_TIMEOUT,
+                           session_factory=partial(HandSession, stream_factory=stream_factory)
+                           ).reap_in_background()
+
+
+def build_session_recorder():
+    if not RECORD_SESSIONS:
+        return None
+    return SessionRecorder(directory=RECORD_DIR,
+                           chunk_frames=RECORD_CHUNK_FRAMES,
+                           max_bytes=RECORD_MAX_MB * 1024 * 1024,
+                           metadata={'backend': INFERENCE_BACKEND, 'model_path': MODEL_PATH,
+                                     'crop_size': CROP_SIZE, 'class_mapping': class_mapping})
+
+
+def build_debug_archiver():
+    if DEBUG_SAMPLE_RATE <= 0:
+        return None
+    return DebugArchiver(directory=DEBUG_ARCHIVE_DIR,
+                         sample_rate=DEBUG_SAMPLE_RATE,
+                         uncertain_only=DEBUG_UNCERTAIN_ONLY,
+                         confidence_threshold=CONFIDENCE_THRESHOLD,
+                         shard_max_bytes=DEBUG_SHARD_MAX_MB * 1024 * 1024,
+                         shard_max_age=DEBUG_SHARD_MAX_AGE,
+                         max_shards=DEBUG_MAX_SHARDS)
+
+
+def build_landmark_classifier():
+    if not CASCADE_ENABLED or not os.path.exists(LANDMARK_MODEL_PATH):
+        return None
+    logger.info("Landmark cascade enabled with %s", LANDMARK_MODEL_PATH)
+    return LandmarkClassifier.load(LANDMARK_MODEL_PATH)
+
+
+def current_model_version():
+    """Fingerprint of the CNN and landmark model files this process serves"""
+    return model_version(MODEL_PATH or DEFAULT_MODEL_PATHS[INFERENCE_BACKEND],
+                         LANDMARK_MODEL_PATH if CASCADE_ENABLED else None)
+
+
+def build_prediction_caches(version):
+    """(payload cache, pose cache), each with half of PREDICTION_CACHE_MB; None when disabled"""
+    if PREDICTION_CACHE_MB <= 0:
+        return None, None
+    max_bytes = int(PREDICTION_CACHE_MB * 1024 * 1024 / 2)
+    payload_cache = PredictionCache('payload', max_bytes, PREDICTION_CACHE_TTL, version)
+    if PREDICTION_CACHE_POSE_STEP <= 0:
+        return payload_cache, None
+    return payload_cache, PredictionCache('pose', max_bytes, PREDICTION_CACHE_TTL, version)
+
+
+def build_sign_pipeline(predict_fn, hand_sessions, landmark_classifier=None, model_version=None):
+    """SignPipeline with the configured recorder, debug archive, landmark cascade and prediction caches"""
+    version = model_version or current_model_version()
+    return SignPipeline(predict_fn, hand_sessions, build_session_recorder(),
+                        landmark_classifier or build_landmark_classifier(),
+                        caches=build_prediction_caches(version), model_version=version,
+                        debug_archiver=build_debug_archiver())
+
+
+def is_ambiguous(predictions):
+    pred_set = set(predictions)
+    for group in AMBIGUOUS_GROUPS:
+        if pred_set.issubset(group):
+            return True, group
+    return False, None
+
+
+class SignPipeline:
+    """Frame -> hand tracking -> rules + landmark classifier / CNN cascade -> response
+
+    Shared by all serving modes. With a landmark classifier, a frame only goes
+    through the CNN when the classifier is unsure or names an ambiguous letter.
+    The optional prediction caches (see build_prediction_caches) answer repeated
+    payloads before decoding and recently seen poses before the CNN.
+    """
+
+    def __init__(self, predict_fn, hand_sessions, recorder=None, landmark_classifier=None,
+                 cascade_min_confidence=CASCADE_MIN_CONFIDENCE, ambiguous_to_cnn=CASCADE_AMBIGUOUS_TO_CNN,
+                 caches=(None, None), model_version='', pose_step=PREDICTION_CACHE_POSE_STEP,
+                 debug_archiver=None):
+        # predict_fn maps one (128, 128) uint8 model-pixel array to its class
+        # probabilities and the ModelVersion that produced them (whose class
+        # mapping decodes them); the array is a reused buffer, so it must be
+        # consumed (stacked into a batch) before predict_fn returns
+        self.predict_fn = predict_fn
+        self.hand_sessions = hand_sessions
+        self.recorder = recorder
+        self.debug_archiver = debug_archiver
+        self.landmark_classifier = landmark_classifier
+        self.cascade_min_confidence = cascade_min_confidence
+        self.ambiguous_to_cnn = ambiguous_to_cnn
+        self.payload_cache, self.pose_cache = caches
+        self.pose_step = pose_step
+        self.model_version = model_version
+
+    def predict_sign_language(self, image, timings=None):
+        """Full processing and prediction pipeline for a cropped hand image"""
+        timings = {} if timings is None else timings
+
+        with preprocessors.checkout() as preprocessor:
+            # Step 1: Binarize and downscale to the model size in pooled buffers
+            with timed(timings, 'preprocess'):
+                processed_image, model_pixels = preprocessor.model_pixels(image)
+
+            # Step 2: Make prediction (normalized to float32 as part of the batch)
+            with timed(timings, 'model_predict'):
+                prediction, model = self.predict_fn(model_pixels)
+            # The buffers go back to the pool
+            processed_image = processed_image.copy()
+        letter = model.class_mapping[int(np.argmax(prediction))]
+        confidence = np.max(prediction)
+
+        return processed_image, letter, confidence, model
+
+    def classify_landmarks(self, points):
+        """First cascade stage: (letter, confidence) if the landmarks settle it, else None"""
+        if self.landmark_classifier is None:
+            return None
+        letter, confidence = self.landmark_classifier.predict(points)
+        if confidence < self.cascade_min_confidence or letter not in LETTER_TO_CLASS:
+            return None
+        if self.ambiguous_to_cnn and letter in AMBIGUOUS_LETTERS:
+            return None
+        return letter, confidence
+
+    def close_client(self, client_id):
+        """Release the client's tracker and write out its recording"""
+        self.hand_sessions.close(client_id)
+        if self.recorder is not None:
+            self.recorder.close(client_id)
+
+    def process(self, client_id, data):
+        """Run one `predict` payload
+
+        Returns (prediction_response, committed letter or None, per-stage timings in seconds).
+        """
+        timings = {}
+        with timed(timings, 'frame'), self.hand_sessions.lease(client_id) as session:
+            response, committed = self._process(client_id, session, data, timings)
+        return response, committed, timings
+
+    def set_model_version(self, version):
+        """Scope cached results to a new model; nothing cached under the old one is served again"""
+        self.model_version = version
+        for cache in (self.payload_cache, self.pose_cache):
+            if cache is not None:
+                cache.set_version(version)
+
+    def _process(self, client_id, session, data, timings):
+        version = self.model_version
+
+        # Same payload as a recent frame (e.g. resent after a reconnect): skip decoding and tracking
+        payload = None
+        if self.payload_cache is not None:
+            with timed(timings, 'cache'):
+                payload = payload_key(data)
+                observation = self.payload_cache.get(payload)
+            if observation is not None:
+                return self._respond(session, observation, 'payload')
+
+        # Decode base64 string or binary attachment straight to a BGR image
+        with timed(timings, 'decode'):
+            open_cv_image = decode_frame(data)
+
+        observation, source, hand_crop = self._observe(client_id, session, open_cv_image, timings)
+        if payload is not None:
+            self.payload_cache.put(payload, observation, version)
+        response, committed = self._respond(session, observation, source)
+
+        # Append the frame to the session recording (written in the background)
+        hand_sign, points, letter, confidence, stage = observation
+        if self.recorder is not None and points is not None:
+            with timed(timings, 'record'):
+                if hand_crop is None:
+                    hand_crop = crop_hand_region(open_cv_image, points)
+                if hand_crop is not None:
+                    # Classes are recorded in the built-in mapping (-1: a letter it doesn't have)
+                    self.recorder.record(client_id, hand_crop, points, LETTER_TO_CLASS.get(letter, -1),
+                                         float(confidence), hand_sign, response['stable_letter'],
+                                         data.get('label', ''), stage)
+        return response, committed
+
+    def _observe(self, client_id, session, open_cv_image, timings):
+        """Track the hand and classify it: ((hand_sign, points, letter, confidence, stage), source, crop)"""
+        # Get landmarks using the client's Mediapipe tracking session
+        with timed(timings, 'hand_tracking'):
+            posList = session.find_position(open_cv_image)
+        with timed(timings, 'hand_sign'):
+            hand_sign = detect_hand_sign(posList)
+
+        # No hand in frame: skip the CNN entirely
+        if not posList:
+            return NO_HAND, '', None
+        points = landmarks_to_array(posList)
+
+        # Skip both stages and reuse the last result while the hand pose is unchanged
+        cached = session.stream.reuse(points)
+        if cached is not None:
+            return (hand_sign, points) + cached, 'reused', None
+
+        with timed(timings, 'landmark_classifier'):
+            answer = self.classify_landmarks(points)
+        if answer is not None:
+            result, source, hand_crop = answer + ('landmarks',), '', None
+        else:
+            result, source, hand_crop = self._predict_cnn(client_id, open_cv_image, points, timings)
+            if result is None:
+                return NO_HAND, '', None
+        session.stream.remember(points, result)
+        return (hand_sign, points) + result, source, hand_crop
+
+    def _predict_cnn(self, client_id, open_cv_image, points, timings):
+        """CNN stage, answered from the pose cache when an equivalent pose was seen recently"""
+        pose = None
+        if self.pose_cache is not None:
+            with timed(timings, 'cache'):
+                pose = pose_key(points, self.pose_step)
+                result = self.pose_cache.get(pose)
+            if result is not None:
+                return result, 'pose', None
+
+        with timed(timings, 'crop'):
+            hand_crop = crop_hand_region(open_cv_image, points)
+        if hand_crop is None:
+            return None, '', None
+        # Use the downsampled hand crop for prediction
+        processed, letter, confidence, model = self.predict_sign_language(hand_crop, timings)
+        result = (letter, float(confidence), 'cnn')
+
+        # Hand uncertain frames to the background archiver (dropped if it falls behind)
+        if self.debug_archiver is not None:
+            with timed(timings, 'debug_submit'):
+                self.debug_archiver.submit(client_id, {'crop': hand_crop, 'processed': processed},
+                                           float(confidence), letter in AMBIGUOUS_LETTERS)
+        # Ambiguous letters hinge on small finger differences the grid can merge
+        if pose is not None and letter not in AMBIGUOUS_LETTERS:
+            self.pose_cache.put(pose, result, model.key)
+        return result, '', hand_crop
+
+    def _respond(self, session, observation, source):
+        hand_sign, points, letter, confidence, stage = observation
+        stable_letter, committed = session.stream.update(letter, float(confidence), hand_sign)
+        if points is None:
+            return {
+                'cnn_prediction': '',
+                'hand_sign': '',
+                'confidence': 0.0,
+                'ambiguous': False,
+                'group': [],
+                'stable_letter': stable_letter,
+                'hand_detected': False,
+                'stage': 'none'
+            }, None
+
+        predictions = [letter]  # You can build your own logic here
+        is_ambig, group = is_ambiguous(predictions)
+
+        return {
+            # Kept as `cnn_prediction` for existing clients; `stage` says which model answered
+            'cnn_prediction': letter,
+            'hand_sign': hand_sign,
+            'confidence': float(round(confidence, 3)),
+            'ambiguous': is_ambig,
+            'group': list(group) if is_ambig else [],
+            'stable_letter': stable_letter,
+            'hand_detected': True,
+            'reused': source == 'reused',
+            # 'payload' or 'pose' when the prediction cache answered
+            'cached': source if source in ('payload', 'pose') else '',
+            'stage': stage
+        }, committed
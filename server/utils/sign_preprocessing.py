@@ -0,0 +1,151 @@
+import threading
+from contextlib import contextmanager
+
+import cv2
+import numpy as np
+
+IMG_SIZE = (128, 128)
+
+# Hand crops are downsampled to this size before the threshold pipeline runs
+CROP_SIZE = 256
+CROP_PADDING = 0.25
+
+
+def hand_bounding_box(points, padding=CROP_PADDING):
+    """Padded square (x0, y0, x1, y1) box around (21, 2) pixel landmarks"""
+    x_min, y_min = points.min(axis=0)
+    x_max, y_max = points.max(axis=0)
+    side = max(x_max - x_min, y_max - y_min) * (1 + 2 * padding)
+    side = max(int(side), 1)
+    cx, cy = (x_min + x_max) / 2, (y_min + y_max) / 2
+    x0, y0 = int(cx - side / 2), int(cy - side / 2)
+    return x0, y0, x0 + side, y0 + side
+
+
+def crop_hand_region(image, points, size=CROP_SIZE, padding=CROP_PADDING):
+    """Crop the hand from a BGR frame and downsample it to a size x size square"""
+    h, w = image.shape[:2]
+    x0, y0, x1, y1 = hand_bounding_box(points, padding)
+
+    # Only the part inside the frame is sliced; the rest is border-filled
+    crop = image[max(y0, 0):min(y1, h), max(x0, 0):min(x1, w)]
+    if crop.size == 0:
+        return None
+    top, left = max(-y0, 0), max(-x0, 0)
+    bottom, right = max(y1 - h, 0), max(x1 - w, 0)
+    if top or left or bottom or right:
+        crop = cv2.copyMakeBorder(crop, top, bottom, left, right, cv2.BORDER_REPLICATE)
+
+    interpolation = cv2.INTER_AREA if crop.shape[0] > size else cv2.INTER_LINEAR
+    return cv2.resize(crop, (size, size), interpolation=interpolation)
+
+
+def preprocess_image(image):
+    """Preprocess OpenCV image (BGR, or already grayscale) for CNN"""
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+    blur = cv2.GaussianBlur(gray, (5, 5), 2)
+    # THRESH_BINARY gives the same pixels the old THRESH_BINARY_INV + Otsu
+    # inversion pass did: Otsu on a 0/255 image only flips it
+    return cv2.adaptiveThreshold(blur, 255,
+                                 cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+                                 cv2.THRESH_BINARY, 11, 2)
+
+
+def prepare_for_model(image):
+    """Prepare the processed image for model input"""
+    # Resize to model's expected input
+    resized = cv2.resize(image, IMG_SIZE)
+
+    # Normalize and add channel dimension
+    normalized = resized.astype('float32') / 255.0
+    final_image = np.expand_dims(normalized, axis=-1)
+
+    return final_image
+
+
+def normalize_batch(pixels, out=None):
+    """(N, 128, 128) uint8 model pixels -> (N, 128, 128, 1) float32 model input"""
+    if out is None:
+        out = np.empty(pixels.shape + (1,), dtype=np.float32)
+    np.divide(pixels, np.float32(255.0), out=out[..., 0], dtype=np.float32)
+    return out
+
+
+class FramePreprocessor:
+    """preprocess_image + the prepare_for_model resize, into reused buffers
+
+    Produces the uint8 pixels the model sees; the float conversion happens once
+    per batch in normalize_batch. Buffers are reused between calls, so one
+    instance must not be used by two threads at once (see PreprocessorPool).
+    """
+
+    def __init__(self):
+        self.shape = None
+        self.pixels = np.empty(IMG_SIZE[::-1], dtype=np.uint8)
+
+    def _allocate(self, shape):
+        self.shape = shape
+        self.gray = np.empty(shape, dtype=np.uint8)
+        self.blur = np.empty(shape, dtype=np.uint8)
+        self.binary = np.empty(shape, dtype=np.uint8)
+
+    def model_pixels(self, image):
+        """Returns (binarized crop, model pixels); both are overwritten by the next call"""
+        if image.shape[:2] != self.shape:
+            self._allocate(image.shape[:2])
+        if image.ndim == 3:
+            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY, dst=self.gray)
+        else:
+            gray = image  # recorded crops are stored grayscale
+        cv2.GaussianBlur(gray, (5, 5), 2, dst=self.blur)
+        cv2.adaptiveThreshold(self.blur, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+                              cv2.THRESH_BINARY, 11, 2, dst=self.binary)
+        cv2.resize(self.binary, IMG_SIZE, dst=self.pixels)
+        return self.binary, self.pixels
+
+
+class PreprocessorPool:
+    """FramePreprocessors checked out for one frame at a time
+
+    Socket.IO events run on short-lived threads, so a per-thread instance would
+    be rebuilt, buffers and all, for nearly every frame. Pooled instances keep
+    their buffers whichever thread uses them; the pool grows to the peak number
+    of frames preprocessed at once.
+    """
+
+    def __init__(self):
+        self._idle = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def checkout(self):
+        with self._lock:
+            preprocessor = self._idle.pop() if self._idle else None
+        if preprocessor is None:
+            preprocessor = FramePreprocessor()
+        try:
+            yield preprocessor
+        finally:
+            with self._lock:
+                self._idle.append(preprocessor)
+
+    def __len__(self):
+        return len(self._idle)
+
+
+preprocessors = PreprocessorPool()
+
+
+class ModelInputBuffer:
+    """Preallocated batch tensors: stacks model pixels and normalizes them in place"""
+
+    def __init__(self, max_batch_size):
+        self.pixels = np.empty((max_batch_size,) + IMG_SIZE[::-1], dtype=np.uint8)
+        self.inputs = np.empty((max_batch_size,) + IMG_SIZE[::-1] + (1,), dtype=np.float32)
+
+    def __call__(self, pixel_list):
+        count = len(pixel_list)
+        if count > len(self.pixels):
+            return normalize_batch(np.stack(pixel_list))
+        np.stack(pixel_list, out=self.pixels[:count])
+        return normalize_batch(self.pixels[:count], out=self.inputs[:count])
@@ -0,0 +1,85 @@
+import threading
+import time
+from collections import Counter, deque
+
+import numpy as np
+
+
+class StreamState:
+    """Per-client streaming stage: skips unchanged poses and smooths predictions"""
+
+    def __init__(self, motion_threshold=0.03, max_reuse_age=2.0, window=5, commit_frames=3):
+        self.motion_threshold = motion_threshold
+        self.max_reuse_age = max_reuse_age
+        self.commit_frames = commit_frames
+
+        self.reference_points = None
+        self.reference_time = 0
+        self.last_result = None
+
+        self.cnn_votes = deque(maxlen=window)
+        self.sign_votes = deque(maxlen=window)
+        self.stable_letter = ''
+        self.stable_count = 0
+        self.committed_letter = ''
+        self._lock = threading.Lock()
+
+    def motion(self, points):
+        """Mean landmark displacement since the last CNN run, relative to hand size"""
+        if self.reference_points is None or points is None:
+            return np.inf
+        extent = np.ptp(self.reference_points, axis=0).max()
+        if extent <= 0:
+            return np.inf
+        delta = np.linalg.norm(points - self.reference_points, axis=1).mean()
+        return delta / extent
+
+    def reuse(self, points):
+        """Return the cached CNN result if the hand pose hasn't changed, else None"""
+        with self._lock:
+            if self.last_result is None:
+                return None
+            if time.monotonic() - self.reference_time > self.max_reuse_age:
+                return None
+            if self.motion(points) >= self.motion_threshold:
+                return None
+            return self.last_result
+
+    def remember(self, points, result):
+        with self._lock:
+            self.reference_points = points
+            self.reference_time = time.monotonic()
+            self.last_result = result
+
+    def update(self, cnn_letter, confidence, hand_sign):
+        """Add a frame's predictions; returns (stable_letter, committed_letter or None)"""
+        with self._lock:
+            self.cnn_votes.append((cnn_letter, confidence))
+            self.sign_votes.append(hand_sign)
+
+            # Confidence-weighted vote for the CNN, one vote per frame for the rules
+            scores = Counter()
+            for letter, weight in self.cnn_votes:
+                scores[letter] += weight
+            for letter in self.sign_votes:
+                if letter:
+                    scores[letter] += 1.0
+            letter = scores.most_common(1)[0][0] if scores else ''
+            if not hand_sign and cnn_letter == '':
+                letter = ''
+
+            if letter == self.stable_letter:
+                self.stable_count += 1
+            else:
+                self.stable_letter = letter
+                self.stable_count = 1
+
+            committed = None
+            if not letter:
+                # Hand left the frame: allow the same letter to be spelled again
+                self.committed_letter = ''
+            elif self.stable_count >= self.commit_frames and letter != self.committed_letter:
+                self.committed_letter = letter
+                committed = letter
+
+            return letter, committed
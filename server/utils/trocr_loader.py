@@ -1,4 +1,14 @@
-from transformers import TrOCRProcessor, VisionEncoderDecoderModel
+from functools import lru_cache
 
-processor = TrOCRProcessor.from_pretrained('microsoft/trocr-base-handwritten')
-model = VisionEncoderDecoderModel.from_pretrained('microsoft/trocr-base-handwritten')
+TROCR_MODEL_NAME = 'microsoft/trocr-base-handwritten'
+
+
+@lru_cache(maxsize=None)
+def load_trocr():
+    """Download/build the TrOCR processor and model on first use"""
+    from transformers import TrOCRProcessor, VisionEncoderDecoderModel
+
+    processor = TrOCRProcessor.from_pretrained(TROCR_MODEL_NAME)
+    model = VisionEncoderDecoderModel.from_pretrained(TROCR_MODEL_NAME)
+    model.eval()
+    return processor, model
@@ -0,0 +1,253 @@
+import gc
+import logging
+import multiprocessing as mp
+import threading
+import time
+import zlib
+
+import numpy as np
+
+from config.model_config import INFERENCE_THREADS, MODEL_REGISTRY_DIR, MODEL_WATCH_INTERVAL
+from utils.metrics import memory_usage, worker_restarts
+
+logger = logging.getLogger(__name__)
+
+_READY = '__ready__'
+
+
+def preload_shared_state():
+    """Load what forked workers can share copy-on-write, then freeze the heap
+
+    Runs in the prefork fork server (see utils/prefork_state.py). Only weights
+    and modules are loaded here, never sessions or interpreters: their thread
+    pools don't survive a fork, so each worker builds its own over the shared
+    weights.
+    """
+    import HandTrackingModule  # noqa: F401  MediaPipe's modules and bundled graph data
+    from utils.inference_backends import load_weights
+    from utils.model_registry import ModelRegistry
+    from utils.sign_pipeline import build_landmark_classifier
+
+    # Versions swapped in later are loaded by each worker on its own
+    registry = ModelRegistry(MODEL_REGISTRY_DIR)
+    version = registry.active_name()
+    manifest = registry.manifest(version)
+    shared = {
+        'model_version': version,
+        'model_bytes': load_weights(manifest['backend'], manifest['model']),
+        'landmark_classifier': build_landmark_classifier(),
+    }
+    if shared['model_bytes'] is None:
+        logger.warning("Prefork: %s weights can't be shared, each worker loads its own copy", manifest['backend'])
+    # Move everything allocated so far out of the collector's reach: collections in the
+    # workers would otherwise write to these objects' headers and copy their pages
+    gc.collect()
+    gc.freeze()
+    return shared
+
+
+def worker_main(worker_id, frames, results, prefork=False):
+    """Inference worker process: owns a loaded model and its clients' hand trackers"""
+    from utils.model_registry import ModelRegistry
+    from utils.sign_pipeline import build_hand_sessions, build_sign_pipeline
+    from utils.sign_preprocessing import ModelInputBuffer
+
+    shared = {}
+    if prefork:
+        # Already imported by the fork server, so this is its state, inherited rather than loaded
+        from utils.prefork_state import shared_state
+        shared = shared_state or {}
+    registry = ModelRegistry(MODEL_REGISTRY_DIR, INFERENCE_THREADS,
+                             warmup=lambda model: model.predict(np.zeros((1, 128, 128, 1), dtype=np.float32)))
+    registry.start(shared.get('model_version'), shared.get('model_bytes'))
+    hand_sessions = build_hand_sessions()
+    model_inputs = ModelInputBuffer(1)
+
+    def predict(model_pixels):
+        model = registry.active
+        return model.predict(model_inputs([model_pixels]))[0], model
+
+    pipeline = build_sign_pipeline(predict, hand_sessions, shared.get('landmark_classifier'), registry.active.key)
+    registry.on_activate.append(lambda model: pipeline.set_model_version(model.key))
+    # The front end's /models/activate rewrites ACTIVE; each worker swaps on its own
+    if MODEL_WATCH_INTERVAL > 0:
+        registry.watch(MODEL_WATCH_INTERVAL)
+    results.put((_READY, worker_id, memory_usage(), None))
+
+    while True:
+        client_id, data = frames.get()
+        if client_id is None:
+            break
+        if data is None:
+            # Client disconnected: release its tracker and recording
+            pipeline.close_client(client_id)
+            continue
+        try:
+            response, committed, timings = pipeline.process(client_id, data)
+        except Exception as e:
+            response, committed, timings = {'error': str(e)}, None, {}
+        # Stage timings travel with the result so /metrics in the front end covers the workers
+        results.put((client_id, response, committed, timings))
+
+
+class InferenceWorkerPool:
+    """Routes frames to inference processes by sid and results back to the front end
+
+    Each client is pinned to one worker so its hand tracking state stays in one
+    place. The coalescer keeps at most one frame per client in flight and one
+    waiting, so slow workers never process stale frames.
+
+    With prefork the weights are loaded once by a fork server and the workers
+    are forked from it rather than spawned, so they share those pages instead of
+    each loading a copy. The fork server is a fresh interpreter that loads
+    nothing else: this process holds TrOCR, gRPC and pool threads and locks
+    that would not survive being forked.
+    """
+
+    def __init__(self, num_workers, on_result, coalescer, prefork=False):
+        self.num_workers = num_workers
+        self.on_result = on_result
+        self.coalescer = coalescer
+        self.prefork = prefork
+        if prefork:
+            # The fork server imports utils.prefork_state from the working directory, like the
+            # server's other relative paths; it starts with the first worker
+            self._context = mp.get_context('forkserver')
+            self._context.set_forkserver_preload(['utils.prefork_state'])
+        else:
+            self._context = mp.get_context('spawn')
+        self._results = self._context.Queue()
+        self._queues = []
+        self._processes = []
+        self._lock = threading.Lock()
+        self._stopping = False
+        self.worker_memory = {}
+        # Workers that exited and are being restarted
+        self.down = set()
+        self._restart_delay = {}
+        self._restart_at = {}
+
+    def start(self, timeout=300):
+        """Start the workers and block until each has loaded and warmed its model"""
+        for worker_id in range(self.num_workers):
+            self._queues.append(None)
+            self._processes.append(None)
+            self._start_worker(worker_id)
+
+        for _ in range(self.num_workers):
+            tag, worker_id, memory, _ = self._results.get(timeout=timeout)
+            self._worker_ready(worker_id, memory)
+        if 'pss_mb' in memory:
+            # With prefork the fork server holds the rest of the shared pages' PSS
+            logger.info("Inference workers use %.1f MB in total (PSS, %s)",
+                        sum(m['pss_mb'] for m in self.worker_memory.values()),
+                        'prefork' if self.prefork else 'spawn')
+
+        threading.Thread(target=self._dispatch_results, name='inference-results', daemon=True).start()
+        threading.Thread(target=self._monitor, name='inference-monitor', daemon=True).start()
+        return self
+
+    def _start_worker(self, worker_id):
+        # A fresh queue each time: a worker that died inside get() can leave the old one locked
+        frames = self._context.Queue()
+        process = self._context.Process(target=worker_main,
+                                        args=(worker_id, frames, self._results, self.prefork),
+                                        name=f'inference-worker-{worker_id}', daemon=True)
+        process.start()
+        self._queues[worker_id] = frames
+        self._processes[worker_id] = process
+
+    def _worker_ready(self, worker_id, memory):
+        self.worker_memory[worker_id] = memory
+        self.down.discard(worker_id)
+        self._restart_delay.pop(worker_id, None)
+        logger.info("Inference worker %s ready: %s", worker_id,
+                    ', '.join(f'{name}={mb}' for name, mb in memory.items()))
+
+    def _worker_for(self, client_id):
+        return zlib.crc32(client_id.encode()) % self.num_workers
+
+    def _queue_for(self, client_id):
+        return self._queues[self._worker_for(client_id)]
+
+    def healthy(self):
+        """False while any worker is down or restarting; /ready reports it"""
+        return not self.down
+
+    def submit(self, client_id, data):
+        """Queue a frame; returns False if it was parked or its worker is down"""
+        with self._lock:
+            if self._worker_for(client_id) in self.down:
+                restarting = True
+            elif not self.coalescer.offer(client_id, data):
+                return False
+            else:
+                restarting = False
+                self._queue_for(client_id).put((client_id, data))
+        if restarting:
+            self._deliver(client_id, {'error': 'Inference worker is restarting, try again shortly'})
+            return False
+        return True
+
+    def close_client(self, client_id):
+        self.coalescer.remove(client_id)
+        with self._lock:
+            self._queue_for(client_id).put((client_id, None))
+
+    def _dispatch_results(self):
+        while True:
+            message = self._results.get()
+            if message[0] == _READY:
+                # A restarted worker
+                self._worker_ready(*message[1:3])
+                continue
+            client_id, response, committed, timings = message
+            data = self.coalescer.finish(client_id)
+            if data is not None:
+                with self._lock:
+                    self._queue_for(client_id).put((client_id, data))
+            self._deliver(client_id, response, committed, timings)
+
+    def _deliver(self, client_id, response, committed=None, timings=None):
+        try:
+            self.on_result(client_id, response, committed, timings or {})
+        except Exception as e:
+            logger.error("Delivering result to %s failed: %s", client_id, e)
+
+    def _monitor(self, interval=1.0):
+        """Restart workers that exited (OOM, a crash in TF/MediaPipe) and fail their clients' frames
+
+        The clients' hand tracking state died with the worker, so they are
+        dropped from the coalescer and sent an error; their next frame starts
+        over on the replacement.
+        """
+        while not self._stopping:
+            time.sleep(interval)
+            for worker_id, process in enumerate(self._processes):
+                if process.is_alive() or self._stopping or time.monotonic() < self._restart_at.get(worker_id, 0):
+                    continue
+                logger.error("Inference worker %s exited with code %s, restarting it", worker_id, process.exitcode)
+                worker_restarts.inc()
+                with self._lock:
+                    # New frames for this worker fail fast until its replacement is ready
+                    self.down.add(worker_id)
+                    clients = [client_id for client_id in self.coalescer.stats()
+                               if self._worker_for(client_id) == worker_id]
+                    for client_id in clients:
+                        self.coalescer.remove(client_id)
+                self._start_worker(worker_id)
+                # Back off while replacements keep failing, e.g. on a model that no longer loads
+                delay = self._restart_delay[worker_id] = min(self._restart_delay.get(worker_id, 0.5) * 2, 60)
+                self._restart_at[worker_id] = time.monotonic() + delay
+                for client_id in clients:
+                    self._deliver(client_id, {'error': 'Inference worker failed, please resend the frame'})
+
+    def queue_depth(self):
+        return sum(q.qsize() for q in self._queues)
+
+    def shutdown(self):
+        self._stopping = True
+        for frames in self._queues:
+            frames.put((None, None))
+        for process in self._processes:
+            process.join(timeout=5)
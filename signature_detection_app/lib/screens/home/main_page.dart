@@ -1,5 +1,4 @@
 import 'dart:async';
-import 'dart:convert';
 import 'package:flutter/material.dart';
 import 'package:camera/camera.dart';
 import 'package:socket_io_client/socket_io_client.dart' as IO;
@@ -27,6 +26,8 @@ class _MainPageState extends State<MainPage> with WidgetsBindingObserver {
   bool _showSelectionButtons = false;
   bool _isCapturing = false;
   bool _autoCaptureNext = false;
+  // Capture interval advised by the server's `throttle` events
+  int _captureIntervalMs = 1000;
 
   @override
   void initState() {
@@ -164,7 +165,10 @@ class _MainPageState extends State<MainPage> with WidgetsBindingObserver {
                 (_cnnPrediction == null || _cnnPrediction!.isEmpty);
 
             if (bothEmpty) {
-              Future.delayed(Duration(seconds: 1), _captureAndPredict);
+              Future.delayed(
+                Duration(milliseconds: _captureIntervalMs),
+                _captureAndPredict,
+              );
             } else {
               _showSelectionButtons = true;
             }
@@ -180,6 +184,13 @@ class _MainPageState extends State<MainPage> with WidgetsBindingObserver {
       }
     });
 
+    _socket!.on('throttle', (data) {
+      final interval = data['interval_ms'];
+      if (interval is num) {
+        _captureIntervalMs = interval.toInt();
+      }
+    });
+
     _socket!.on('connect_error', (err) {
       print('Socket connection error: $err');
       if (mounted) {
@@ -213,10 +224,11 @@ class _MainPageState extends State<MainPage> with WidgetsBindingObserver {
     try {
       final image = await _cameraController!.takePicture();
       final bytes = await image.readAsBytes();
-      final base64Image = base64Encode(bytes);
 
+      // Send the JPEG as a binary attachment instead of a base64 string
       _socket?.emit('predict', {
-        'image': base64Image,
+        'image': bytes,
+        'format': 'jpeg',
         'timestamp': DateTime.now().millisecondsSinceEpoch,
       });
     } catch (e) {